@@ -3,10 +3,47 @@ from django.contrib import admin
 from django.apps import apps
 from django.contrib.admin.sites import AlreadyRegistered
 
+from . import bitacora
+from .models import EventoPrestamo, Legajo
+
+
+@admin.register(Legajo)
+class LegajoAdmin(admin.ModelAdmin):
+    list_display = ('codigo', 'nombre', 'estado', 'bloqueado')
+    search_fields = ('codigo', 'nombre')
+    # Los mantienen los préstamos y ``save()``; editarlos a mano los desincroniza.
+    readonly_fields = ('estado', 'prestamo_actual')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Igual que ``legajo_toggle_bloqueo_view``: sin el evento, ``estado_en``
+        # y ``tenedor`` no verían el bloqueo.
+        if 'bloqueado' in form.changed_data:
+            bitacora.registrar_bloqueo(obj)
+
+
+@admin.register(EventoPrestamo)
+class EventoPrestamoAdmin(admin.ModelAdmin):
+    """La bitácora sólo crece desde el circuito: aquí se consulta, no se edita."""
+
+    list_display = ('ocurrido_en', 'legajo', 'tipo', 'estado_legajo', 'usuario')
+    list_filter = ('tipo',)
+    list_select_related = ('legajo', 'usuario')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 app_config = apps.get_app_config("expediente")
 
 for model in app_config.get_models():
     try:
         admin.site.register(model)
     except AlreadyRegistered:
-        continue
\ No newline at end of file
+        continue
@@ -0,0 +1,179 @@
+"""API REST de sólo lectura (``/api/v1/``).
+
+Los listados usan paginación por cursor y responden a ``If-None-Match`` /
+``If-Modified-Since`` con 304 a partir de la página pedida: sus ``pk`` y
+``actualizado_en`` y si hay página anterior o siguiente. Esa lectura es la
+de la propia página (por el índice del orden del cursor, con ``LIMIT``),
+sin prefetch ni serialización, así que no crece con el listado.
+"""
+
+import hashlib
+
+from django.db.models import Prefetch
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter
+
+from .models import Legajo, Prestamo, Solicitud
+from .permissions import es_administrador, es_solicitante
+from .serializers import (
+    DisponibilidadSerializer,
+    LegajoSerializer,
+    PrestamoSerializer,
+    SolicitudSerializer,
+    campos_pedidos,
+)
+
+
+class EsSolicitante(permissions.BasePermission):
+    def has_permission(self, request, view):
+        return es_solicitante(request.user)
+
+
+class PaginacionCursor(CursorPagination):
+    """Paginación por cursor con el orden de ``orden_cursor`` de cada vista."""
+
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+    def get_ordering(self, request, queryset, view):
+        orden = view.orden_cursor
+        return (orden,) if isinstance(orden, str) else tuple(orden)
+
+
+class GetCondicionalMixin:
+    """ETag y Last-Modified a partir de ``actualizado_en`` para listados y detalles."""
+
+    def _validadores(self, request, ultimo, version=''):
+        firma = f'{request.get_full_path()}:{request.user.pk}:{version}:{ultimo.isoformat() if ultimo else ""}'
+        etag = f'"{hashlib.md5(firma.encode()).hexdigest()}"'
+        return etag, (int(ultimo.timestamp()) if ultimo else None)
+
+    def _responder(self, request, etag, last_modified, generar):
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = generar()
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def _validadores_pagina(self, request, queryset):
+        orden = self.paginator.get_ordering(request, queryset, self)
+        campos = {'pk', 'actualizado_en', *(campo.lstrip('-') for campo in orden)}
+        filas = self.paginator.paginate_queryset(queryset.prefetch_related(None).values(*campos), request, view=self)
+        version = ','.join(f"{fila['pk']}@{fila['actualizado_en'].isoformat()}" for fila in filas)
+        version += f':{self.paginator.has_previous}:{self.paginator.has_next}'
+        ultimo = max((fila['actualizado_en'] for fila in filas), default=None)
+        return self._validadores(request, ultimo, version)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag, last_modified = self._validadores_pagina(request, queryset)
+        listar = super().list
+        return self._responder(request, etag, last_modified, lambda: listar(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        instancia = self.get_object()
+        etag, last_modified = self._validadores(request, instancia.actualizado_en)
+        return self._responder(
+            request,
+            etag,
+            last_modified,
+            lambda: Response(self.get_serializer(instancia).data),
+        )
+
+
+class LegajoViewSet(GetCondicionalMixin, viewsets.ReadOnlyModelViewSet):
+    """Legajos por código; ``?estado=`` filtra por estado materializado."""
+
+    serializer_class = LegajoSerializer
+    permission_classes = [permissions.IsAuthenticated, EsSolicitante]
+    pagination_class = PaginacionCursor
+    orden_cursor = 'codigo'
+    lookup_field = 'codigo'
+    lookup_value_regex = '[^/]+'
+
+    def get_queryset(self):
+        legajos = Legajo.objects.all()
+        estado = self.request.query_params.get('estado')
+        if estado:
+            legajos = legajos.filter(estado=estado)
+        return legajos
+
+    @action(detail=False, methods=['post'])
+    def disponibilidad(self, request):
+        """Clasifica hasta 1000 códigos en disponibles, no disponibles e inexistentes con una consulta."""
+
+        serializer = DisponibilidadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        codigos = list(dict.fromkeys(serializer.validated_data['codigos']))
+        estados = dict(Legajo.objects.filter(codigo__in=codigos).values_list('codigo', 'estado'))
+        return Response({
+            'disponibles': [codigo for codigo in codigos if estados.get(codigo) == Legajo.ESTADO_DISPONIBLE],
+            'no_disponibles': {
+                codigo: estado for codigo, estado in estados.items() if estado != Legajo.ESTADO_DISPONIBLE
+            },
+            'inexistentes': [codigo for codigo in codigos if codigo not in estados],
+        })
+
+
+class PropiasMixin:
+    """Los administradores ven todo; el resto, sólo lo propio."""
+
+    def filtrar_por_usuario(self, queryset):
+        if es_administrador(self.request.user):
+            return queryset
+        return queryset.filter(usuario=self.request.user)
+
+
+class SolicitudViewSet(GetCondicionalMixin, PropiasMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = SolicitudSerializer
+    permission_classes = [permissions.IsAuthenticated, EsSolicitante]
+    pagination_class = PaginacionCursor
+    orden_cursor = '-pk'
+
+    def get_queryset(self):
+        solicitudes = self.filtrar_por_usuario(Solicitud.objects.select_related('usuario'))
+        estado = self.request.query_params.get('estado')
+        if estado:
+            solicitudes = solicitudes.filter(estado=estado)
+        pedidos = campos_pedidos(self.request)
+        if pedidos is None or 'prestamos' in pedidos:
+            solicitudes = solicitudes.prefetch_related(
+                Prefetch('prestamos', queryset=Prestamo.objects.select_related('legajo').order_by('pk'))
+            )
+        return solicitudes
+
+
+class PrestamoViewSet(GetCondicionalMixin, PropiasMixin, viewsets.ReadOnlyModelViewSet):
+    """Préstamos; ``?estado=`` y ``?solicitud=`` filtran."""
+
+    serializer_class = PrestamoSerializer
+    permission_classes = [permissions.IsAuthenticated, EsSolicitante]
+    pagination_class = PaginacionCursor
+    orden_cursor = '-pk'
+
+    def get_queryset(self):
+        prestamos = self.filtrar_por_usuario(Prestamo.objects.select_related('legajo', 'usuario'))
+        estado = self.request.query_params.get('estado')
+        if estado:
+            prestamos = prestamos.filter(estado=estado)
+        solicitud = self.request.query_params.get('solicitud')
+        if solicitud and solicitud.isdigit():
+            prestamos = prestamos.filter(solicitud_id=solicitud)
+        return prestamos
+
+
+router = DefaultRouter()
+router.register('legajos', LegajoViewSet, basename='legajo')
+router.register('solicitudes', SolicitudViewSet, basename='solicitud')
+router.register('prestamos', PrestamoViewSet, basename='prestamo')
+
+app_name = 'api'
+urlpatterns = router.urls
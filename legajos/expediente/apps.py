@@ -1,5 +1,6 @@
 from django.apps import AppConfig
-from django.db.models.signals import post_migrate
+from django.core import checks
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save
 
 
 def ensure_default_groups(sender, **kwargs):
@@ -15,4 +16,29 @@ class ExpedienteConfig(AppConfig):
     name = 'expediente'
 
     def ready(self):
+        from django.contrib.auth import get_user_model
+        from . import bitacora, contadores, eventos
+        from .models import Devolucion, Legajo, Prestamo, Solicitud
+        from .permissions import olvidar_roles
+        from .signals import prestamos_creados, transicion_realizada
+
+        User = get_user_model()
         post_migrate.connect(ensure_default_groups, sender=self)
+        m2m_changed.connect(olvidar_roles, sender=User.groups.through)
+
+        post_save.connect(contadores.al_guardar_legajo, sender=Legajo)
+        post_delete.connect(contadores.al_borrar_legajo, sender=Legajo)
+        post_save.connect(contadores.al_guardar_solicitud, sender=Solicitud)
+        post_delete.connect(contadores.al_borrar_solicitud, sender=Solicitud)
+        prestamos_creados.connect(contadores.al_crear_prestamos, sender=Prestamo)
+        transicion_realizada.connect(contadores.al_transicionar, sender=Prestamo)
+        transicion_realizada.connect(contadores.al_transicionar, sender=Solicitud)
+
+        checks.register(eventos.comprobar_difusor)
+        post_save.connect(eventos.al_guardar_solicitud, sender=Solicitud)
+        post_save.connect(eventos.al_guardar_devolucion, sender=Devolucion)
+        transicion_realizada.connect(eventos.al_transicionar, sender=Prestamo)
+        transicion_realizada.connect(eventos.al_transicionar, sender=Solicitud)
+
+        prestamos_creados.connect(bitacora.al_crear_prestamos, sender=Prestamo)
+        transicion_realizada.connect(bitacora.al_transicionar, sender=Prestamo)
@@ -0,0 +1,136 @@
+"""Archivo de solicitudes cerradas.
+
+Las solicitudes cerradas hace más de ``ANTIGUEDAD`` pasan, con sus ítems y
+préstamos (todos devueltos o extraviados), a ``SolicitudHistorica``,
+``SolicitudItemHistorico`` y ``PrestamoHistorico``. Así las tablas que
+recorre el circuito, y el índice parcial de préstamos activos, quedan del
+tamaño del trabajo en curso. Se mueve por lotes, cada uno en su propia
+transacción, y se conservan los ids, de modo que ``restaurar`` puede
+devolverlas tal cual.
+
+Los borrados y altas no emiten señales (son masivos); los contadores de
+solicitudes, que describen las tablas vivas, se ajustan por lote.
+"""
+
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from . import cola, contadores
+from .models import (
+    Legajo,
+    Prestamo,
+    PrestamoHistorico,
+    Solicitud,
+    SolicitudHistorica,
+    SolicitudItem,
+    SolicitudItemHistorico,
+)
+
+ANTIGUEDAD = timedelta(days=180)
+LOTE = 500
+
+CAMPOS_SOLICITUD = ('id', 'usuario_id', 'estado', 'creado_en', 'actualizado_en')
+CAMPOS_ITEM = ('id', 'solicitud_id', 'legajo_id', 'disponible_al_crear')
+CAMPOS_PRESTAMO = (
+    'id', 'solicitud_id', 'legajo_id', 'usuario_id', 'estado',
+    'creado_en', 'entregado_en', 'devuelto_en', 'actualizado_en', 'devolucion_id',
+)
+
+
+def archivables(antiguedad: timedelta = ANTIGUEDAD):
+    """Solicitudes cerradas antes de ``antiguedad`` sin préstamos activos ni
+    apuntados como préstamo actual de un legajo."""
+
+    return (
+        Solicitud.objects.filter(estado=Solicitud.ESTADO_CERRADA, actualizado_en__lt=timezone.now() - antiguedad)
+        .exclude(models.Exists(Prestamo.objects.filter(solicitud=models.OuterRef('pk'), activo=True)))
+        .exclude(models.Exists(Legajo.objects.filter(prestamo_actual__solicitud=models.OuterRef('pk'))))
+        .order_by('pk')
+    )
+
+
+def _borrar(queryset) -> int:
+    # Borrado directo, sin cargar las filas ni emitir señales ni seguir la
+    # cascada: por cómo se eligen en ``archivables`` ningún préstamo vivo
+    # apunta a estas filas, y ``archivar`` borra antes los reclamos.
+    return queryset._raw_delete(queryset.db)
+
+
+def _copiar(modelo, filas, **extra):
+    modelo.objects.bulk_create([modelo(**fila, **extra) for fila in filas])
+
+
+def _fechas_originales(queryset, historico, campos):
+    # ``bulk_create`` pisa los campos ``auto_now``; se restauran desde el archivo.
+    queryset.update(**{
+        campo: models.Subquery(historico.objects.filter(pk=models.OuterRef('pk')).values(campo)[:1])
+        for campo in campos
+    })
+
+
+def archivar(antiguedad: timedelta = ANTIGUEDAD, *, lote: int = LOTE, limite: int | None = None,
+             al_confirmar_lote=None) -> int:
+    """Archiva hasta ``limite`` solicitudes (todas si es ``None``) y devuelve
+    cuántas movió. ``al_confirmar_lote(total)`` se llama tras cada lote."""
+
+    total = 0
+    momento = timezone.now()
+    while limite is None or total < limite:
+        tamano = lote if limite is None else min(lote, limite - total)
+        with transaction.atomic():
+            ids = list(archivables(antiguedad).select_for_update().values_list('pk', flat=True)[:tamano])
+            if not ids:
+                break
+            _copiar(SolicitudHistorica, Solicitud.objects.filter(pk__in=ids).values(*CAMPOS_SOLICITUD),
+                    archivado_en=momento)
+            _copiar(SolicitudItemHistorico, SolicitudItem.objects.filter(solicitud_id__in=ids).values(*CAMPOS_ITEM))
+            _copiar(PrestamoHistorico, Prestamo.objects.filter(solicitud_id__in=ids).values(*CAMPOS_PRESTAMO))
+            # Un reclamo que sobrevivió al cierre (la cola sólo limpia los
+            # vencidos al tomar) rompería la clave foránea.
+            cola.liberar(ids)
+            _borrar(Prestamo.objects.filter(solicitud_id__in=ids))
+            _borrar(SolicitudItem.objects.filter(solicitud_id__in=ids))
+            _borrar(Solicitud.objects.filter(pk__in=ids))
+            contadores.ajustar({contadores.clave_solicitudes(Solicitud.ESTADO_CERRADA): -len(ids)})
+        total += len(ids)
+        if al_confirmar_lote is not None:
+            al_confirmar_lote(total)
+    return total
+
+
+def restaurar(ids, *, lote: int = LOTE) -> int:
+    """Devuelve a las tablas vivas las solicitudes archivadas ``ids``."""
+
+    ids = sorted(set(ids))
+    total = 0
+    for inicio in range(0, len(ids), lote):
+        with transaction.atomic():
+            grupo = list(
+                SolicitudHistorica.objects.select_for_update()
+                .filter(pk__in=ids[inicio:inicio + lote])
+                .values_list('pk', flat=True)
+            )
+            if not grupo:
+                continue
+            solicitudes = SolicitudHistorica.objects.filter(pk__in=grupo)
+            _copiar(Solicitud, solicitudes.values(*CAMPOS_SOLICITUD))
+            _copiar(SolicitudItem, SolicitudItemHistorico.objects.filter(solicitud_id__in=grupo).values(*CAMPOS_ITEM))
+            _copiar(Prestamo, PrestamoHistorico.objects.filter(solicitud_id__in=grupo).values(*CAMPOS_PRESTAMO),
+                    activo=False)
+            _fechas_originales(Solicitud.objects.filter(pk__in=grupo), SolicitudHistorica, ['creado_en', 'actualizado_en'])
+            _fechas_originales(
+                Prestamo.objects.filter(solicitud_id__in=grupo),
+                PrestamoHistorico,
+                ['creado_en', 'actualizado_en'],
+            )
+            # Se llevan los ítems y préstamos archivados en cascada.
+            solicitudes.delete()
+            contadores.ajustar({
+                contadores.clave_solicitudes(estado): cantidad
+                for estado, cantidad in Solicitud.objects.filter(pk__in=grupo)
+                .values_list('estado').annotate(n=models.Count('pk')).order_by()
+            })
+        total += len(grupo)
+    return total
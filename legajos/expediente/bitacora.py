@@ -0,0 +1,124 @@
+"""Bitácora de préstamos: historia de cada legajo en ``EventoPrestamo``.
+
+Cada alta y transición de préstamos y cada bloqueo o desbloqueo manual de
+un legajo agrega filas; nunca se modifican ni se borran. Las transiciones
+masivas se registran con un único ``bulk_create`` por lote, dentro de la
+misma transacción que el cambio.
+
+Cada evento guarda el estado en que quedó el legajo, así que el estado en
+un instante es el del último evento hasta ese instante. Con el índice
+``(legajo, ocurrido_en)`` eso es un recorrido de rango por legajo, tanto
+para la línea de custodia de uno (``custodia``, ``tenedor``) como para la
+foto de todo el archivo (``estado_en``), sin reconstruir la historia desde
+los préstamos.
+"""
+
+from django.db import models
+from django.db.models.functions import Coalesce
+
+from .models import EventoPrestamo, Legajo, Prestamo
+
+LOTE = 1000
+
+
+def al_crear_prestamos(sender, prestamos, **kwargs):
+    EventoPrestamo.objects.bulk_create(
+        [
+            EventoPrestamo(
+                legajo_id=prestamo.legajo_id,
+                prestamo_id=prestamo.pk,
+                solicitud_id=prestamo.solicitud_id,
+                usuario_id=prestamo.usuario_id,
+                tipo=EventoPrestamo.TIPO_CREADO,
+                estado_nuevo=prestamo.estado,
+                estado_legajo=Legajo.estado_para(False, prestamo.estado if prestamo.activo else None),
+                ocurrido_en=prestamo.creado_en,
+            )
+            for prestamo in prestamos
+        ],
+        batch_size=LOTE,
+    )
+
+
+def al_transicionar(sender, transicion, filas, momento, **kwargs):
+    definicion = sender.TRANSICIONES[transicion]
+    EventoPrestamo.objects.bulk_create(
+        [
+            EventoPrestamo(
+                legajo_id=fila['legajo_id'],
+                prestamo_id=fila['pk'],
+                solicitud_id=fila['solicitud_id'],
+                usuario_id=fila['usuario_id'],
+                tipo=transicion,
+                estado_anterior=fila['estado'],
+                estado_nuevo=definicion.destino,
+                estado_legajo=Prestamo.estado_legajo_tras(definicion, fila['legajo__bloqueado']),
+                ocurrido_en=momento,
+            )
+            for fila in filas
+        ],
+        batch_size=LOTE,
+    )
+
+
+def registrar_bloqueo(legajo: Legajo) -> EventoPrestamo:
+    """Registra el bloqueo o desbloqueo manual recién guardado de ``legajo``."""
+
+    prestamo = legajo.prestamo_actual
+    return EventoPrestamo.objects.create(
+        legajo=legajo,
+        prestamo_id=legajo.prestamo_actual_id,
+        solicitud_id=prestamo.solicitud_id if prestamo else None,
+        usuario_id=prestamo.usuario_id if prestamo else None,
+        tipo=EventoPrestamo.TIPO_BLOQUEADO if legajo.bloqueado else EventoPrestamo.TIPO_DESBLOQUEADO,
+        estado_legajo=legajo.estado,
+        ocurrido_en=legajo.actualizado_en,
+    )
+
+
+def custodia(legajo, desde=None, hasta=None):
+    """Eventos del legajo en orden cronológico, opcionalmente acotados."""
+
+    eventos = EventoPrestamo.objects.filter(legajo=legajo)
+    if desde is not None:
+        eventos = eventos.filter(ocurrido_en__gte=desde)
+    if hasta is not None:
+        eventos = eventos.filter(ocurrido_en__lte=hasta)
+    return eventos.select_related('usuario').order_by('ocurrido_en', 'pk')
+
+
+def _ultimo_evento(momento):
+    return EventoPrestamo.objects.filter(
+        legajo=models.OuterRef('pk'),
+        ocurrido_en__lte=momento,
+    ).order_by('-ocurrido_en', '-pk')
+
+
+def estado_en(momento, legajos=None):
+    """Legajos que existían en ``momento``, anotados con ``estado_en`` y
+    ``titular_en_id`` (quien lo tenía prestado entonces, si lo estaba)."""
+
+    legajos = Legajo.objects.all() if legajos is None else legajos
+    ultimo = _ultimo_evento(momento)
+    return legajos.filter(creado_en__lte=momento).annotate(
+        estado_en=Coalesce(
+            models.Subquery(ultimo.values('estado_legajo')[:1]),
+            models.Value(Legajo.ESTADO_DISPONIBLE),
+        ),
+    ).annotate(
+        titular_en_id=models.Case(
+            models.When(
+                estado_en=Legajo.ESTADO_PRESTADO,
+                then=models.Subquery(ultimo.values('usuario_id')[:1]),
+            ),
+        ),
+    )
+
+
+def tenedor(legajo, momento):
+    """Usuario que tenía el legajo prestado en ``momento``, o ``None``."""
+
+    evento = custodia(legajo, hasta=momento).last()
+    if evento is None or evento.estado_legajo != Legajo.ESTADO_PRESTADO:
+        return None
+    return evento.usuario
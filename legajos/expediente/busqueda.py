@@ -0,0 +1,127 @@
+"""Búsqueda de legajos por texto con índice de texto completo.
+
+En SQLite se usa una tabla virtual FTS5 de contenido externo sobre
+``expediente_legajo`` que los triggers mantienen sincronizada en cada
+``INSERT``/``UPDATE``/``DELETE``, incluidos los ``bulk_create`` y las
+importaciones masivas. En PostgreSQL se usa un índice GIN sobre la misma
+expresión ``tsvector`` que arma la consulta. Para otros motores se cae a
+``istartswith``/``icontains``.
+
+Algunas migraciones de SQLite reconstruyen la tabla y con ella se pierden los
+triggers: ``manage.py reconstruir_indice_busqueda`` los vuelve a instalar.
+"""
+
+import re
+
+from django.db import connection as default_connection
+from django.db.models import Q
+
+from .models import Legajo
+
+TABLA_FTS = 'expediente_legajo_fts'
+MAX_TERMINOS = 8
+
+SQLITE_INSTALAR = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5(
+        codigo, nombre, descripcion,
+        content='expediente_legajo', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON expediente_legajo BEGIN
+        INSERT INTO {TABLA_FTS}(rowid, codigo, nombre, descripcion)
+        VALUES (new.id, new.codigo, new.nombre, new.descripcion);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON expediente_legajo BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, codigo, nombre, descripcion)
+        VALUES ('delete', old.id, old.codigo, old.nombre, old.descripcion);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au
+    AFTER UPDATE OF codigo, nombre, descripcion ON expediente_legajo BEGIN
+        INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, codigo, nombre, descripcion)
+        VALUES ('delete', old.id, old.codigo, old.nombre, old.descripcion);
+        INSERT INTO {TABLA_FTS}(rowid, codigo, nombre, descripcion)
+        VALUES (new.id, new.codigo, new.nombre, new.descripcion);
+    END
+    """,
+]
+SQLITE_DESINSTALAR = [
+    f'DROP TRIGGER IF EXISTS {TABLA_FTS}_ai',
+    f'DROP TRIGGER IF EXISTS {TABLA_FTS}_ad',
+    f'DROP TRIGGER IF EXISTS {TABLA_FTS}_au',
+    f'DROP TABLE IF EXISTS {TABLA_FTS}',
+]
+
+POSTGRES_DOCUMENTO = "to_tsvector('simple', codigo || ' ' || nombre || ' ' || descripcion)"
+POSTGRES_INSTALAR = [
+    f'CREATE INDEX IF NOT EXISTS legajo_busqueda_gin ON expediente_legajo USING GIN ({POSTGRES_DOCUMENTO})',
+]
+POSTGRES_DESINSTALAR = ['DROP INDEX IF EXISTS legajo_busqueda_gin']
+
+
+def instalar_indice(connection=default_connection) -> None:
+    """Crea (si falta) el índice de texto completo para el motor de ``connection``."""
+
+    sentencias = {'sqlite': SQLITE_INSTALAR, 'postgresql': POSTGRES_INSTALAR}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sentencia in sentencias:
+            cursor.execute(sentencia)
+
+
+def desinstalar_indice(connection=default_connection) -> None:
+    sentencias = {'sqlite': SQLITE_DESINSTALAR, 'postgresql': POSTGRES_DESINSTALAR}.get(connection.vendor, [])
+    with connection.cursor() as cursor:
+        for sentencia in sentencias:
+            cursor.execute(sentencia)
+
+
+def reconstruir_indice(connection=default_connection) -> None:
+    """Reinstala triggers e índice y lo regenera completo desde ``expediente_legajo``."""
+
+    instalar_indice(connection)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('optimize')")
+        elif connection.vendor == 'postgresql':
+            cursor.execute('REINDEX INDEX legajo_busqueda_gin')
+
+
+def terminos(texto: str) -> list[str]:
+    return re.findall(r'\w+', texto or '')[:MAX_TERMINOS]
+
+
+def buscar_legajos(texto: str, limite: int = 20) -> list[Legajo]:
+    """Legajos cuyo código, nombre o descripción tienen palabras que empiezan
+    con cada término de ``texto``, ordenados por relevancia."""
+
+    palabras = terminos(texto)
+    if not palabras:
+        return []
+    if default_connection.vendor == 'sqlite':
+        consulta = ' '.join(f'"{palabra}"*' for palabra in palabras)
+        return list(Legajo.objects.raw(
+            f"SELECT l.id, l.codigo, l.nombre, l.estado FROM {TABLA_FTS} f "
+            f"JOIN expediente_legajo l ON l.id = f.rowid "
+            f"WHERE {TABLA_FTS} MATCH %s "
+            f"ORDER BY bm25({TABLA_FTS}, 10.0, 5.0, 1.0) LIMIT %s",
+            [consulta, limite],
+        ))
+    if default_connection.vendor == 'postgresql':
+        consulta = ' & '.join(f'{palabra}:*' for palabra in palabras)
+        return list(Legajo.objects.raw(
+            f"SELECT id, codigo, nombre, estado FROM expediente_legajo "
+            f"WHERE {POSTGRES_DOCUMENTO} @@ to_tsquery('simple', %s) "
+            f"ORDER BY ts_rank({POSTGRES_DOCUMENTO}, to_tsquery('simple', %s)) DESC, codigo LIMIT %s",
+            [consulta, consulta, limite],
+        ))
+    legajos = Legajo.objects.only('codigo', 'nombre', 'estado')
+    for palabra in palabras:
+        legajos = legajos.filter(Q(codigo__istartswith=palabra) | Q(nombre__icontains=palabra))
+    return list(legajos.order_by('codigo')[:limite])
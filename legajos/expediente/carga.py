@@ -0,0 +1,361 @@
+"""Generador de carga sobre el circuito completo solicitud → preparación →
+entrega → devolución.
+
+Levanta la aplicación WSGI en un servidor local con hilos (o apunta a una
+URL ya levantada) y la recorre con solicitantes y administradores
+simulados, repartidos en un pool de procesos con un hilo por usuario.
+Cada usuario inicia sesión con el formulario real y pide las mismas URLs
+que el navegador, con su cookie de sesión y su token CSRF.
+
+Los perfiles son código: un ``Perfil`` es una función que recibe la
+``Sesion`` del usuario y un ``random.Random`` y ejecuta un ciclo de
+trabajo. ``PERFILES`` define los de serie; ``manage.py generar_carga
+--perfiles modulo.NOMBRE`` permite usar otros.
+
+Cada pedido se registra con su etiqueta, duración y resultado: ``ok``,
+``conflicto`` (otro usuario se adelantó: el legajo ya no estaba
+disponible, la solicitud ya estaba preparada, etc.) o ``error`` (4xx, 5xx
+o falla de conexión). ``resumir`` calcula rendimiento, percentiles y
+tasas por etiqueta.
+"""
+
+import http.client
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from http.cookies import SimpleCookie
+from multiprocessing import get_context
+from typing import Callable
+from urllib.parse import urlencode, urlsplit
+
+import django
+from django.urls import reverse
+
+OK = 'ok'
+CONFLICTO = 'conflicto'
+ERROR = 'error'
+INICIO_SESION = 'login'
+# Segundos que se espera a que todos los usuarios inicien sesión.
+TIEMPO_MAXIMO_INICIO = 300
+
+
+class Sesion:
+    """Cliente HTTP de un usuario simulado, con cookies y registro de tiempos."""
+
+    def __init__(self, url_base: str, registros: list, timeout: float = 30.0):
+        partes = urlsplit(url_base)
+        self.host, self.puerto = partes.hostname, partes.port or 80
+        self.cookies = {}
+        self.registros = registros
+        self.timeout = timeout
+
+    def pedir(self, etiqueta: str, metodo: str, ruta: str, datos=None, *, conflicto=None):
+        """Hace el pedido y lo registra; devuelve ``(status, headers, cuerpo)``.
+
+        ``conflicto(status, headers, cuerpo)`` decide si la respuesta indica
+        que otro usuario se adelantó.
+        """
+
+        cabeceras = {'Host': f'{self.host}:{self.puerto}'}
+        if self.cookies:
+            cabeceras['Cookie'] = '; '.join(f'{clave}={valor}' for clave, valor in self.cookies.items())
+        cuerpo = None
+        if metodo == 'POST':
+            cuerpo = urlencode(datos or {}, doseq=True)
+            cabeceras['Content-Type'] = 'application/x-www-form-urlencoded'
+            cabeceras['X-CSRFToken'] = self.cookies.get('csrftoken', '')
+        elif datos:
+            ruta = f'{ruta}?{urlencode(datos, doseq=True)}'
+        inicio = time.perf_counter()
+        conexion = http.client.HTTPConnection(self.host, self.puerto, timeout=self.timeout)
+        try:
+            conexion.request(metodo, ruta, body=cuerpo, headers=cabeceras)
+            respuesta = conexion.getresponse()
+            contenido = respuesta.read().decode('utf-8', errors='replace')
+            status, headers = respuesta.status, respuesta.headers
+        except (OSError, http.client.HTTPException):
+            self.registros.append((etiqueta, (time.perf_counter() - inicio) * 1000, ERROR, 0))
+            return 0, {}, ''
+        finally:
+            conexion.close()
+        ms = (time.perf_counter() - inicio) * 1000
+        for cookie in headers.get_all('Set-Cookie') or []:
+            for clave, morsel in SimpleCookie(cookie).items():
+                self.cookies[clave] = morsel.value
+        if status >= 400:
+            resultado = ERROR
+        elif conflicto is not None and conflicto(status, headers, contenido):
+            resultado = CONFLICTO
+        else:
+            resultado = OK
+        self.registros.append((etiqueta, ms, resultado, status))
+        return status, headers, contenido
+
+    def get(self, etiqueta, ruta, datos=None, **kwargs):
+        return self.pedir(etiqueta, 'GET', ruta, datos, **kwargs)
+
+    def post(self, etiqueta, ruta, datos=None, **kwargs):
+        return self.pedir(etiqueta, 'POST', ruta, datos, **kwargs)
+
+    def iniciar_sesion(self, usuario: str, contrasena: str) -> bool:
+        ruta = reverse('login')
+        self.get(INICIO_SESION, ruta)
+        status, headers, _ = self.post(INICIO_SESION, ruta, {'username': usuario, 'password': contrasena})
+        return status == 302 and 'sessionid' in self.cookies
+
+
+def _ids(patron: str, html: str) -> list[int]:
+    return [int(valor) for valor in re.findall(patron, html)]
+
+
+def ciclo_solicitante(sesion: Sesion, rng: random.Random) -> None:
+    """Busca legajos, los pide, confirma la recepción de lo preparado y devuelve lo entregado."""
+
+    sesion.get('dashboard', reverse('dashboard'))
+    _, _, cuerpo = sesion.get('legajo_buscar', reverse('legajo_buscar'), {'q': str(rng.randint(1, 999))})
+    try:
+        resultados = json.loads(cuerpo)['resultados']
+    except (ValueError, KeyError):
+        resultados = []
+    disponibles = [legajo['id'] for legajo in resultados if legajo['disponible']]
+    if disponibles:
+        elegidos = rng.sample(disponibles, min(len(disponibles), rng.randint(1, 5)))
+        sesion.post('carrito_agregar', reverse('carrito_agregar'), {'legajo': elegidos})
+        # Si otro usuario reservó alguno antes, la confirmación vuelve al carrito.
+        carrito = reverse('solicitud_create')
+        _, headers, _ = sesion.post(
+            'carrito_confirmar',
+            reverse('carrito_confirmar'),
+            conflicto=lambda status, headers, cuerpo: headers.get('Location', '').endswith(carrito),
+        )
+        if headers and headers.get('Location', '').endswith(carrito):
+            for legajo_id in elegidos:
+                sesion.post('carrito_quitar', reverse('carrito_quitar', args=[legajo_id]))
+
+    _, _, listado = sesion.get('solicitud_list', reverse('solicitud_list'))
+    for solicitud_id in _ids(r'solicitudes/(\d+)/">Solicitud #\d+ - preparada<', listado):
+        sesion.post('solicitud_confirmar_entrega', reverse('solicitud_confirmar_entrega', args=[solicitud_id]))
+    _, _, formulario = sesion.get('devolucion_create', reverse('devolucion_create'))
+    prestamos = _ids(r'name="prestamos" value="(\d+)"', formulario)
+    if prestamos:
+        # El formulario vuelve a mostrarse (200) si algún préstamo ya no puede devolverse.
+        sesion.post(
+            'devolucion_create_post',
+            reverse('devolucion_create'),
+            {'prestamos': prestamos},
+            conflicto=lambda status, headers, cuerpo: status == 200,
+        )
+
+
+def ciclo_administrador(sesion: Sesion, rng: random.Random) -> None:
+    """Toma la siguiente solicitud de la cola, la prepara y confirma una devolución pendiente."""
+
+    _, headers, _ = sesion.post(
+        'solicitud_cola',
+        reverse('solicitud_cola'),
+        {'cantidad': 1},
+        # Sin solicitudes libres la cola vuelve a sí misma.
+        conflicto=lambda status, headers, cuerpo: headers.get('Location', '').endswith(reverse('solicitud_cola')),
+    )
+    destino = headers.get('Location', '') if headers else ''
+    tomada = re.search(r'/solicitudes/(\d+)/$', destino)
+    if tomada:
+        solicitud_id = int(tomada.group(1))
+        _, _, detalle = sesion.get('solicitud_detail', reverse('solicitud_detail', args=[solicitud_id]))
+        pendientes = _ids(r'name="prestamos_listos" value="(\d+)"', detalle)
+        if pendientes:
+            encontrados = [prestamo for prestamo in pendientes if rng.random() > 0.05]
+            sesion.post(
+                'solicitud_preparar',
+                reverse('solicitud_preparar', args=[solicitud_id]),
+                {'prestamos_listos': encontrados},
+            )
+
+    _, _, devoluciones = sesion.get('devolucion_admin_list', reverse('devolucion_admin_list'))
+    pendientes = _ids(r'devoluciones/(\d+)/">Ver detalle', devoluciones)
+    if pendientes:
+        devolucion_id = rng.choice(pendientes[:10])
+        confirmar = reverse('devolucion_confirmar', args=[devolucion_id])
+        _, _, detalle = sesion.get(
+            'devolucion_detail',
+            reverse('devolucion_detail', args=[devolucion_id]),
+            conflicto=lambda status, headers, cuerpo: confirmar not in cuerpo,
+        )
+        if confirmar in detalle:
+            sesion.post('devolucion_confirmar', confirmar)
+
+
+@dataclass
+class Perfil:
+    rol: str  # 'solicitante' o 'administrador'
+    ciclo: Callable[[Sesion, random.Random], None]
+    # Pausa entre ciclos (segundos, mínimo y máximo), el "tiempo de lectura".
+    pausa: tuple[float, float] = (0.0, 1.0)
+
+
+PERFILES = {
+    'solicitante': Perfil('solicitante', ciclo_solicitante),
+    'administrador': Perfil('administrador', ciclo_administrador, pausa=(0.0, 0.5)),
+}
+
+
+@dataclass
+class PlanDeCarga:
+    url: str
+    usuarios: list  # [(nombre de usuario, nombre de perfil)]
+    contrasena: str
+    duracion: float = 60.0
+    rampa: float = 5.0
+    procesos: int = field(default_factory=lambda: os.cpu_count() or 1)
+    semilla: int = 0
+    perfiles: str = 'expediente.carga.PERFILES'
+
+
+def asignar_perfiles(perfiles: dict, solicitantes: list, administradores: list) -> list[tuple[str, str]]:
+    """Reparte los usuarios entre los perfiles de su rol, en ronda."""
+
+    usuarios = []
+    for rol, nombres in (('solicitante', solicitantes), ('administrador', administradores)):
+        del_rol = [nombre for nombre, perfil in perfiles.items() if perfil.rol == rol]
+        if nombres and not del_rol:
+            raise ValueError(f'No hay perfiles para el rol {rol}.')
+        usuarios += [(nombre, del_rol[indice % len(del_rol)]) for indice, nombre in enumerate(nombres)]
+    return usuarios
+
+
+def _simular_usuario(plan, perfil, usuario, desfase, barrera, registros):
+    rng = random.Random(f'{plan.semilla}:{usuario}')
+    sesion = Sesion(plan.url, registros)
+    conectado = sesion.iniciar_sesion(usuario, plan.contrasena)
+    # Los inicios de sesión (PBKDF2 es caro a propósito) quedan fuera de la
+    # ventana medida: todos los usuarios arrancan juntos desde la barrera.
+    try:
+        barrera.wait()
+    except threading.BrokenBarrierError:
+        pass
+    comienzo = time.time()
+    if not conectado:
+        return
+    time.sleep(desfase)
+    fin = comienzo + plan.rampa + plan.duracion
+    while time.time() < fin:
+        perfil.ciclo(sesion, rng)
+        time.sleep(rng.uniform(*perfil.pausa))
+
+
+def _ejecutar_proceso(plan, usuarios, barrera):
+    """Corre en un proceso del pool: un hilo por usuario."""
+
+    from django.utils.module_loading import import_string
+
+    perfiles = import_string(plan.perfiles)
+    registros = []
+    hilos = []
+    for indice, (usuario, nombre_perfil) in usuarios:
+        desfase = plan.rampa * indice / len(plan.usuarios)
+        hilo = threading.Thread(
+            target=_simular_usuario,
+            args=(plan, perfiles[nombre_perfil], usuario, desfase, barrera, registros),
+            daemon=True,
+        )
+        hilo.start()
+        hilos.append(hilo)
+    for hilo in hilos:
+        hilo.join()
+    return registros
+
+
+def _iniciar_proceso(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    django.setup()
+
+
+def ejecutar(plan: PlanDeCarga) -> list[tuple]:
+    """Reparte los usuarios entre ``plan.procesos`` procesos y junta los registros."""
+
+    procesos = max(1, min(plan.procesos, len(plan.usuarios)))
+    repartos = [[] for _ in range(procesos)]
+    for indice, usuario in enumerate(plan.usuarios):
+        repartos[indice % procesos].append((indice, usuario))
+    # ``spawn``: el proceso padre puede tener el servidor corriendo en hilos.
+    contexto = get_context('spawn')
+    with contexto.Manager() as manager, contexto.Pool(
+        procesos,
+        initializer=_iniciar_proceso,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'legajos.settings'),),
+    ) as pool:
+        barrera = manager.Barrier(len(plan.usuarios), timeout=TIEMPO_MAXIMO_INICIO)
+        partes = pool.starmap(
+            _ejecutar_proceso,
+            [(plan, reparto, barrera) for reparto in repartos],
+            chunksize=1,
+        )
+    return [registro for parte in partes for registro in parte]
+
+
+def percentil(valores_ordenados, p: float) -> float:
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+
+    if not valores_ordenados:
+        return 0.0
+    rango = max(1, math.ceil(p / 100 * len(valores_ordenados)))
+    return valores_ordenados[rango - 1]
+
+
+def resumir(registros, duracion: float) -> dict:
+    """Por etiqueta (y ``total``): cantidad, pedidos por segundo, p50/p95/p99
+    en ms y tasas de conflicto y error.
+
+    Los inicios de sesión se informan aparte y no cuentan en el total, porque
+    ocurren antes de la ventana de ``duracion`` segundos.
+    """
+
+    por_etiqueta = defaultdict(list)
+    for etiqueta, ms, resultado, _ in registros:
+        por_etiqueta[etiqueta].append((ms, resultado))
+        if etiqueta != INICIO_SESION:
+            por_etiqueta['total'].append((ms, resultado))
+    resumen = {}
+    for etiqueta, filas in sorted(por_etiqueta.items()):
+        tiempos = sorted(ms for ms, _ in filas)
+        cantidad = len(filas)
+        resumen[etiqueta] = {
+            'pedidos': cantidad,
+            'por_segundo': round(cantidad / duracion, 2) if duracion else 0.0,
+            'p50': round(percentil(tiempos, 50), 1),
+            'p95': round(percentil(tiempos, 95), 1),
+            'p99': round(percentil(tiempos, 99), 1),
+            'conflictos': round(sum(resultado == CONFLICTO for _, resultado in filas) / cantidad, 4),
+            'errores': round(sum(resultado == ERROR for _, resultado in filas) / cantidad, 4),
+        }
+    return resumen
+
+
+class Servidor:
+    """La aplicación WSGI de Django en un servidor local con un hilo por pedido."""
+
+    def __init__(self, host: str = '127.0.0.1', puerto: int = 0):
+        from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+
+        class Silencioso(WSGIRequestHandler):
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadedWSGIServer((host, puerto), Silencioso, allow_reuse_address=True)
+        self.httpd.set_app(get_internal_wsgi_application())
+        self.url = f'http://{host}:{self.httpd.server_address[1]}'
+        self.hilo = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,98 @@
+"""Carrito de solicitud guardado en la sesión del usuario.
+
+El usuario va agregando legajos de a uno (autocompletado) o pegando una
+lista de códigos; cada alta consulta sólo esos legajos por su índice único
+y el carrito guarda únicamente los ids. Al confirmar se convierte en una
+``Solicitud`` con ``crear_solicitud``.
+"""
+
+import re
+
+from .models import Legajo
+
+SESSION_KEY = 'carrito_solicitud'
+MAX_LEGAJOS = 1000
+
+
+def separar_codigos(texto: str) -> list[str]:
+    """Códigos de una lista pegada, separados por espacios, comas, punto y coma o renglones."""
+
+    vistos = {}
+    for codigo in re.split(r'[\s,;]+', texto or ''):
+        if codigo:
+            vistos.setdefault(codigo, None)
+    return list(vistos)
+
+
+class Carrito:
+    def __init__(self, session):
+        self.session = session
+        self.ids = list(session.get(SESSION_KEY, []))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _guardar(self) -> None:
+        self.session[SESSION_KEY] = self.ids
+
+    def _agregar(self, legajos) -> tuple[list[str], dict[str, str]]:
+        agregados, rechazados = [], {}
+        presentes = set(self.ids)
+        for legajo in legajos:
+            if legajo.pk in presentes:
+                continue
+            if legajo.estado != Legajo.ESTADO_DISPONIBLE:
+                rechazados[legajo.codigo] = legajo.get_estado_display().lower()
+            elif len(self.ids) >= MAX_LEGAJOS:
+                rechazados[legajo.codigo] = f'el carrito admite hasta {MAX_LEGAJOS} legajos'
+            else:
+                self.ids.append(legajo.pk)
+                presentes.add(legajo.pk)
+                agregados.append(legajo.codigo)
+        self._guardar()
+        return agregados, rechazados
+
+    def agregar_codigos(self, codigos) -> tuple[list[str], dict[str, str]]:
+        """Agrega los legajos disponibles de ``codigos``.
+
+        Devuelve los códigos agregados y un diccionario código -> motivo
+        con los que no se pudieron agregar.
+        """
+
+        codigos = list(codigos)
+        legajos = list(Legajo.objects.filter(codigo__in=codigos).only('codigo', 'estado'))
+        agregados, rechazados = self._agregar(legajos)
+        existentes = {legajo.codigo for legajo in legajos}
+        for codigo in codigos:
+            if codigo not in existentes:
+                rechazados[codigo] = 'no existe'
+        return agregados, rechazados
+
+    def agregar_ids(self, ids) -> tuple[list[str], dict[str, str]]:
+        return self._agregar(Legajo.objects.filter(pk__in=ids).only('codigo', 'estado'))
+
+    def quitar(self, legajo_id: int) -> None:
+        self.ids = [pk for pk in self.ids if pk != legajo_id]
+        self._guardar()
+
+    def vaciar(self) -> None:
+        self.ids = []
+        self.session.pop(SESSION_KEY, None)
+
+    def _conservar(self, existentes) -> None:
+        # Un legajo borrado después de agregarlo no volvería a mostrarse ni
+        # podría quitarse, y haría fallar cada confirmación.
+        existentes = set(existentes)
+        if len(existentes) != len(self.ids):
+            self.ids = [pk for pk in self.ids if pk in existentes]
+            self._guardar()
+
+    def descartar_inexistentes(self) -> None:
+        self._conservar(Legajo.objects.filter(pk__in=self.ids).values_list('pk', flat=True))
+
+    def legajos(self) -> list[Legajo]:
+        """Los legajos del carrito; descarta de paso los que ya no existen."""
+
+        legajos = list(Legajo.objects.filter(pk__in=self.ids).con_disponibilidad().order_by('codigo'))
+        self._conservar(legajo.pk for legajo in legajos)
+        return legajos
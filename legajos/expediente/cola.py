@@ -0,0 +1,106 @@
+"""Cola de preparación: cada administrador toma solicitudes pendientes
+distintas para que dos archivistas no busquen los mismos legajos.
+
+Tomar una solicitud crea un ``ReclamoSolicitud`` con vencimiento; el
+reclamo se libera al prepararla y, si el administrador la abandona, vence
+solo a los ``DURACION_RECLAMO``. Como la solicitud es la clave primaria
+del reclamo, dos administradores nunca pueden tener la misma.
+
+En bases con ``SELECT ... FOR UPDATE SKIP LOCKED`` (PostgreSQL) los
+candidatos se bloquean y los que otra transacción está tomando se saltean,
+así que los administradores concurrentes reciben solicitudes distintas sin
+esperarse. En SQLite, que no lo tiene, se insertan los reclamos con
+``ignore_conflicts`` y se relee cuáles quedaron propios; los que ganó otro
+se reemplazan en el intento siguiente.
+"""
+
+from datetime import timedelta
+
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+from .models import ReclamoSolicitud, Solicitud
+
+DURACION_RECLAMO = timedelta(minutes=15)
+MAX_RECLAMOS = 20
+# Intentos para completar ``cantidad`` cuando otros administradores ganan
+# los mismos candidatos (sólo sin SKIP LOCKED).
+INTENTOS = 3
+
+
+def reclamos_vigentes(momento=None):
+    return ReclamoSolicitud.objects.filter(vence_en__gt=momento or timezone.now())
+
+
+def _candidatas(ahora):
+    return (
+        Solicitud.objects.filter(estado=Solicitud.ESTADO_PENDIENTE)
+        .exclude(models.Exists(reclamos_vigentes(ahora).filter(solicitud=models.OuterRef('pk'))))
+        .order_by('creado_en', 'pk')
+    )
+
+
+def reclamar(administrador, cantidad: int = 1) -> list[Solicitud]:
+    """Toma hasta ``cantidad`` solicitudes pendientes libres, las más antiguas primero.
+
+    Devuelve las solicitudes tomadas; puede ser menos que ``cantidad`` (o
+    ninguna) si no quedan libres.
+    """
+
+    cantidad = min(max(cantidad, 1), MAX_RECLAMOS)
+    ahora = timezone.now()
+    vence = ahora + DURACION_RECLAMO
+    ReclamoSolicitud.objects.filter(vence_en__lte=ahora).delete()
+
+    tomadas = []
+    for _ in range(INTENTOS):
+        faltan = cantidad - len(tomadas)
+        if not faltan:
+            break
+        with transaction.atomic():
+            candidatas = _candidatas(ahora)
+            if connection.features.has_select_for_update_skip_locked:
+                candidatas = candidatas.select_for_update(skip_locked=True, of=('self',))
+            ids = list(candidatas.values_list('pk', flat=True)[:faltan])
+            if not ids:
+                break
+            ReclamoSolicitud.objects.bulk_create(
+                [ReclamoSolicitud(solicitud_id=pk, administrador=administrador, vence_en=vence) for pk in ids],
+                ignore_conflicts=True,
+            )
+            propias = set(
+                ReclamoSolicitud.objects.filter(solicitud_id__in=ids, administrador=administrador, vence_en=vence)
+                .values_list('solicitud_id', flat=True)
+            )
+        tomadas += [pk for pk in ids if pk in propias]
+    return list(Solicitud.objects.filter(pk__in=tomadas).select_related('usuario').order_by('creado_en', 'pk'))
+
+
+def reclamo_ajeno(solicitud_id: int, administrador) -> ReclamoSolicitud | None:
+    """El reclamo vigente de otro administrador sobre la solicitud, si lo hay."""
+
+    return (
+        reclamos_vigentes()
+        .filter(solicitud_id=solicitud_id)
+        .exclude(administrador=administrador)
+        .select_related('administrador')
+        .first()
+    )
+
+
+def liberar(solicitud_ids) -> int:
+    return ReclamoSolicitud.objects.filter(solicitud_id__in=solicitud_ids).delete()[0]
+
+
+def cola_de(administrador):
+    """Solicitudes que el administrador tiene tomadas y siguen pendientes."""
+
+    return (
+        Solicitud.objects.filter(
+            reclamo__administrador=administrador,
+            reclamo__vence_en__gt=timezone.now(),
+            estado=Solicitud.ESTADO_PENDIENTE,
+        )
+        .select_related('usuario', 'reclamo')
+        .order_by('creado_en', 'pk')
+    )
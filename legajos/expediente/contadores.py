@@ -0,0 +1,185 @@
+"""Contadores precalculados para el dashboard.
+
+Los valores viven en la tabla ``Contador`` y se ajustan con incrementos
+atómicos (``UPDATE ... SET valor = valor + n``) desde los receptores de
+señales de este módulo, dentro de la misma transacción que el cambio que
+los origina. ``reconciliar_contadores`` los recalcula desde cero.
+"""
+
+from collections import Counter
+
+from django.db import connection, models, transaction
+
+from .models import Contador, Legajo, Prestamo, Solicitud
+
+CLAVE_LEGAJOS = 'legajos'
+
+# Estados de solicitud que todavía tienen préstamos activos: la solicitud
+# pendiente tiene préstamos pendientes, la preparada préstamos listos y la
+# entregada al menos uno en poder del usuario hasta que se cierra.
+ESTADOS_SOLICITUD_CON_PRESTAMOS_ACTIVOS = (
+    Solicitud.ESTADO_PENDIENTE,
+    Solicitud.ESTADO_PREPARADA,
+    Solicitud.ESTADO_ENTREGADA,
+)
+
+
+def clave_solicitudes(estado: str) -> str:
+    return f'solicitudes:{estado}'
+
+
+def clave_usuario(usuario_id, nombre: str) -> str:
+    return f'usuario:{usuario_id}:{nombre}'
+
+
+def ajustar(deltas) -> None:
+    """Suma cada delta a su contador, creando en cero las claves nuevas.
+
+    En SQLite y PostgreSQL todos los deltas se aplican con un único
+    ``INSERT ... ON CONFLICT DO UPDATE``.
+    """
+
+    deltas = {clave: delta for clave, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    if connection.vendor in ('sqlite', 'postgresql'):
+        tabla = connection.ops.quote_name(Contador._meta.db_table)
+        filas = ', '.join(['(%s, %s)'] * len(deltas))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {tabla} (clave, valor) VALUES {filas} '
+                f'ON CONFLICT (clave) DO UPDATE SET valor = {tabla}.valor + excluded.valor',
+                [valor for item in sorted(deltas.items()) for valor in item],
+            )
+        return
+    for clave, delta in deltas.items():
+        actualizados = Contador.objects.filter(clave=clave).update(valor=models.F('valor') + delta)
+        if not actualizados:
+            Contador.objects.bulk_create([Contador(clave=clave)], ignore_conflicts=True)
+            Contador.objects.filter(clave=clave).update(valor=models.F('valor') + delta)
+
+
+def leer(*claves) -> dict[str, int]:
+    """Lee varios contadores en una sola consulta; los ausentes valen 0."""
+
+    valores = dict.fromkeys(claves, 0)
+    valores.update(Contador.objects.filter(clave__in=claves).values_list('clave', 'valor'))
+    return valores
+
+
+def resumen_administrador() -> dict[str, int]:
+    claves_estado = [clave_solicitudes(estado) for estado in ESTADOS_SOLICITUD_CON_PRESTAMOS_ACTIVOS]
+    valores = leer(CLAVE_LEGAJOS, *claves_estado)
+    return {
+        'total_legajos': valores[CLAVE_LEGAJOS],
+        'solicitudes_pendientes': valores[clave_solicitudes(Solicitud.ESTADO_PENDIENTE)],
+        'prestamos_activos': sum(valores[clave] for clave in claves_estado),
+    }
+
+
+def resumen_usuario(usuario_id) -> dict[str, int]:
+    solicitudes = clave_usuario(usuario_id, 'solicitudes_activas')
+    prestamos = clave_usuario(usuario_id, 'prestamos_activos')
+    valores = leer(solicitudes, prestamos)
+    return {
+        'solicitudes_activas': valores[solicitudes],
+        'prestamos_activos': valores[prestamos],
+    }
+
+
+def calcular_contadores() -> dict[str, int]:
+    """Recalcula todos los contadores desde las tablas de origen."""
+
+    valores = {CLAVE_LEGAJOS: Legajo.objects.count()}
+    for estado, _ in Solicitud.ESTADOS:
+        valores[clave_solicitudes(estado)] = 0
+    por_estado = Solicitud.objects.values_list('estado').annotate(n=models.Count('pk')).order_by()
+    for estado, cantidad in por_estado:
+        valores[clave_solicitudes(estado)] = cantidad
+    activas = (
+        Solicitud.objects.exclude(estado=Solicitud.ESTADO_CERRADA)
+        .values_list('usuario').annotate(n=models.Count('pk')).order_by()
+    )
+    for usuario_id, cantidad in activas:
+        valores[clave_usuario(usuario_id, 'solicitudes_activas')] = cantidad
+    prestamos = (
+        Prestamo.objects.filter(activo=True)
+        .values_list('usuario').annotate(n=models.Count('pk')).order_by()
+    )
+    for usuario_id, cantidad in prestamos:
+        valores[clave_usuario(usuario_id, 'prestamos_activos')] = cantidad
+    return valores
+
+
+@transaction.atomic
+def reconciliar() -> dict[str, tuple[int, int]]:
+    """Reescribe los contadores con los valores recalculados.
+
+    Devuelve las diferencias encontradas como ``{clave: (anterior, nuevo)}``.
+    """
+
+    esperados = calcular_contadores()
+    actuales = dict(Contador.objects.select_for_update().values_list('clave', 'valor'))
+    for clave in actuales.keys() - esperados.keys():
+        esperados[clave] = 0
+    diferencias = {
+        clave: (actuales.get(clave, 0), valor)
+        for clave, valor in esperados.items()
+        if actuales.get(clave) != valor
+    }
+    Contador.objects.bulk_create(
+        [Contador(clave=clave, valor=esperados[clave]) for clave in diferencias],
+        update_conflicts=True,
+        unique_fields=['clave'],
+        update_fields=['valor'],
+    )
+    return diferencias
+
+
+def al_guardar_legajo(sender, instance, created, **kwargs):
+    if created:
+        ajustar({CLAVE_LEGAJOS: 1})
+
+
+def al_borrar_legajo(sender, instance, **kwargs):
+    ajustar({CLAVE_LEGAJOS: -1})
+
+
+def al_guardar_solicitud(sender, instance, created, **kwargs):
+    if created:
+        ajustar({
+            clave_solicitudes(instance.estado): 1,
+            clave_usuario(instance.usuario_id, 'solicitudes_activas'): int(instance.estado != Solicitud.ESTADO_CERRADA),
+        })
+
+
+def al_borrar_solicitud(sender, instance, **kwargs):
+    ajustar({
+        clave_solicitudes(instance.estado): -1,
+        clave_usuario(instance.usuario_id, 'solicitudes_activas'): -int(instance.estado != Solicitud.ESTADO_CERRADA),
+    })
+
+
+def al_crear_prestamos(sender, prestamos, **kwargs):
+    ajustar(Counter(
+        clave_usuario(prestamo.usuario_id, 'prestamos_activos')
+        for prestamo in prestamos
+        if prestamo.activo
+    ))
+
+
+def al_transicionar(sender, transicion, filas, **kwargs):
+    destino = sender.TRANSICIONES[transicion].destino
+    deltas = Counter()
+    if sender is Solicitud:
+        for fila in filas:
+            deltas[clave_solicitudes(fila['estado'])] -= 1
+            deltas[clave_solicitudes(destino)] += 1
+            if destino == Solicitud.ESTADO_CERRADA:
+                deltas[clave_usuario(fila['usuario_id'], 'solicitudes_activas')] -= 1
+    elif sender is Prestamo:
+        activo_despues = destino in Prestamo.ESTADOS_ACTIVOS
+        for fila in filas:
+            activo_antes = fila['estado'] in Prestamo.ESTADOS_ACTIVOS
+            deltas[clave_usuario(fila['usuario_id'], 'prestamos_activos')] += activo_despues - activo_antes
+    ajustar(deltas)
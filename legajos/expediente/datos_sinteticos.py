@@ -0,0 +1,268 @@
+"""Generación de un archivo sintético para pruebas de rendimiento.
+
+Crea usuarios, legajos, solicitudes, ítems, préstamos y devoluciones con
+``bulk_create`` por lotes, respetando las invariantes del circuito: cada
+legajo tiene a lo sumo un préstamo activo, su ``estado`` y
+``prestamo_actual`` coinciden con ese préstamo y los extraviados quedan
+bloqueados. Como ``bulk_create`` no emite señales, la bitácora de
+préstamos se escribe a mano y al final se reconcilian los contadores; el
+índice de búsqueda lo mantienen sus triggers.
+
+La misma función arma los datos de las pruebas (a escala chica) y, con
+``manage.py generar_datos``, archivos de millones de filas.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group
+from django.db import models, transaction
+from django.utils import timezone
+
+from . import contadores
+from .models import Devolucion, EventoPrestamo, Legajo, Prestamo, Solicitud, SolicitudItem
+from .permissions import ADMIN_GROUP_NAME, USERS_GROUP_NAME
+
+# Proporción de solicitudes en cada estado; la mayoría ya está cerrada.
+DISTRIBUCION_SOLICITUDES = {
+    Solicitud.ESTADO_CERRADA: 0.80,
+    Solicitud.ESTADO_CANCELADA: 0.03,
+    Solicitud.ESTADO_ENTREGADA: 0.09,
+    Solicitud.ESTADO_PREPARADA: 0.03,
+    Solicitud.ESTADO_PENDIENTE: 0.05,
+}
+# Fracción de solicitudes entregadas con una devolución pendiente de confirmar.
+PROPORCION_DEVOLUCIONES_PENDIENTES = 0.2
+CONTRASENA = 'sintetico'
+
+
+class DatosInsuficientes(ValueError):
+    """Los legajos no alcanzan para los préstamos activos y extraviados pedidos."""
+
+
+@dataclass
+class ResumenGeneracion:
+    usuarios: int = 0
+    legajos: int = 0
+    solicitudes: int = 0
+    prestamos: int = 0
+    devoluciones: int = 0
+    por_estado: dict = field(default_factory=dict)
+
+
+def _repartir(total: int, partes: int) -> list[int]:
+    base, resto = divmod(total, partes)
+    return [base + (indice < resto) for indice in range(partes)]
+
+
+def _planificar_solicitudes(rng, solicitudes: int, prestamos: int):
+    """Lista de ``(estado, cantidad_de_prestamos)`` en orden aleatorio."""
+
+    estados = []
+    for estado, proporcion in DISTRIBUCION_SOLICITUDES.items():
+        estados += [estado] * round(solicitudes * proporcion)
+    estados = (estados + [Solicitud.ESTADO_CERRADA] * solicitudes)[:solicitudes]
+    rng.shuffle(estados)
+    return list(zip(estados, _repartir(prestamos, solicitudes)))
+
+
+def crear_usuarios(solicitantes: int, prefijo: str, administradores: int = 1) -> tuple[list[str], list[str]]:
+    """Crea (si faltan) usuarios solicitantes y administradores con ``CONTRASENA``.
+
+    Devuelve los nombres de los administradores y de los solicitantes.
+    """
+
+    User = get_user_model()
+    clave = make_password(CONTRASENA)
+    prefijo = prefijo.lower()
+    admins = [f'{prefijo}_administrador' + (f'{indice:02d}' if indice else '') for indice in range(administradores)]
+    nombres = [f'{prefijo}_solicitante{indice:05d}' for indice in range(solicitantes)]
+    User.objects.bulk_create(
+        [User(username=nombre, password=clave, is_staff=True) for nombre in admins]
+        + [User(username=nombre, password=clave) for nombre in nombres],
+        ignore_conflicts=True,
+    )
+    ids = dict(User.objects.filter(username__in=[*admins, *nombres]).values_list('username', 'pk'))
+    grupos = {nombre: Group.objects.get_or_create(name=nombre)[0] for nombre in (ADMIN_GROUP_NAME, USERS_GROUP_NAME)}
+    Pertenencia = User.groups.through
+    Pertenencia.objects.bulk_create(
+        [Pertenencia(user_id=ids[nombre], group_id=grupos[ADMIN_GROUP_NAME].pk) for nombre in admins]
+        + [Pertenencia(user_id=ids[nombre], group_id=grupos[USERS_GROUP_NAME].pk) for nombre in nombres],
+        ignore_conflicts=True,
+    )
+    return admins, nombres
+
+
+def generar_archivo(
+    *,
+    legajos: int = 1000,
+    solicitudes: int = 200,
+    prestamos: int = 2000,
+    usuarios: int = 50,
+    semilla: int = 0,
+    lote: int = 5000,
+    prefijo: str = 'SIN',
+    al_avanzar=None,
+) -> ResumenGeneracion:
+    """Genera el archivo sintético; ``al_avanzar(mensaje)`` informa el progreso."""
+
+    if min(legajos, solicitudes, usuarios) < 1 or prestamos < solicitudes:
+        raise ValueError('Se necesita al menos un legajo, una solicitud, un usuario y un préstamo por solicitud.')
+    informar = al_avanzar or (lambda mensaje: None)
+    rng = random.Random(semilla)
+    ahora = timezone.now()
+    plan = _planificar_solicitudes(rng, solicitudes, prestamos)
+
+    activos = sum(
+        cantidad for estado, cantidad in plan
+        if estado in contadores.ESTADOS_SOLICITUD_CON_PRESTAMOS_ACTIVOS
+    )
+    extraviados = sum(cantidad for estado, cantidad in plan if estado == Solicitud.ESTADO_CANCELADA)
+    if activos + extraviados > legajos:
+        raise DatosInsuficientes(
+            f'Hacen falta al menos {activos + extraviados} legajos para {activos} préstamos activos '
+            f'y {extraviados} extraviados.'
+        )
+
+    resumen = ResumenGeneracion(usuarios=usuarios, por_estado=dict.fromkeys(DISTRIBUCION_SOLICITUDES, 0))
+    _, nombres = crear_usuarios(usuarios, prefijo)
+    usuario_ids = list(get_user_model().objects.filter(username__in=nombres).values_list('pk', flat=True))
+    informar(f'{usuarios} usuarios.')
+
+    # Los legajos con préstamo activo y los extraviados salen de conjuntos
+    # disjuntos; el historial devuelto puede caer en cualquier otro.
+    indices = rng.sample(range(legajos), activos + extraviados)
+    indices_extraviados = set(indices[activos:])
+    legajo_ids = []
+    for inicio in range(0, legajos, lote):
+        creados = Legajo.objects.bulk_create(
+            Legajo(
+                codigo=f'{prefijo}{indice:07d}',
+                nombre=f'Legajo sintético {indice}',
+                descripcion=f'Caja {indice // 100} estante {indice % 100}',
+                bloqueado=indice in indices_extraviados,
+                estado=Legajo.ESTADO_EXTRAVIADO if indice in indices_extraviados else Legajo.ESTADO_DISPONIBLE,
+            )
+            for indice in range(inicio, min(inicio + lote, legajos))
+        )
+        legajo_ids += [legajo.pk for legajo in creados]
+        resumen.legajos += len(creados)
+        informar(f'{resumen.legajos} legajos.')
+    pool_activos = iter([legajo_ids[indice] for indice in indices[:activos]])
+    pool_extraviados = iter([legajo_ids[indice] for indice in indices[activos:]])
+    historicos = [legajo_ids[indice] for indice in range(legajos) if indice not in indices_extraviados]
+
+    # Cada lote de solicitudes agrupa aproximadamente ``lote`` préstamos.
+    solicitudes_por_lote = max(1, lote * solicitudes // prestamos)
+    for inicio in range(0, len(plan), solicitudes_por_lote):
+        with transaction.atomic():
+            _crear_lote(plan[inicio:inicio + solicitudes_por_lote], rng, ahora, usuario_ids,
+                        pool_activos, pool_extraviados, historicos, resumen)
+        informar(f'{resumen.solicitudes} solicitudes, {resumen.prestamos} préstamos.')
+
+    contadores.reconciliar()
+    return resumen
+
+
+def _eventos(prestamo, creado, ahora):
+    # La bitácora que habría dejado el circuito; la preparación se ubica a
+    # mitad de camino hacia la entrega (o a lo sumo un día después del alta).
+    comun = {'legajo_id': prestamo.legajo_id, 'prestamo_id': prestamo.pk, 'solicitud_id': prestamo.solicitud_id,
+             'usuario_id': prestamo.usuario_id}
+    yield EventoPrestamo(**comun, tipo=EventoPrestamo.TIPO_CREADO, estado_nuevo=Prestamo.ESTADO_PENDIENTE,
+                         estado_legajo=Legajo.ESTADO_RESERVADO, ocurrido_en=creado)
+    if prestamo.estado == Prestamo.ESTADO_PENDIENTE:
+        return
+    preparado = creado + ((prestamo.entregado_en - creado) / 2 if prestamo.entregado_en
+                          else min((ahora - creado) / 2, timedelta(days=1)))
+    if prestamo.estado == Prestamo.ESTADO_EXTRAVIADO:
+        yield EventoPrestamo(**comun, tipo='extraviado', estado_anterior=Prestamo.ESTADO_PENDIENTE,
+                             estado_nuevo=Prestamo.ESTADO_EXTRAVIADO, estado_legajo=Legajo.ESTADO_EXTRAVIADO,
+                             ocurrido_en=preparado)
+        return
+    yield EventoPrestamo(**comun, tipo='listo', estado_anterior=Prestamo.ESTADO_PENDIENTE,
+                         estado_nuevo=Prestamo.ESTADO_LISTO, estado_legajo=Legajo.ESTADO_RESERVADO,
+                         ocurrido_en=preparado)
+    if prestamo.entregado_en:
+        yield EventoPrestamo(**comun, tipo='entregado', estado_anterior=Prestamo.ESTADO_LISTO,
+                             estado_nuevo=Prestamo.ESTADO_ENTREGADO, estado_legajo=Legajo.ESTADO_PRESTADO,
+                             ocurrido_en=prestamo.entregado_en)
+    if prestamo.devuelto_en:
+        yield EventoPrestamo(**comun, tipo='devuelto', estado_anterior=Prestamo.ESTADO_ENTREGADO,
+                             estado_nuevo=Prestamo.ESTADO_DEVUELTO, estado_legajo=Legajo.ESTADO_DISPONIBLE,
+                             ocurrido_en=prestamo.devuelto_en)
+
+
+def _crear_lote(plan, rng, ahora, usuario_ids, pool_activos, pool_extraviados, historicos, resumen):
+    lote_solicitudes, fechas = [], []
+    for estado, _ in plan:
+        activa = estado in contadores.ESTADOS_SOLICITUD_CON_PRESTAMOS_ACTIVOS
+        fechas.append(ahora - timedelta(days=rng.uniform(0, 30) if activa else rng.uniform(30, 1500)))
+        lote_solicitudes.append(Solicitud(usuario_id=rng.choice(usuario_ids), estado=estado))
+        resumen.por_estado[estado] += 1
+    Solicitud.objects.bulk_create(lote_solicitudes)
+    # ``auto_now_add`` pisa la fecha en el alta; se la corrige después.
+    for solicitud, fecha in zip(lote_solicitudes, fechas):
+        solicitud.creado_en = solicitud.actualizado_en = fecha
+    Solicitud.objects.bulk_update(lote_solicitudes, ['creado_en', 'actualizado_en'], batch_size=1000)
+
+    devoluciones = {}
+    for solicitud in lote_solicitudes:
+        if solicitud.estado == Solicitud.ESTADO_ENTREGADA and rng.random() < PROPORCION_DEVOLUCIONES_PENDIENTES:
+            devoluciones[solicitud.pk] = Devolucion(usuario_id=solicitud.usuario_id)
+    Devolucion.objects.bulk_create(devoluciones.values())
+    resumen.devoluciones += len(devoluciones)
+
+    items, lote_prestamos = [], []
+    for solicitud, (estado, cantidad) in zip(lote_solicitudes, plan):
+        creado = solicitud.creado_en
+        for posicion in range(cantidad):
+            prestamo = Prestamo(solicitud=solicitud, usuario_id=solicitud.usuario_id)
+            if estado == Solicitud.ESTADO_CANCELADA:
+                prestamo.legajo_id = next(pool_extraviados)
+                prestamo.estado, prestamo.activo = Prestamo.ESTADO_EXTRAVIADO, False
+            elif estado == Solicitud.ESTADO_CERRADA or (estado == Solicitud.ESTADO_ENTREGADA and posicion % 3 == 2):
+                # Historial ya devuelto; en las entregadas, uno de cada tres legajos.
+                prestamo.legajo_id = rng.choice(historicos)
+                prestamo.estado, prestamo.activo = Prestamo.ESTADO_DEVUELTO, False
+                prestamo.entregado_en = creado + timedelta(days=rng.uniform(0, 3))
+                prestamo.devuelto_en = min(prestamo.entregado_en + timedelta(days=rng.uniform(1, 60)), ahora)
+            else:
+                prestamo.legajo_id = next(pool_activos)
+                prestamo.estado = {
+                    Solicitud.ESTADO_PENDIENTE: Prestamo.ESTADO_PENDIENTE,
+                    Solicitud.ESTADO_PREPARADA: Prestamo.ESTADO_LISTO,
+                    Solicitud.ESTADO_ENTREGADA: Prestamo.ESTADO_ENTREGADO,
+                }[estado]
+                if prestamo.estado == Prestamo.ESTADO_ENTREGADO:
+                    prestamo.entregado_en = creado + timedelta(days=rng.uniform(0, 3))
+                    prestamo.devolucion = devoluciones.get(solicitud.pk)
+            lote_prestamos.append(prestamo)
+            items.append(SolicitudItem(solicitud=solicitud, legajo_id=prestamo.legajo_id, disponible_al_crear=True))
+    SolicitudItem.objects.bulk_create(items)
+    Prestamo.objects.bulk_create(lote_prestamos)
+    EventoPrestamo.objects.bulk_create(
+        (evento for prestamo in lote_prestamos for evento in _eventos(prestamo, prestamo.solicitud.creado_en, ahora)),
+        batch_size=1000,
+    )
+    Prestamo.objects.filter(solicitud__in=lote_solicitudes).update(
+        creado_en=models.Subquery(
+            Solicitud.objects.filter(pk=models.OuterRef('solicitud_id')).values('creado_en')[:1]
+        ),
+    )
+    resumen.solicitudes += len(lote_solicitudes)
+    resumen.prestamos += len(lote_prestamos)
+
+    vigente = Prestamo.objects.filter(legajo=models.OuterRef('pk'), activo=True).values('pk')[:1]
+    for estado_prestamo, estado_legajo in [
+        (Prestamo.ESTADO_PENDIENTE, Legajo.ESTADO_RESERVADO),
+        (Prestamo.ESTADO_LISTO, Legajo.ESTADO_RESERVADO),
+        (Prestamo.ESTADO_ENTREGADO, Legajo.ESTADO_PRESTADO),
+    ]:
+        Legajo.objects.filter(
+            prestamos__solicitud__in=lote_solicitudes,
+            prestamos__estado=estado_prestamo,
+        ).update(estado=estado_legajo, prestamo_actual=models.Subquery(vigente))
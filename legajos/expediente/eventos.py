@@ -0,0 +1,272 @@
+"""Novedades del circuito en vivo (server-sent events).
+
+Las altas de solicitudes y devoluciones y las transiciones de solicitudes
+y préstamos se publican, una vez confirmada la transacción, en un
+``Difusor``. ``eventos_view`` mantiene abierta una respuesta
+``text/event-stream`` por página conectada y le reenvía lo que le
+corresponde: a los administradores, todo; a cada solicitante, lo suyo.
+Así las páginas se actualizan solas en lugar de recargarse cada pocos
+segundos.
+
+``settings.DIFUSOR_EVENTOS`` elige la clase. Sin difusor (el valor por
+omisión) las páginas no incluyen el script de eventos (``en_vivo``) y la
+vista responde 204, con lo que el navegador no se reconecta. ``DifusorLocal`` reparte en
+memoria dentro del proceso y sólo sirve con un único proceso; con varios
+procesos o servidores hace falta otra clase con la misma interfaz (por
+ejemplo, sobre Redis pub/sub o LISTEN/NOTIFY). ``comprobar_difusor`` lo
+señala como error de configuración fuera de ``DEBUG``.
+
+Cada evento lleva un id creciente y el difusor guarda los últimos; el
+navegador reenvía el último recibido en ``Last-Event-ID`` al reconectarse
+y se le repiten los que se perdió. Servido por WSGI, que no puede
+transmitir un iterador asíncrono a medida que produce, la respuesta no
+espera: entrega lo pendiente, termina y pide reconectar en ``SONDEO_MS``,
+así ningún worker queda ocupado por una página abierta. Por ASGI la
+respuesta queda abierta; ``?espera=`` acorta el latido.
+"""
+
+import asyncio
+import json
+import threading
+from collections import deque
+from contextlib import aclosing
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import checks
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.module_loading import import_string
+
+from .models import Prestamo, Solicitud
+from .permissions import es_administrador
+
+# Segundos sin eventos tras los que se envía un comentario para mantener
+# viva la conexión.
+LATIDO = 15.0
+# Espera del navegador antes de reconectarse, en milisegundos: tras un
+# corte por ASGI y entre consulta y consulta por WSGI.
+REINTENTO_MS = 1000
+SONDEO_MS = 5000
+
+
+class Difusor:
+    """Interfaz de los difusores de eventos."""
+
+    def publicar(self, evento: dict) -> None:
+        raise NotImplementedError
+
+    def ultimo(self) -> int:
+        """Id del último evento publicado (0 si todavía no hubo ninguno)."""
+
+        raise NotImplementedError
+
+    def escuchar(self, desde: int | None = None, latido: float = LATIDO):
+        """Generador asíncrono de ``(id, evento)``, empezando por los
+        posteriores a ``desde`` que todavía recuerde; produce ``None`` cada
+        ``latido`` segundos sin eventos."""
+
+        raise NotImplementedError
+
+
+class DifusorLocal(Difusor):
+    """Difusor en memoria para un único proceso."""
+
+    def __init__(self, historial: int = 500):
+        self._lock = threading.Lock()
+        self._ultimo = 0
+        self._historial = deque(maxlen=historial)
+        self._suscriptores = set()
+
+    def publicar(self, evento):
+        with self._lock:
+            self._ultimo += 1
+            entrada = (self._ultimo, evento)
+            self._historial.append(entrada)
+            suscriptores = list(self._suscriptores)
+        for suscriptor in suscriptores:
+            loop, cola = suscriptor
+            try:
+                loop.call_soon_threadsafe(cola.put_nowait, entrada)
+            except RuntimeError:
+                # El loop del suscriptor ya se cerró.
+                with self._lock:
+                    self._suscriptores.discard(suscriptor)
+
+    def ultimo(self):
+        with self._lock:
+            return self._ultimo
+
+    async def escuchar(self, desde=None, latido=LATIDO):
+        suscriptor = (asyncio.get_running_loop(), asyncio.Queue())
+        with self._lock:
+            self._suscriptores.add(suscriptor)
+            perdidos = [entrada for entrada in self._historial if desde is not None and entrada[0] > desde]
+        try:
+            for entrada in perdidos:
+                yield entrada
+            while True:
+                try:
+                    yield await asyncio.wait_for(suscriptor[1].get(), latido)
+                except TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                self._suscriptores.discard(suscriptor)
+
+
+@lru_cache(maxsize=None)
+def difusor() -> Difusor | None:
+    ruta = getattr(settings, 'DIFUSOR_EVENTOS', None)
+    return import_string(ruta)() if ruta else None
+
+
+def en_vivo(request):
+    """Procesador de contexto: si las páginas deben escuchar eventos."""
+
+    return {'eventos_en_vivo': difusor() is not None}
+
+
+def comprobar_difusor(app_configs, **kwargs):
+    """Chequeo de sistema: ``DifusorLocal`` pierde eventos con varios
+    procesos, así que fuera de ``DEBUG`` es un error. Quien sirva con un
+    único proceso ASGI puede silenciarlo con ``SILENCED_SYSTEM_CHECKS``."""
+
+    ruta = getattr(settings, 'DIFUSOR_EVENTOS', None)
+    if not ruta:
+        return []
+    try:
+        clase = import_string(ruta)
+    except ImportError as error:
+        return [checks.Error(f'No se pudo importar DIFUSOR_EVENTOS: {error}', id='expediente.E002')]
+    if not issubclass(clase, DifusorLocal):
+        return []
+    nivel = checks.Warning if settings.DEBUG else checks.Error
+    return [
+        nivel(
+            'DifusorLocal sólo reparte eventos dentro de un proceso.',
+            hint=(
+                'Con varios workers o servidores WSGI las páginas pierden novedades. '
+                'Use un difusor compartido o deje DIFUSOR_EVENTOS = None; si sirve con '
+                'un único proceso ASGI, silencie expediente.E001.'
+            ),
+            id='expediente.W001' if settings.DEBUG else 'expediente.E001',
+        )
+    ]
+
+
+def publicar(evento: dict) -> None:
+    """Publica ``evento`` cuando se confirme la transacción en curso."""
+
+    if difusor() is not None:
+        transaction.on_commit(lambda: difusor().publicar(evento))
+
+
+def al_guardar_solicitud(sender, instance, created, **kwargs):
+    if created:
+        publicar({
+            'tipo': 'solicitud_creada',
+            'solicitud': instance.pk,
+            'estado': instance.estado,
+            'usuarios': [instance.usuario_id],
+            'mensaje': f'Nueva solicitud #{instance.pk} de {instance.usuario.username}.',
+        })
+
+
+def al_guardar_devolucion(sender, instance, created, **kwargs):
+    if created:
+        publicar({
+            'tipo': 'devolucion_creada',
+            'devolucion': instance.pk,
+            'usuarios': [instance.usuario_id],
+            'mensaje': f'Nueva devolución #{instance.pk} de {instance.usuario.username}.',
+        })
+
+
+def al_transicionar(sender, transicion, filas, **kwargs):
+    destino = sender.TRANSICIONES[transicion].destino
+    if sender is Solicitud:
+        for fila in filas:
+            publicar({
+                'tipo': 'solicitud',
+                'solicitud': fila['pk'],
+                'estado': destino,
+                'usuarios': [fila['usuario_id']],
+                'mensaje': f"Solicitud #{fila['pk']}: {destino}.",
+            })
+    elif sender is Prestamo:
+        por_solicitud = {}
+        for fila in filas:
+            por_solicitud.setdefault(fila['solicitud_id'], []).append(fila)
+        for solicitud_id, del_grupo in por_solicitud.items():
+            publicar({
+                'tipo': 'prestamos',
+                'solicitud': solicitud_id,
+                'estado': destino,
+                'prestamos': [fila['pk'] for fila in del_grupo],
+                'usuarios': sorted({fila['usuario_id'] for fila in del_grupo}),
+                'mensaje': f'Solicitud #{solicitud_id}: {len(del_grupo)} préstamo(s) {destino}.',
+            })
+
+
+def visible(evento: dict, usuario_id: int, es_admin: bool) -> bool:
+    return es_admin or usuario_id in evento['usuarios']
+
+
+def formatear(identificador: int, evento: dict) -> str:
+    return f"id: {identificador}\nevent: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+
+
+async def eventos_view(request):
+    if difusor() is None:
+        # Sin difusor no hay novedades en vivo: 204 hace que EventSource no
+        # se reconecte.
+        return HttpResponse(status=204)
+    usuario = await request.auser()
+    if not usuario.is_authenticated:
+        return HttpResponse('No autenticado', status=401)
+    es_admin = await sync_to_async(es_administrador)(usuario)
+    try:
+        desde = int(request.headers.get('Last-Event-ID') or request.GET.get('desde', ''))
+    except ValueError:
+        desde = None
+    try:
+        latido = min(max(float(request.GET.get('espera', LATIDO)), 0.0), LATIDO)
+    except ValueError:
+        latido = LATIDO
+    continuo = isinstance(request, ASGIRequest)
+
+    async def flujo():
+        yield f'retry: {REINTENTO_MS}\n\n'
+        async with aclosing(difusor().escuchar(desde, latido)) as entradas:
+            async for entrada in entradas:
+                if entrada is None:
+                    yield ': latido\n\n'
+                elif visible(entrada[1], usuario.pk, es_admin):
+                    yield formatear(*entrada)
+
+    async def pendientes():
+        # Sondeo: lo publicado desde ``desde`` y, al final, el id hasta el
+        # que se leyó, para que la próxima consulta siga desde ahí aunque
+        # no hubiera nada visible para este usuario.
+        partes = [f'retry: {SONDEO_MS}\n\n']
+        ultimo = difusor().ultimo() if desde is None else desde
+        async with aclosing(difusor().escuchar(ultimo, 0)) as entradas:
+            async for entrada in entradas:
+                if entrada is None:
+                    break
+                ultimo = entrada[0]
+                if visible(entrada[1], usuario.pk, es_admin):
+                    partes.append(formatear(*entrada))
+        partes.append(f'id: {ultimo}\n\n')
+        return ''.join(partes)
+
+    if continuo:
+        response = StreamingHttpResponse(flujo(), content_type='text/event-stream')
+    else:
+        response = HttpResponse(await pendientes(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
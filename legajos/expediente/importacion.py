@@ -0,0 +1,155 @@
+"""Importación masiva de legajos desde CSV.
+
+El archivo se lee en streaming y se inserta por lotes con ``bulk_create``,
+cada lote en su propia transacción, así que la memoria queda acotada por
+el tamaño del lote (más el conjunto de códigos ya existentes, que se
+precarga para validar unicidad sin consultar fila por fila). Tras cada lote
+confirmado se informa el número de la última fila, que permite retomar una
+importación interrumpida con ``desde_fila``.
+"""
+
+import csv
+
+from django.db import IntegrityError, transaction
+
+from . import contadores
+from .models import Legajo
+
+COLUMNAS_OBLIGATORIAS = ('codigo', 'nombre')
+MAX_CODIGO = Legajo._meta.get_field('codigo').max_length
+MAX_NOMBRE = Legajo._meta.get_field('nombre').max_length
+
+
+class ErrorImportacion(Exception):
+    """El archivo no puede importarse (por ejemplo, faltan columnas)."""
+
+
+class ResultadoImportacion:
+    def __init__(self):
+        self.filas_leidas = 0
+        self.creados = 0
+        self.actualizados = 0
+        self.errores = []
+        self.ultima_fila_confirmada = 0
+
+    @property
+    def cantidad_errores(self) -> int:
+        return len(self.errores)
+
+
+def _validar(fila: dict) -> str | None:
+    codigo = fila['codigo']
+    if not codigo:
+        return 'falta el código'
+    if len(codigo) > MAX_CODIGO:
+        return f'el código supera {MAX_CODIGO} caracteres'
+    if not fila['nombre']:
+        return 'falta el nombre'
+    if len(fila['nombre']) > MAX_NOMBRE:
+        return f'el nombre supera {MAX_NOMBRE} caracteres'
+    return None
+
+
+def importar_legajos_csv(
+    archivo,
+    *,
+    lote: int = 1000,
+    actualizar: bool = False,
+    desde_fila: int = 0,
+    delimitador: str = ',',
+    al_confirmar_lote=None,
+) -> ResultadoImportacion:
+    """Importa legajos de ``archivo`` (texto CSV con encabezado).
+
+    Las filas se numeran desde 1 sin contar el encabezado. Con
+    ``actualizar`` los códigos existentes actualizan nombre y descripción;
+    si no, se informan como error, también si otro proceso los crea
+    mientras tanto. ``al_confirmar_lote(resultado)`` se llama después de
+    confirmar cada lote.
+    """
+
+    lector = csv.DictReader(archivo, delimiter=delimitador)
+    faltantes = [columna for columna in COLUMNAS_OBLIGATORIAS if columna not in (lector.fieldnames or [])]
+    if faltantes:
+        raise ErrorImportacion(f"Faltan columnas: {', '.join(faltantes)}")
+
+    existentes = set(Legajo.objects.values_list('codigo', flat=True).iterator(chunk_size=10000))
+    resultado = ResultadoImportacion()
+    vistos = set()
+    pendientes = []
+    nuevos_en_lote = 0
+
+    def insertar():
+        with transaction.atomic():
+            legajos = [legajo for _, legajo in pendientes]
+            if actualizar:
+                Legajo.objects.bulk_create(
+                    legajos,
+                    update_conflicts=True,
+                    unique_fields=['codigo'],
+                    update_fields=['nombre', 'descripcion', 'actualizado_en'],
+                )
+            else:
+                Legajo.objects.bulk_create(legajos)
+            contadores.ajustar({contadores.CLAVE_LEGAJOS: nuevos_en_lote})
+
+    def confirmar(ultima_fila):
+        nonlocal pendientes, nuevos_en_lote
+        while pendientes:
+            try:
+                insertar()
+                break
+            except IntegrityError:
+                # Otro proceso creó alguno de estos códigos después de la
+                # precarga: esas filas se informan y el resto se reintenta.
+                # Al actualizar el ``ON CONFLICT`` ya cubre ese caso.
+                if actualizar:
+                    raise
+                codigos = [legajo.codigo for _, legajo in pendientes]
+                ocupados = set(Legajo.objects.filter(codigo__in=codigos).values_list('codigo', flat=True))
+                if not ocupados:
+                    raise
+                resultado.errores.extend(
+                    (numero, legajo.codigo, 'el código ya existe')
+                    for numero, legajo in pendientes if legajo.codigo in ocupados
+                )
+                resultado.errores.sort()
+                pendientes = [(numero, legajo) for numero, legajo in pendientes if legajo.codigo not in ocupados]
+                nuevos_en_lote -= len(ocupados)
+        resultado.creados += nuevos_en_lote
+        resultado.actualizados += len(pendientes) - nuevos_en_lote
+        resultado.ultima_fila_confirmada = ultima_fila
+        pendientes = []
+        nuevos_en_lote = 0
+        if al_confirmar_lote is not None:
+            al_confirmar_lote(resultado)
+
+    numero = 0
+    for numero, crudo in enumerate(lector, start=1):
+        if numero <= desde_fila:
+            continue
+        resultado.filas_leidas += 1
+        fila = {
+            'codigo': (crudo.get('codigo') or '').strip(),
+            'nombre': (crudo.get('nombre') or '').strip(),
+            'descripcion': (crudo.get('descripcion') or '').strip(),
+        }
+        error = _validar(fila)
+        if error is None and fila['codigo'] in vistos:
+            error = 'código repetido en el archivo'
+        if error is None and fila['codigo'] in existentes and not actualizar:
+            error = 'el código ya existe'
+        if error is not None:
+            resultado.errores.append((numero, fila['codigo'], error))
+            continue
+        vistos.add(fila['codigo'])
+        if fila['codigo'] not in existentes:
+            nuevos_en_lote += 1
+            existentes.add(fila['codigo'])
+        pendientes.append((numero, Legajo(**fila)))
+        if len(pendientes) >= lote:
+            confirmar(numero)
+
+    if pendientes or numero > resultado.ultima_fila_confirmada:
+        confirmar(max(numero, desde_fila))
+    return resultado
@@ -0,0 +1,143 @@
+"""Instrumentación de las consultas SQL de cada pedido.
+
+``InstrumentacionSQLMiddleware`` envuelve el cursor con
+``connection.execute_wrapper`` en una fracción de los pedidos (muestreo)
+y registra cantidad de consultas, tiempo total de SQL, las más lentas y
+las formas de consulta repetidas: la misma sentencia ejecutada muchas
+veces con distintos parámetros suele ser un N+1 (por ejemplo, calcular
+``disponible`` fila por fila en un listado).
+
+El resumen sale en la cabecera ``Server-Timing`` (visible en las
+herramientas del navegador) y en el logger ``expediente.sql``, con los
+datos en ``extra={'sql': ...}`` para los formateadores estructurados.
+
+Se configura con el diccionario ``INSTRUMENTACION_SQL`` de settings; con
+``MUESTREO`` en 0 el middleware se desactiva al arrancar y no cuesta nada.
+"""
+
+import heapq
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger('expediente.sql')
+
+CONFIGURACION = {
+    # Fracción de pedidos instrumentados (0 desactiva, 1 instrumenta todos).
+    'MUESTREO': 0.0,
+    # Cuántas consultas lentas se informan por pedido.
+    'LENTAS': 3,
+    # Repeticiones de una misma forma de consulta a partir de las cuales se
+    # la informa como posible N+1.
+    'UMBRAL_REPETICIONES': 5,
+}
+
+_LISTA_PARAMETROS = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+_NUMERO = re.compile(r'\b\d+\b')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def configuracion() -> dict:
+    return {**CONFIGURACION, **getattr(settings, 'INSTRUMENTACION_SQL', {})}
+
+
+def forma(sql: str) -> str:
+    """La sentencia sin los valores: listas ``IN (%s, ...)`` de cualquier
+    largo y números literales quedan iguales."""
+
+    sql = _LISTA_PARAMETROS.sub('(%s...)', sql)
+    sql = _NUMERO.sub('N', sql)
+    return _ESPACIOS.sub(' ', sql).strip()
+
+
+class RegistroSQL:
+    """Callable para ``execute_wrapper`` que acumula las consultas de un pedido."""
+
+    def __init__(self, *, lentas: int = 3):
+        self.cantidad = 0
+        self.ms = 0.0
+        self.formas = Counter()
+        self.lentas = []
+        self._max_lentas = lentas
+        self._orden = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            self.cantidad += 1
+            self.ms += ms
+            self.formas[forma(sql)] += 1
+            # ``_orden`` desempata para no comparar sentencias.
+            self._orden += 1
+            entrada = (ms, self._orden, sql)
+            if len(self.lentas) < self._max_lentas:
+                heapq.heappush(self.lentas, entrada)
+            else:
+                heapq.heappushpop(self.lentas, entrada)
+
+    def repetidas(self, umbral: int) -> list[tuple[str, int]]:
+        return [(sql, veces) for sql, veces in self.formas.most_common() if veces >= umbral]
+
+    def resumen(self, umbral: int) -> dict:
+        return {
+            'consultas': self.cantidad,
+            'ms': round(self.ms, 2),
+            'lentas': [{'ms': round(ms, 2), 'sql': sql} for ms, _, sql in sorted(self.lentas, reverse=True)],
+            'repetidas': [{'veces': veces, 'sql': sql} for sql, veces in self.repetidas(umbral)],
+        }
+
+
+class InstrumentacionSQLMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = configuracion()
+        self.muestreo = config['MUESTREO']
+        self.lentas = config['LENTAS']
+        self.umbral = config['UMBRAL_REPETICIONES']
+        if not self.muestreo:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if random.random() >= self.muestreo:
+            return self.get_response(request)
+        registro = RegistroSQL(lentas=self.lentas)
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(registro))
+            response = self.get_response(request)
+        # En las respuestas en streaming sólo cuentan las consultas hechas
+        # antes de empezar a enviar el cuerpo.
+        resumen = registro.resumen(self.umbral)
+        self._server_timing(response, resumen)
+        nivel = logging.WARNING if resumen['repetidas'] else logging.INFO
+        logger.log(
+            nivel,
+            '%s %s: %d consultas, %.1f ms de SQL, %d formas repetidas',
+            request.method,
+            request.path,
+            resumen['consultas'],
+            resumen['ms'],
+            len(resumen['repetidas']),
+            extra={'sql': {'metodo': request.method, 'ruta': request.path, 'status': response.status_code, **resumen}},
+        )
+        return response
+
+    @staticmethod
+    def _server_timing(response, resumen):
+        metricas = [f'sql;dur={resumen["ms"]:.1f};desc="{resumen["consultas"]} consultas"']
+        if resumen['repetidas']:
+            veces = resumen['repetidas'][0]['veces']
+            metricas.append(f'sql-repetidas;desc="{len(resumen["repetidas"])} formas, la peor {veces} veces"')
+        if response.has_header('Server-Timing'):
+            metricas.insert(0, response['Server-Timing'])
+        response['Server-Timing'] = ', '.join(metricas)
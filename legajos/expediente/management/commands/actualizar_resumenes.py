@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from expediente import resumenes
+
+
+class Command(BaseCommand):
+    help = (
+        'Vuelca en los resúmenes diarios de los reportes los eventos de préstamos posteriores a la última '
+        'marca; con --reiniciar los recalcula desde el principio.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=resumenes.LOTE, help='Eventos por transacción.')
+        parser.add_argument('--reiniciar', action='store_true', help='Borra los resúmenes y la marca antes.')
+
+    def handle(self, *args, lote, reiniciar, **options):
+        if lote < 1:
+            raise CommandError('--lote debe ser positivo.')
+        if reiniciar:
+            resumenes.reiniciar()
+        procesados = resumenes.actualizar(
+            lote=lote,
+            al_confirmar_lote=lambda total: self.stdout.write(f'{total} eventos procesados...'),
+        )
+        marca = resumenes.marca()
+        self.stdout.write(self.style.SUCCESS(
+            f'Resúmenes actualizados: {procesados} eventos nuevos, marca en {marca.ultimo_evento if marca else 0}.'
+        ))
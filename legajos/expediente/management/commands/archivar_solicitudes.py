@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expediente import archivo
+
+
+class Command(BaseCommand):
+    help = (
+        'Mueve las solicitudes cerradas hace más de --dias, con sus ítems y préstamos, a las tablas '
+        'históricas; con --restaurar las devuelve a las tablas vivas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=archivo.ANTIGUEDAD.days, help='Antigüedad mínima del cierre.')
+        parser.add_argument('--lote', type=int, default=archivo.LOTE, help='Solicitudes por transacción.')
+        parser.add_argument('--limite', type=int, help='Cantidad máxima de solicitudes a archivar.')
+        parser.add_argument('--restaurar', nargs='+', type=int, metavar='ID', help='Ids de solicitudes archivadas.')
+
+    def handle(self, *args, dias, lote, limite, restaurar, **options):
+        if lote < 1:
+            raise CommandError('--lote debe ser positivo.')
+        if restaurar:
+            restauradas = archivo.restaurar(restaurar, lote=lote)
+            faltantes = len(set(restaurar)) - restauradas
+            self.stdout.write(self.style.SUCCESS(f'Restauradas {restauradas} solicitudes.'))
+            if faltantes:
+                self.stderr.write(f'{faltantes} ids no estaban archivados.')
+            return
+        archivadas = archivo.archivar(
+            timedelta(days=dias),
+            lote=lote,
+            limite=limite,
+            al_confirmar_lote=lambda total: self.stdout.write(f'{total} solicitudes archivadas...'),
+        )
+        self.stdout.write(self.style.SUCCESS(f'Archivadas {archivadas} solicitudes cerradas hace más de {dias} días.'))
@@ -0,0 +1,46 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from expediente import exportacion
+from expediente.models import Prestamo
+
+
+def _fecha(valor: str) -> date:
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f'Fecha inválida: {valor} (use AAAA-MM-DD).') from None
+
+
+class Command(BaseCommand):
+    help = 'Exporta el historial de préstamos en CSV o JSONL, en streaming.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=sorted(exportacion.FORMATOS), default='csv')
+        parser.add_argument('--desde', type=_fecha, help='Préstamos creados desde esta fecha (AAAA-MM-DD).')
+        parser.add_argument('--hasta', type=_fecha, help='Préstamos creados hasta esta fecha inclusive.')
+        parser.add_argument('--usuario', help='Nombre de usuario.')
+        parser.add_argument('--estado', choices=[estado for estado, _ in Prestamo.ESTADOS])
+        parser.add_argument('--historico', action='store_true', help='Incluye las solicitudes archivadas.')
+        parser.add_argument('--salida', help='Archivo de salida; por defecto, la salida estándar.')
+        parser.add_argument('--lote', type=int, default=exportacion.CHUNK_SIZE, help='Filas leídas por consulta.')
+
+    def handle(self, *args, formato, desde, hasta, usuario, estado, historico, salida, lote, **options):
+        if usuario:
+            try:
+                usuario = get_user_model().objects.get(username=usuario)
+            except get_user_model().DoesNotExist:
+                raise CommandError(f'No existe el usuario {usuario}.') from None
+        prestamos = exportacion.prestamos_para_exportar(
+            desde=desde, hasta=hasta, usuario=usuario, estado=estado, historico=historico,
+        )
+        generador, _ = exportacion.FORMATOS[formato]
+        renglones = generador(prestamos, chunk_size=lote)
+        if salida:
+            with open(salida, 'w', newline='', encoding='utf-8') as archivo:
+                archivo.writelines(renglones)
+        else:
+            for renglon in renglones:
+                self.stdout.write(renglon, ending='')
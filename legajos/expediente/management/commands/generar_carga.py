@@ -0,0 +1,91 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from expediente import carga
+from expediente.datos_sinteticos import CONTRASENA, crear_usuarios
+
+
+class Command(BaseCommand):
+    help = (
+        'Simula solicitantes y administradores concurrentes recorriendo el circuito completo '
+        'e informa pedidos por segundo, latencias y tasas de conflicto y error por URL.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--solicitantes', type=int, default=200)
+        parser.add_argument('--administradores', type=int, default=5)
+        parser.add_argument('--duracion', type=float, default=60, help='Segundos de carga, sin contar la rampa.')
+        parser.add_argument('--rampa', type=float, default=5, help='Segundos en los que van entrando los usuarios.')
+        parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1)
+        parser.add_argument(
+            '--url',
+            help=(
+                'Servidor ya levantado; si se omite se levanta uno local. Los usuarios simulados se crean '
+                'en la base de este proceso, así que el servidor tiene que usar la misma base.'
+            ),
+        )
+        parser.add_argument('--perfiles', default='expediente.carga.PERFILES', help='Ruta del diccionario de perfiles.')
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--prefijo', default='CARGA', help='Prefijo de los usuarios simulados.')
+        parser.add_argument('--json', dest='como_json', action='store_true', help='Imprime el resumen como JSON.')
+
+    def handle(self, *args, solicitantes, administradores, duracion, rampa, procesos, url, perfiles, semilla,
+               prefijo, como_json, **options):
+        try:
+            definidos = import_string(perfiles)
+            admins, nombres = crear_usuarios(solicitantes, prefijo, administradores)
+            usuarios = carga.asignar_perfiles(definidos, nombres, admins)
+        except (ImportError, ValueError) as exc:
+            raise CommandError(str(exc)) from exc
+
+        def correr(url_base):
+            plan = carga.PlanDeCarga(
+                url=url_base,
+                usuarios=usuarios,
+                contrasena=CONTRASENA,
+                duracion=duracion,
+                rampa=rampa,
+                procesos=procesos,
+                semilla=semilla,
+                perfiles=perfiles,
+            )
+            self.stderr.write(
+                f'{len(usuarios)} usuarios contra {url_base} durante {rampa + duracion:g} s '
+                f"(base {connection.settings_dict['NAME']})..."
+            )
+            return carga.ejecutar(plan)
+
+        if url:
+            url = url.rstrip('/')
+            # Los usuarios se acaban de crear en la base local: un servidor con
+            # otra base rechazaría cada inicio de sesión y la corrida saldría
+            # toda en errores.
+            prueba = [*admins, *nombres][:1]
+            if prueba and not carga.Sesion(url, []).iniciar_sesion(prueba[0], CONTRASENA):
+                raise CommandError(
+                    f'{url} no acepta a los usuarios simulados creados en la base '
+                    f"{connection.settings_dict['NAME']}; --url tiene que apuntar a un servidor "
+                    'que use la misma base.'
+                )
+            registros = correr(url)
+        else:
+            with carga.Servidor() as servidor:
+                registros = correr(servidor.url)
+        resumen = carga.resumir(registros, rampa + duracion)
+
+        if como_json:
+            self.stdout.write(json.dumps(resumen, indent=2))
+            return
+        self.stdout.write(
+            f"{'url':<30} {'pedidos':>8} {'por s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+            f"{'conflictos':>10} {'errores':>8}"
+        )
+        for etiqueta, fila in resumen.items():
+            self.stdout.write(
+                f"{etiqueta:<30} {fila['pedidos']:>8} {fila['por_segundo']:>8.2f} {fila['p50']:>8.1f} "
+                f"{fila['p95']:>8.1f} {fila['p99']:>8.1f} {fila['conflictos']:>10.2%} {fila['errores']:>8.2%}"
+            )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from expediente.datos_sinteticos import CONTRASENA, generar_archivo
+from expediente.models import Legajo
+
+
+class Command(BaseCommand):
+    help = 'Genera un archivo sintético de legajos, solicitudes y préstamos para medir rendimiento.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--legajos', type=int, default=1_000_000)
+        parser.add_argument('--solicitudes', type=int, default=200_000)
+        parser.add_argument('--prestamos', type=int, default=2_000_000)
+        parser.add_argument('--usuarios', type=int, default=500)
+        parser.add_argument('--semilla', type=int, default=0, help='Semilla para obtener siempre los mismos datos.')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por bulk_create y por transacción.')
+        parser.add_argument('--prefijo', default='SIN', help='Prefijo de los códigos de legajo y de los usuarios.')
+
+    def handle(self, *args, legajos, solicitudes, prestamos, usuarios, semilla, lote, prefijo, **options):
+        if Legajo.objects.filter(codigo__startswith=prefijo).exists():
+            raise CommandError(f'Ya hay legajos con el prefijo {prefijo}; use otro --prefijo.')
+        try:
+            resumen = generar_archivo(
+                legajos=legajos,
+                solicitudes=solicitudes,
+                prestamos=prestamos,
+                usuarios=usuarios,
+                semilla=semilla,
+                lote=lote,
+                prefijo=prefijo,
+                al_avanzar=self.stdout.write,
+            )
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+        estados = ', '.join(f'{estado}: {cantidad}' for estado, cantidad in resumen.por_estado.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Generados {resumen.legajos} legajos, {resumen.solicitudes} solicitudes ({estados}), '
+            f'{resumen.prestamos} préstamos y {resumen.devoluciones} devoluciones pendientes. '
+            f'Los usuarios {prefijo.lower()}_* tienen la contraseña "{CONTRASENA}".'
+        ))
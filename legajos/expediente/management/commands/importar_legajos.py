@@ -0,0 +1,76 @@
+import csv
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expediente.importacion import ErrorImportacion, importar_legajos_csv
+
+
+class Command(BaseCommand):
+    help = 'Importa legajos desde un CSV con columnas codigo, nombre y (opcional) descripcion.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del CSV (UTF-8, con encabezado).')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por lote y por transacción.')
+        parser.add_argument(
+            '--actualizar',
+            action='store_true',
+            help='Actualiza nombre y descripción de los códigos existentes en lugar de rechazarlos.',
+        )
+        parser.add_argument('--delimitador', default=',', help='Separador de columnas del CSV.')
+        parser.add_argument(
+            '--desde-fila',
+            type=int,
+            default=None,
+            help='Omite las filas hasta este número inclusive (para retomar una importación).',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Archivo donde se registra la última fila confirmada; si existe, se retoma desde ahí.',
+        )
+        parser.add_argument('--errores', help='Guarda los errores por fila en este CSV en lugar de mostrarlos.')
+
+    def handle(self, *args, archivo, lote, actualizar, delimitador, desde_fila, checkpoint, errores, **options):
+        if lote < 1:
+            raise CommandError('--lote debe ser mayor que cero.')
+        checkpoint = Path(checkpoint) if checkpoint else None
+        if desde_fila is None:
+            desde_fila = int(checkpoint.read_text()) if checkpoint and checkpoint.exists() else 0
+        if desde_fila:
+            self.stdout.write(f'Retomando después de la fila {desde_fila}.')
+
+        def al_confirmar_lote(resultado):
+            if checkpoint:
+                checkpoint.write_text(str(resultado.ultima_fila_confirmada))
+            self.stdout.write(
+                f'Fila {resultado.ultima_fila_confirmada}: {resultado.creados} creados, '
+                f'{resultado.actualizados} actualizados, {resultado.cantidad_errores} errores.'
+            )
+
+        try:
+            with open(archivo, newline='', encoding='utf-8-sig') as entrada:
+                resultado = importar_legajos_csv(
+                    entrada,
+                    lote=lote,
+                    actualizar=actualizar,
+                    desde_fila=desde_fila,
+                    delimitador=delimitador,
+                    al_confirmar_lote=al_confirmar_lote,
+                )
+        except (OSError, ErrorImportacion) as exc:
+            raise CommandError(str(exc)) from exc
+
+        if errores:
+            with open(errores, 'w', newline='', encoding='utf-8') as salida:
+                escritor = csv.writer(salida)
+                escritor.writerow(['fila', 'codigo', 'error'])
+                escritor.writerows(resultado.errores)
+        else:
+            for numero, codigo, mensaje in resultado.errores:
+                self.stderr.write(f'Fila {numero} ({codigo or "sin código"}): {mensaje}')
+        if checkpoint and checkpoint.exists():
+            checkpoint.unlink()
+        self.stdout.write(self.style.SUCCESS(
+            f'Importación terminada: {resultado.filas_leidas} filas, {resultado.creados} creados, '
+            f'{resultado.actualizados} actualizados, {resultado.cantidad_errores} errores.'
+        ))
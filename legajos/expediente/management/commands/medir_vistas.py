@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from expediente import rendimiento
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide tiempo y consultas de cada vista sobre la base actual y falla si alguna excede '
+        'su presupuesto de consultas o empeora frente a la línea de base.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--solo', nargs='+', metavar='NOMBRE', help='Mide sólo estos escenarios.')
+        parser.add_argument('--base', default=str(rendimiento.RUTA_BASE), help='Archivo JSON de la línea de base.')
+        parser.add_argument('--guardar-base', action='store_true', help='Reemplaza la línea de base con esta medición.')
+        parser.add_argument('--umbral', type=float, default=rendimiento.UMBRAL, help='Tiempo extra tolerado (0.5 = 50%%).')
+        parser.add_argument('--margen-ms', type=float, default=rendimiento.MARGEN_MS)
+        parser.add_argument('--host', default='localhost', help='Host de los pedidos (debe estar en ALLOWED_HOSTS).')
+        parser.add_argument('--json', dest='como_json', action='store_true', help='Imprime las mediciones como JSON.')
+
+    def handle(self, *args, repeticiones, solo, base, guardar_base, umbral, margen_ms, host, como_json, **options):
+        escenarios = rendimiento.ESCENARIOS
+        if solo:
+            desconocidos = set(solo) - {escenario.nombre for escenario in escenarios}
+            if desconocidos:
+                raise CommandError(f"Escenarios desconocidos: {', '.join(sorted(desconocidos))}")
+            escenarios = [escenario for escenario in escenarios if escenario.nombre in solo]
+        try:
+            mediciones = rendimiento.medir(escenarios, repeticiones=repeticiones, HTTP_HOST=host)
+        except LookupError as exc:
+            raise CommandError(str(exc)) from exc
+
+        if como_json:
+            self.stdout.write(json.dumps([rendimiento.como_dict(medicion) for medicion in mediciones], indent=2))
+        else:
+            self.stdout.write(f"{'escenario':<30} {'consultas':>9} {'mediana ms':>11} {'máx ms':>9} {'status':>6}")
+            for medicion in mediciones:
+                self.stdout.write(
+                    f'{medicion.nombre:<30} {medicion.consultas:>9} {medicion.ms:>11.2f} '
+                    f'{medicion.ms_max:>9.2f} {medicion.status:>6}'
+                )
+
+        if guardar_base:
+            rendimiento.guardar_base(mediciones, base)
+            self.stdout.write(self.style.SUCCESS(f'Línea de base guardada en {base}.'))
+            return
+        problemas = rendimiento.comparar(
+            mediciones,
+            rendimiento.cargar_base(base),
+            umbral=umbral,
+            margen_ms=margen_ms,
+        )
+        for problema in problemas:
+            self.stderr.write(problema)
+        if problemas:
+            raise CommandError(f'{len(problemas)} problemas de rendimiento.')
+        self.stdout.write(self.style.SUCCESS(f'{len(mediciones)} escenarios dentro del presupuesto.'))
+
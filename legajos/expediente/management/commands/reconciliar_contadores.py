@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from expediente import contadores
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los contadores del dashboard desde las tablas de origen y corrige las diferencias.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Sólo informa las diferencias, sin corregirlas.',
+        )
+
+    def handle(self, *args, verificar, **options):
+        with transaction.atomic():
+            diferencias = contadores.reconciliar()
+            for clave, (anterior, nuevo) in sorted(diferencias.items()):
+                self.stdout.write(f'{clave}: {anterior} -> {nuevo}')
+            if verificar:
+                transaction.set_rollback(True)
+
+        if verificar and diferencias:
+            raise CommandError(f'{len(diferencias)} contadores desincronizados.')
+        accion = 'verificados' if verificar else 'reconciliados'
+        self.stdout.write(self.style.SUCCESS(f'Contadores {accion}: {len(diferencias)} con diferencias.'))
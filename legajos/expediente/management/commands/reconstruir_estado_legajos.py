@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from expediente.models import Legajo
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye (o sólo verifica) el estado materializado de los legajos a partir de Prestamo.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Sólo informa las diferencias, sin corregirlas.',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Cantidad de legajos leídos y corregidos por transacción.',
+        )
+
+    def handle(self, *args, verificar, lote, **options):
+        legajos = (
+            Legajo.objects.con_estado_esperado()
+            .only('pk', 'codigo', 'estado', 'prestamo_actual')
+            .order_by('pk')
+        )
+        desincronizados = []
+        total = 0
+        for legajo in legajos.iterator(chunk_size=lote):
+            if legajo.estado == legajo.estado_esperado and legajo.prestamo_actual_id == legajo.prestamo_esperado:
+                continue
+            total += 1
+            if verificar:
+                self.stdout.write(
+                    f"{legajo.codigo}: estado={legajo.estado} (esperado {legajo.estado_esperado}), "
+                    f"prestamo_actual={legajo.prestamo_actual_id} (esperado {legajo.prestamo_esperado})"
+                )
+                continue
+            legajo.estado = legajo.estado_esperado
+            legajo.prestamo_actual_id = legajo.prestamo_esperado
+            desincronizados.append(legajo)
+            if len(desincronizados) >= lote:
+                self._corregir(desincronizados)
+                desincronizados = []
+        if desincronizados:
+            self._corregir(desincronizados)
+
+        if verificar and total:
+            raise CommandError(f'{total} legajos con estado desincronizado.')
+        accion = 'verificados' if verificar else 'corregidos'
+        self.stdout.write(self.style.SUCCESS(f'Legajos {accion}: {total} con diferencias.'))
+
+    def _corregir(self, legajos):
+        with transaction.atomic():
+            Legajo.objects.bulk_update(legajos, ['estado', 'prestamo_actual'])
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from expediente.busqueda import reconstruir_indice
+
+
+class Command(BaseCommand):
+    help = 'Reinstala y regenera desde cero el índice de texto completo de legajos.'
+
+    def handle(self, *args, **options):
+        reconstruir_indice()
+        self.stdout.write(self.style.SUCCESS('Índice de búsqueda reconstruido.'))
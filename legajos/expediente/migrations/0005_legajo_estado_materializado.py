@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_estado_legajo(apps, schema_editor):
+    Legajo = apps.get_model('expediente', 'Legajo')
+    Prestamo = apps.get_model('expediente', 'Prestamo')
+
+    vigente = Prestamo.objects.filter(
+        legajo=models.OuterRef('pk'),
+        estado__in=['pendiente', 'listo', 'entregado'],
+    ).order_by('-creado_en')
+    Legajo.objects.update(prestamo_actual=models.Subquery(vigente.values('pk')[:1]))
+    Legajo.objects.filter(prestamo_actual__estado='entregado').update(estado='prestado')
+    Legajo.objects.filter(prestamo_actual__estado__in=['pendiente', 'listo']).update(estado='reservado')
+    Legajo.objects.filter(bloqueado=True).update(estado='extraviado')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expediente', '0004_rename_legajo_titulo_to_nombre'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='legajo',
+            name='estado',
+            field=models.CharField(choices=[('disponible', 'Disponible'), ('reservado', 'Reservado'), ('prestado', 'Prestado'), ('extraviado', 'Extraviado')], default='disponible', help_text='Materializado por las transiciones de Prestamo', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='legajo',
+            name='prestamo_actual',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='expediente.prestamo'),
+        ),
+        migrations.AddIndex(
+            model_name='legajo',
+            index=models.Index(fields=['estado', 'codigo'], name='legajo_estado_codigo_idx'),
+        ),
+        migrations.RunPython(poblar_estado_legajo, reverse_code=migrations.RunPython.noop),
+    ]
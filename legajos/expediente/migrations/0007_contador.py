@@ -0,0 +1,43 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:11
+
+from django.db import migrations, models
+
+
+def poblar_contadores(apps, schema_editor):
+    Contador = apps.get_model('expediente', 'Contador')
+    Legajo = apps.get_model('expediente', 'Legajo')
+    Prestamo = apps.get_model('expediente', 'Prestamo')
+    Solicitud = apps.get_model('expediente', 'Solicitud')
+
+    valores = {'legajos': Legajo.objects.count()}
+    por_estado = Solicitud.objects.values_list('estado').annotate(n=models.Count('pk')).order_by()
+    for estado, cantidad in por_estado:
+        valores[f'solicitudes:{estado}'] = cantidad
+    activas = (
+        Solicitud.objects.exclude(estado='cerrada')
+        .values_list('usuario').annotate(n=models.Count('pk')).order_by()
+    )
+    for usuario_id, cantidad in activas:
+        valores[f'usuario:{usuario_id}:solicitudes_activas'] = cantidad
+    prestamos = Prestamo.objects.filter(activo=True).values_list('usuario').annotate(n=models.Count('pk')).order_by()
+    for usuario_id, cantidad in prestamos:
+        valores[f'usuario:{usuario_id}:prestamos_activos'] = cantidad
+    Contador.objects.bulk_create(Contador(clave=clave, valor=valor) for clave, valor in valores.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expediente', '0006_devolucion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Contador',
+            fields=[
+                ('clave', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('valor', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(poblar_contadores, reverse_code=migrations.RunPython.noop),
+    ]
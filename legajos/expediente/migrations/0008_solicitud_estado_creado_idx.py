@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expediente', '0007_contador'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['estado', '-creado_en'], name='solicitud_estado_creado_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Índice de texto completo para la búsqueda de legajos (ver expediente/busqueda.py)
+
+from django.db import migrations
+
+
+def instalar(apps, schema_editor):
+    from expediente.busqueda import reconstruir_indice
+
+    reconstruir_indice(schema_editor.connection)
+
+
+def desinstalar(apps, schema_editor):
+    from expediente.busqueda import desinstalar_indice
+
+    desinstalar_indice(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expediente', '0008_solicitud_estado_creado_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(instalar, reverse_code=desinstalar),
+    ]
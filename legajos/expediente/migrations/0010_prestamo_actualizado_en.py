@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expediente', '0009_busqueda_legajos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prestamo',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expediente', '0010_prestamo_actualizado_en'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='devolucion',
+            index=models.Index(fields=['usuario', '-creado_en'], name='devolucion_usuario_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='devolucion',
+            index=models.Index(fields=['estado', 'creado_en'], name='devolucion_estado_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='legajo',
+            index=models.Index(condition=models.Q(('bloqueado', True)), fields=['codigo'], name='legajo_bloqueado_codigo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['solicitud', 'estado'], name='prestamo_solicitud_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['legajo', 'estado'], name='prestamo_legajo_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(fields=['usuario', 'estado'], name='prestamo_usuario_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamo',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['usuario'], name='prestamo_usuario_activo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['usuario', '-creado_en'], name='solicitud_usuario_creado_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.7 on 2026-10-17 01:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expediente', '0011_indices_consultas_frecuentes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReclamoSolicitud',
+            fields=[
+                ('solicitud', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reclamo', serialize=False, to='expediente.solicitud')),
+                ('creado_en', models.DateTimeField(auto_now_add=True)),
+                ('vence_en', models.DateTimeField()),
+                ('administrador', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reclamos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['administrador', 'vence_en'], name='reclamo_admin_vence_idx'), models.Index(fields=['vence_en'], name='reclamo_vence_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expediente', '0012_reclamosolicitud'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SolicitudHistorica',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('preparada', 'Preparada'), ('cancelada', 'Cancelada'), ('entregada', 'Entregada'), ('cerrada', 'Cerrada')], max_length=20)),
+                ('creado_en', models.DateTimeField()),
+                ('actualizado_en', models.DateTimeField()),
+                ('archivado_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PrestamoHistorico',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('listo', 'Listo para entrega'), ('extraviado', 'Extraviado'), ('entregado', 'Entregado'), ('devuelto', 'Devuelto')], max_length=20)),
+                ('creado_en', models.DateTimeField()),
+                ('entregado_en', models.DateTimeField(blank=True, null=True)),
+                ('devuelto_en', models.DateTimeField(blank=True, null=True)),
+                ('actualizado_en', models.DateTimeField()),
+                ('devolucion_id', models.BigIntegerField(blank=True, null=True)),
+                ('legajo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='prestamos_historicos', to='expediente.legajo')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('solicitud', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='prestamos', to='expediente.solicitudhistorica')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SolicitudItemHistorico',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('disponible_al_crear', models.BooleanField(default=True)),
+                ('legajo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='expediente.legajo')),
+                ('solicitud', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='expediente.solicitudhistorica')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='solicitudhistorica',
+            index=models.Index(fields=['usuario', '-creado_en'], name='solhist_usuario_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamohistorico',
+            index=models.Index(fields=['creado_en'], name='presthist_creado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prestamohistorico',
+            index=models.Index(fields=['usuario', 'creado_en'], name='presthist_usuario_creado_idx'),
+        ),
+    ]
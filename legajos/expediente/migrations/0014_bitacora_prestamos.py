@@ -0,0 +1,79 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def poblar_bitacora(apps, schema_editor):
+    # Reconstruye lo que se puede de los préstamos existentes: el paso a
+    # ``listo`` no deja fecha, así que no tiene evento.
+    EventoPrestamo = apps.get_model('expediente', 'EventoPrestamo')
+    Legajo = apps.get_model('expediente', 'Legajo')
+    campos = ('id', 'solicitud_id', 'legajo_id', 'usuario_id', 'estado', 'creado_en', 'entregado_en',
+              'devuelto_en', 'actualizado_en')
+
+    def eventos():
+        for modelo in ('Prestamo', 'PrestamoHistorico'):
+            prestamos = apps.get_model('expediente', modelo).objects.values(*campos).order_by('pk')
+            for p in prestamos.iterator(chunk_size=1000):
+                comun = {'legajo_id': p['legajo_id'], 'prestamo_id': p['id'], 'solicitud_id': p['solicitud_id'],
+                         'usuario_id': p['usuario_id']}
+                yield EventoPrestamo(**comun, tipo='creado', estado_nuevo='pendiente', estado_legajo='reservado',
+                                     ocurrido_en=p['creado_en'])
+                if p['entregado_en']:
+                    yield EventoPrestamo(**comun, tipo='entregado', estado_anterior='listo', estado_nuevo='entregado',
+                                         estado_legajo='prestado', ocurrido_en=p['entregado_en'])
+                if p['devuelto_en']:
+                    yield EventoPrestamo(**comun, tipo='devuelto', estado_anterior='entregado', estado_nuevo='devuelto',
+                                         estado_legajo='disponible', ocurrido_en=p['devuelto_en'])
+                elif p['estado'] == 'extraviado':
+                    yield EventoPrestamo(**comun, tipo='extraviado', estado_anterior='listo', estado_nuevo='extraviado',
+                                         estado_legajo='extraviado', ocurrido_en=p['actualizado_en'])
+        # Los bloqueados a mano; los extraviados en un préstamo ya tienen su evento.
+        bloqueados = Legajo.objects.filter(bloqueado=True)
+        for modelo in ('Prestamo', 'PrestamoHistorico'):
+            extraviados = apps.get_model('expediente', modelo).objects.filter(estado='extraviado')
+            bloqueados = bloqueados.exclude(models.Exists(extraviados.filter(legajo=models.OuterRef('pk'))))
+        for legajo_id, actualizado_en in bloqueados.values_list('pk', 'actualizado_en').iterator(chunk_size=1000):
+            yield EventoPrestamo(legajo_id=legajo_id, tipo='bloqueado', estado_legajo='extraviado',
+                                 ocurrido_en=actualizado_en)
+
+    lote = []
+    for evento in eventos():
+        lote.append(evento)
+        if len(lote) == 1000:
+            EventoPrestamo.objects.bulk_create(lote)
+            lote = []
+    EventoPrestamo.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expediente', '0013_historico'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoPrestamo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prestamo_id', models.BigIntegerField(blank=True, null=True)),
+                ('solicitud_id', models.BigIntegerField(blank=True, null=True)),
+                ('tipo', models.CharField(choices=[('creado', 'Préstamo creado'), ('listo', 'Préstamo listo'), ('extraviado', 'Préstamo extraviado'), ('entregado', 'Préstamo entregado'), ('devuelto', 'Préstamo devuelto'), ('bloqueado', 'Legajo bloqueado'), ('desbloqueado', 'Legajo desbloqueado')], max_length=20)),
+                ('estado_anterior', models.CharField(blank=True, max_length=20)),
+                ('estado_nuevo', models.CharField(blank=True, max_length=20)),
+                ('estado_legajo', models.CharField(choices=[('disponible', 'Disponible'), ('reservado', 'Reservado'), ('prestado', 'Prestado'), ('extraviado', 'Extraviado')], max_length=20)),
+                ('ocurrido_en', models.DateTimeField(default=django.utils.timezone.now)),
+                ('legajo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos', to='expediente.legajo')),
+                ('usuario', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['legajo', 'ocurrido_en'], name='evento_legajo_ocurrido_idx'), models.Index(fields=['prestamo_id'], name='evento_prestamo_idx')],
+            },
+        ),
+        migrations.RunPython(poblar_bitacora, reverse_code=migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:08
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expediente', '0014_bitacora_prestamos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaResumen',
+            fields=[
+                ('clave', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('ultimo_evento', models.BigIntegerField(default=0)),
+                ('actualizado_en', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenDiario',
+            fields=[
+                ('fecha', models.DateField(primary_key=True, serialize=False)),
+                ('creados', models.IntegerField(default=0)),
+                ('listos', models.IntegerField(default=0)),
+                ('extraviados', models.IntegerField(default=0)),
+                ('entregados', models.IntegerField(default=0)),
+                ('devueltos', models.IntegerField(default=0)),
+                ('preparacion', models.DurationField(default=datetime.timedelta)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ResumenLegajoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('solicitudes', models.IntegerField(default=0)),
+                ('legajo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='expediente.legajo')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'legajo'), name='resumen_legajo_fecha_unico')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenUsuarioDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('devueltos', models.IntegerField(default=0)),
+                ('tiempo_fuera', models.DurationField(default=datetime.timedelta)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'usuario'), name='resumen_usuario_fecha_unico')],
+            },
+        ),
+    ]
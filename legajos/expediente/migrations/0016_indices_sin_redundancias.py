@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 02:52
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('expediente', '0015_resumenes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='solicitud',
+            name='solicitud_estado_creado_idx',
+        ),
+        migrations.AlterField(
+            model_name='prestamo',
+            name='legajo',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='prestamos', to='expediente.legajo'),
+        ),
+        migrations.AlterField(
+            model_name='prestamo',
+            name='solicitud',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='prestamos', to='expediente.solicitud'),
+        ),
+        migrations.AlterField(
+            model_name='prestamo',
+            name='usuario',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='prestamos', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['estado', '-creado_en', '-id'], name='solicitud_estado_creado_idx'),
+        ),
+    ]
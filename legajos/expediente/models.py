@@ -1,36 +1,148 @@
+from datetime import timedelta
+
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
+from .signals import prestamos_creados
+from .transiciones import AHORA, Transicion, TransicionModelMixin, TransicionQuerySet
+
 User = get_user_model()
 
 
+class LegajoQuerySet(models.QuerySet):
+	"""Consultas de legajos resueltas a nivel de conjunto."""
+
+	def con_disponibilidad(self):
+		"""Anota ``esta_disponible`` a partir del estado materializado."""
+
+		return self.annotate(
+			esta_disponible=models.ExpressionWrapper(
+				models.Q(estado=Legajo.ESTADO_DISPONIBLE),
+				output_field=models.BooleanField(),
+			),
+		)
+
+	def disponibles(self):
+		return self.filter(estado=Legajo.ESTADO_DISPONIBLE)
+
+	def con_estado_esperado(self):
+		"""Anota el estado y el préstamo vigente que se derivan de ``Prestamo``.
+
+		Es la fuente de verdad contra la que se reconstruye ``estado``.
+		"""
+
+		vigente = Prestamo.objects.filter(
+			legajo=models.OuterRef('pk'),
+			estado__in=Prestamo.ESTADOS_ACTIVOS,
+		).order_by('-creado_en')
+		return self.annotate(
+			prestamo_esperado=models.Subquery(vigente.values('pk')[:1]),
+			estado_prestamo_esperado=models.Subquery(vigente.values('estado')[:1]),
+		).annotate(
+			estado_esperado=models.Case(
+				models.When(bloqueado=True, then=models.Value(Legajo.ESTADO_EXTRAVIADO)),
+				models.When(
+					estado_prestamo_esperado=Prestamo.ESTADO_ENTREGADO,
+					then=models.Value(Legajo.ESTADO_PRESTADO),
+				),
+				models.When(
+					estado_prestamo_esperado__isnull=False,
+					then=models.Value(Legajo.ESTADO_RESERVADO),
+				),
+				default=models.Value(Legajo.ESTADO_DISPONIBLE),
+				output_field=models.CharField(),
+			),
+		)
+
+
 class Legajo(models.Model):
 	"""Representa un legajo físico que puede ser solicitado y prestado."""
 
+	ESTADO_DISPONIBLE = 'disponible'
+	ESTADO_RESERVADO = 'reservado'
+	ESTADO_PRESTADO = 'prestado'
+	ESTADO_EXTRAVIADO = 'extraviado'
+	ESTADOS = [
+		(ESTADO_DISPONIBLE, 'Disponible'),
+		(ESTADO_RESERVADO, 'Reservado'),
+		(ESTADO_PRESTADO, 'Prestado'),
+		(ESTADO_EXTRAVIADO, 'Extraviado'),
+	]
+
 	codigo = models.CharField(max_length=50, unique=True)
 	nombre = models.CharField(max_length=255)
 	descripcion = models.TextField(blank=True)
 	bloqueado = models.BooleanField(default=False, help_text="Marcado si no se encuentra físicamente / extraviado")
 	creado_en = models.DateTimeField(auto_now_add=True)
 	actualizado_en = models.DateTimeField(auto_now=True)
+	estado = models.CharField(
+		max_length=20,
+		choices=ESTADOS,
+		default=ESTADO_DISPONIBLE,
+		help_text="Materializado por las transiciones de Prestamo",
+	)
+	prestamo_actual = models.ForeignKey(
+		'Prestamo',
+		null=True,
+		blank=True,
+		on_delete=models.SET_NULL,
+		related_name='+',
+	)
+
+	objects = LegajoQuerySet.as_manager()
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['estado', 'codigo'], name='legajo_estado_codigo_idx'),
+			# Django compara booleanos como ``WHERE "bloqueado"``, que SQLite sólo
+			# resuelve con un índice parcial de la misma condición.
+			models.Index(fields=['codigo'], condition=models.Q(bloqueado=True), name='legajo_bloqueado_codigo_idx'),
+		]
 
 	def __str__(self) -> str:
 		return f"{self.codigo} - {self.nombre}"
 
+	def save(self, *args, **kwargs):
+		self.estado = self.estado_para(
+			self.bloqueado,
+			self.prestamo_actual.estado if self.prestamo_actual_id else None,
+		)
+		update_fields = kwargs.get('update_fields')
+		if update_fields is not None:
+			kwargs['update_fields'] = {*update_fields, 'estado'}
+		super().save(*args, **kwargs)
+
+	@classmethod
+	def estado_para(cls, bloqueado: bool, estado_prestamo: str | None) -> str:
+		"""Deriva el estado materializado del bloqueo y del préstamo vigente."""
+
+		if bloqueado:
+			return cls.ESTADO_EXTRAVIADO
+		if estado_prestamo == Prestamo.ESTADO_ENTREGADO:
+			return cls.ESTADO_PRESTADO
+		if estado_prestamo in Prestamo.ESTADOS_ACTIVOS:
+			return cls.ESTADO_RESERVADO
+		return cls.ESTADO_DISPONIBLE
+
 	@property
 	def disponible(self) -> bool:
-		"""Indica si está disponible para una nueva solicitud."""
+		"""Indica si está disponible para una nueva solicitud.
+
+		Usa la anotación de ``con_disponibilidad()`` si está presente y, como
+		respaldo, el estado materializado de la instancia.
+		"""
+
+		if 'esta_disponible' in self.__dict__:
+			return self.esta_disponible
+		return self.estado == self.ESTADO_DISPONIBLE
 
-		if self.bloqueado:
-			return False
-		return not Prestamo.objects.filter(
-			legajo=self,
-			estado__in=Prestamo.ESTADOS_ACTIVOS,
-		).exists()
 
+class SolicitudQuerySet(TransicionQuerySet):
+	campos_transicion = ('pk', 'estado', 'usuario_id')
 
-class Solicitud(models.Model):
+
+class Solicitud(TransicionModelMixin, models.Model):
 	"""Solicitud de uno o varios legajos por parte de un usuario."""
 
 	ESTADO_PENDIENTE = 'pendiente'
@@ -45,39 +157,51 @@ class Solicitud(models.Model):
 		(ESTADO_ENTREGADA, 'Entregada'),
 		(ESTADO_CERRADA, 'Cerrada'),
 	]
+	TRANSICIONES = {
+		'preparada': Transicion(origen=(ESTADO_PENDIENTE,), destino=ESTADO_PREPARADA),
+		'cancelada': Transicion(origen=(ESTADO_PENDIENTE,), destino=ESTADO_CANCELADA),
+		'entregada': Transicion(
+			origen=(ESTADO_PREPARADA, ESTADO_PENDIENTE),
+			destino=ESTADO_ENTREGADA,
+			condicion=lambda: ~models.Exists(Prestamo.objects.filter(
+				solicitud=models.OuterRef('pk'),
+				estado__in=[Prestamo.ESTADO_PENDIENTE, Prestamo.ESTADO_LISTO],
+			)),
+		),
+		'cerrada': Transicion(
+			origen=(ESTADO_PENDIENTE, ESTADO_PREPARADA, ESTADO_ENTREGADA),
+			destino=ESTADO_CERRADA,
+			condicion=lambda: ~models.Exists(Prestamo.objects.filter(
+				solicitud=models.OuterRef('pk'),
+				estado__in=[Prestamo.ESTADO_ENTREGADO, Prestamo.ESTADO_LISTO],
+			)),
+		),
+	}
 
 	usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='solicitudes')
 	estado = models.CharField(max_length=20, choices=ESTADOS, default=ESTADO_PENDIENTE)
 	creado_en = models.DateTimeField(auto_now_add=True)
 	actualizado_en = models.DateTimeField(auto_now=True)
 
+	objects = SolicitudQuerySet.as_manager()
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['estado', '-creado_en', '-id'], name='solicitud_estado_creado_idx'),
+			models.Index(fields=['usuario', '-creado_en'], name='solicitud_usuario_creado_idx'),
+		]
+
 	def __str__(self) -> str:
 		return f"Solicitud #{self.id} - {self.usuario} - {self.estado}"
 
 	def marcar_preparada(self, tiene_legajos_listos: bool) -> None:
-		if self.estado != self.ESTADO_PENDIENTE:
-			return
-		self.estado = self.ESTADO_PREPARADA if tiene_legajos_listos else self.ESTADO_CANCELADA
-		self.save()
+		self.transicionar('preparada' if tiene_legajos_listos else 'cancelada')
 
 	def marcar_entregada(self) -> None:
-		if self.estado not in (self.ESTADO_PREPARADA, self.ESTADO_PENDIENTE):
-			return
-		pendientes = self.prestamos.filter(
-			estado__in=[Prestamo.ESTADO_PENDIENTE, Prestamo.ESTADO_LISTO],
-		)
-		if pendientes.exists():
-			return
-		self.estado = self.ESTADO_ENTREGADA
-		self.save()
+		self.transicionar('entregada')
 
 	def marcar_cerrada_si_corresponde(self) -> None:
-		if self.prestamos.filter(estado=Prestamo.ESTADO_ENTREGADO).exists():
-			return
-		if self.prestamos.filter(estado=Prestamo.ESTADO_LISTO).exists():
-			return
-		self.estado = self.ESTADO_CERRADA
-		self.save()
+		self.transicionar('cerrada')
 
 
 class SolicitudItem(models.Model):
@@ -91,7 +215,28 @@ class SolicitudItem(models.Model):
 		return f"Item solicitud {self.solicitud_id} - {self.legajo.codigo}"
 
 
-class Prestamo(models.Model):
+class PrestamoQuerySet(TransicionQuerySet):
+	campos_transicion = ('pk', 'estado', 'legajo_id', 'solicitud_id', 'usuario_id', 'legajo__bloqueado')
+
+	def _aplicar_efectos(self, transicion, filas, momento):
+		solicitudes = {fila['solicitud_id'] for fila in filas}
+		# El detalle de la solicitud se cachea por ``actualizado_en``.
+		Solicitud.objects.filter(pk__in=solicitudes).update(actualizado_en=momento)
+		# El estado se deriva del bloqueo que queda en cada legajo: uno
+		# bloqueado a mano sigue extraviado aunque el préstamo avance.
+		Legajo.objects.filter(pk__in={fila['legajo_id'] for fila in filas}).update(
+			actualizado_en=momento,
+			estado=models.Case(
+				models.When(bloqueado=True, then=models.Value(Prestamo.estado_legajo_tras(transicion, True))),
+				default=models.Value(Prestamo.estado_legajo_tras(transicion, False)),
+			),
+			**transicion.efectos_legajo,
+		)
+		if transicion.transicion_solicitud:
+			Solicitud.objects.filter(pk__in=solicitudes).transicionar(transicion.transicion_solicitud)
+
+
+class Prestamo(TransicionModelMixin, models.Model):
 	"""Préstamo de un legajo a un usuario derivado de una solicitud."""
 
 	ESTADO_PENDIENTE = 'pendiente'
@@ -107,15 +252,54 @@ class Prestamo(models.Model):
 		(ESTADO_DEVUELTO, 'Devuelto'),
 	]
 	ESTADOS_ACTIVOS = [ESTADO_PENDIENTE, ESTADO_LISTO, ESTADO_ENTREGADO]
+	TRANSICIONES = {
+		'listo': Transicion(
+			origen=(ESTADO_PENDIENTE,),
+			destino=ESTADO_LISTO,
+			valores={'activo': True, 'entregado_en': None, 'devuelto_en': None},
+			efectos_legajo={'bloqueado': False},
+		),
+		'extraviado': Transicion(
+			origen=(ESTADO_PENDIENTE, ESTADO_LISTO),
+			destino=ESTADO_EXTRAVIADO,
+			valores={'activo': False, 'entregado_en': None, 'devuelto_en': None},
+			efectos_legajo={'bloqueado': True, 'prestamo_actual': None},
+		),
+		'entregado': Transicion(
+			origen=(ESTADO_LISTO,),
+			destino=ESTADO_ENTREGADO,
+			valores={'activo': True, 'entregado_en': AHORA},
+			transicion_solicitud='entregada',
+		),
+		'devuelto': Transicion(
+			origen=(ESTADO_ENTREGADO,),
+			destino=ESTADO_DEVUELTO,
+			valores={'activo': False, 'devuelto_en': AHORA},
+			efectos_legajo={'bloqueado': False, 'prestamo_actual': None},
+			transicion_solicitud='cerrada',
+		),
+	}
 
-	solicitud = models.ForeignKey(Solicitud, on_delete=models.CASCADE, related_name='prestamos')
-	legajo = models.ForeignKey(Legajo, on_delete=models.PROTECT, related_name='prestamos')
-	usuario = models.ForeignKey(User, on_delete=models.PROTECT, related_name='prestamos')
+	# Sin índice propio: los índices ``(<fk>, estado)`` de Meta empiezan por
+	# la misma columna y sirven para las búsquedas y los borrados por FK.
+	solicitud = models.ForeignKey(Solicitud, on_delete=models.CASCADE, related_name='prestamos', db_index=False)
+	legajo = models.ForeignKey(Legajo, on_delete=models.PROTECT, related_name='prestamos', db_index=False)
+	usuario = models.ForeignKey(User, on_delete=models.PROTECT, related_name='prestamos', db_index=False)
 	estado = models.CharField(max_length=20, choices=ESTADOS, default=ESTADO_PENDIENTE)
 	activo = models.BooleanField(default=True)
 	creado_en = models.DateTimeField(auto_now_add=True)
 	entregado_en = models.DateTimeField(null=True, blank=True)
 	devuelto_en = models.DateTimeField(null=True, blank=True)
+	actualizado_en = models.DateTimeField(auto_now=True)
+	devolucion = models.ForeignKey(
+		'Devolucion',
+		null=True,
+		blank=True,
+		on_delete=models.SET_NULL,
+		related_name='prestamos',
+	)
+
+	objects = PrestamoQuerySet.as_manager()
 
 	class Meta:
 		constraints = [
@@ -125,51 +309,255 @@ class Prestamo(models.Model):
 				name='unico_prestamo_activo_por_legajo',
 			),
 		]
+		indexes = [
+			models.Index(fields=['solicitud', 'estado'], name='prestamo_solicitud_estado_idx'),
+			models.Index(fields=['legajo', 'estado'], name='prestamo_legajo_estado_idx'),
+			models.Index(fields=['usuario', 'estado'], name='prestamo_usuario_estado_idx'),
+			models.Index(fields=['usuario'], condition=models.Q(activo=True), name='prestamo_usuario_activo_idx'),
+		]
 
 	def __str__(self) -> str:
 		return f"Prestamo {self.id} - {self.legajo.codigo} ({self.estado})"
 
+	def save(self, *args, **kwargs):
+		creando = self._state.adding
+		with transaction.atomic():
+			super().save(*args, **kwargs)
+			if creando and self.activo:
+				legajo = self.legajo
+				legajo.prestamo_actual = self
+				legajo.save()
+			if creando:
+				prestamos_creados.send(sender=Prestamo, prestamos=[self])
+
+	@staticmethod
+	def estado_legajo_tras(transicion: Transicion, bloqueado: bool) -> str:
+		"""Estado del legajo después de ``transicion`` si antes estaba ``bloqueado``."""
+
+		return Legajo.estado_para(transicion.efectos_legajo.get('bloqueado', bloqueado), transicion.destino)
+
 	def marcar_listo(self) -> None:
-		if self.estado != self.ESTADO_PENDIENTE:
-			return
-		self.estado = self.ESTADO_LISTO
-		self.activo = True
-		self.entregado_en = None
-		self.devuelto_en = None
-		self.save()
-		if self.legajo.bloqueado:
-			self.legajo.bloqueado = False
-			self.legajo.save()
+		self.transicionar('listo')
 
 	def marcar_extraviado(self) -> None:
-		if self.estado not in (self.ESTADO_PENDIENTE, self.ESTADO_LISTO):
-			return
-		self.estado = self.ESTADO_EXTRAVIADO
-		self.activo = False
-		self.entregado_en = None
-		self.devuelto_en = None
-		self.save()
-		if not self.legajo.bloqueado:
-			self.legajo.bloqueado = True
-			self.legajo.save()
+		self.transicionar('extraviado')
 
 	def marcar_entregado(self) -> None:
-		if self.estado != self.ESTADO_LISTO:
-			return
-		self.estado = self.ESTADO_ENTREGADO
-		self.activo = True
-		self.entregado_en = timezone.now()
-		self.save()
+		self.transicionar('entregado')
 
 	def marcar_devuelto(self) -> None:
-		if self.estado != self.ESTADO_ENTREGADO:
-			return
-		self.estado = self.ESTADO_DEVUELTO
-		self.activo = False
-		self.devuelto_en = timezone.now()
-		self.save()
-		if self.legajo.bloqueado:
-			self.legajo.bloqueado = False
-			self.legajo.save()
-		self.solicitud.marcar_cerrada_si_corresponde()
+		self.transicionar('devuelto')
+
+
+class Devolucion(models.Model):
+	"""Devolución de uno o varios préstamos entregados, a confirmar por un administrador."""
+
+	ESTADO_PENDIENTE = 'pendiente'
+	ESTADO_CONFIRMADA = 'confirmada'
+	ESTADOS = [
+		(ESTADO_PENDIENTE, 'Pendiente de recepción'),
+		(ESTADO_CONFIRMADA, 'Confirmada'),
+	]
+
+	usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='devoluciones')
+	estado = models.CharField(max_length=20, choices=ESTADOS, default=ESTADO_PENDIENTE)
+	creado_en = models.DateTimeField(auto_now_add=True)
+	actualizado_en = models.DateTimeField(auto_now=True)
+	confirmado_por = models.ForeignKey(
+		User,
+		null=True,
+		blank=True,
+		on_delete=models.SET_NULL,
+		related_name='+',
+	)
+	confirmado_en = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['usuario', '-creado_en'], name='devolucion_usuario_creado_idx'),
+			models.Index(fields=['estado', 'creado_en'], name='devolucion_estado_creado_idx'),
+		]
+
+	def __str__(self) -> str:
+		return f"Devolucion #{self.id} - {self.usuario} - {self.estado}"
+
+
+class ReclamoSolicitud(models.Model):
+	"""Solicitud pendiente tomada por un administrador para prepararla (ver ``cola.py``)."""
+
+	solicitud = models.OneToOneField(Solicitud, on_delete=models.CASCADE, primary_key=True, related_name='reclamo')
+	administrador = models.ForeignKey(User, on_delete=models.CASCADE, related_name='reclamos')
+	creado_en = models.DateTimeField(auto_now_add=True)
+	vence_en = models.DateTimeField()
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['administrador', 'vence_en'], name='reclamo_admin_vence_idx'),
+			models.Index(fields=['vence_en'], name='reclamo_vence_idx'),
+		]
+
+	def __str__(self) -> str:
+		return f"Reclamo solicitud {self.solicitud_id} - {self.administrador} hasta {self.vence_en}"
+
+
+class Contador(models.Model):
+	"""Contador precalculado que mantienen las transiciones (ver ``contadores.py``)."""
+
+	clave = models.CharField(max_length=100, primary_key=True)
+	valor = models.BigIntegerField(default=0)
+
+	def __str__(self) -> str:
+		return f"{self.clave} = {self.valor}"
+
+
+class SolicitudHistorica(models.Model):
+	"""Solicitud cerrada movida fuera de las tablas del circuito (ver ``archivo.py``).
+
+	Conserva el id original, así que las URLs y las referencias no cambian.
+	"""
+
+	id = models.BigIntegerField(primary_key=True)
+	usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+	estado = models.CharField(max_length=20, choices=Solicitud.ESTADOS)
+	creado_en = models.DateTimeField()
+	actualizado_en = models.DateTimeField()
+	archivado_en = models.DateTimeField(default=timezone.now)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['usuario', '-creado_en'], name='solhist_usuario_creado_idx'),
+		]
+
+	def __str__(self) -> str:
+		return f"Solicitud #{self.id} (archivada) - {self.usuario} - {self.estado}"
+
+
+class SolicitudItemHistorico(models.Model):
+	id = models.BigIntegerField(primary_key=True)
+	solicitud = models.ForeignKey(SolicitudHistorica, on_delete=models.CASCADE, related_name='items')
+	legajo = models.ForeignKey(Legajo, on_delete=models.PROTECT, related_name='+')
+	disponible_al_crear = models.BooleanField(default=True)
+
+	def __str__(self) -> str:
+		return f"Item solicitud {self.solicitud_id} (archivado) - {self.legajo.codigo}"
+
+
+class PrestamoHistorico(models.Model):
+	"""Préstamo devuelto o extraviado de una solicitud archivada; nunca está activo."""
+
+	id = models.BigIntegerField(primary_key=True)
+	solicitud = models.ForeignKey(SolicitudHistorica, on_delete=models.CASCADE, related_name='prestamos')
+	legajo = models.ForeignKey(Legajo, on_delete=models.PROTECT, related_name='prestamos_historicos')
+	usuario = models.ForeignKey(User, on_delete=models.PROTECT, related_name='+')
+	estado = models.CharField(max_length=20, choices=Prestamo.ESTADOS)
+	creado_en = models.DateTimeField()
+	entregado_en = models.DateTimeField(null=True, blank=True)
+	devuelto_en = models.DateTimeField(null=True, blank=True)
+	actualizado_en = models.DateTimeField()
+	# La devolución sigue en su tabla; sólo se guarda la referencia.
+	devolucion_id = models.BigIntegerField(null=True, blank=True)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['creado_en'], name='presthist_creado_idx'),
+			models.Index(fields=['usuario', 'creado_en'], name='presthist_usuario_creado_idx'),
+		]
+
+	def __str__(self) -> str:
+		return f"Prestamo {self.id} (archivado) - {self.legajo.codigo} ({self.estado})"
+
+
+class EventoPrestamo(models.Model):
+	"""Bitácora de solo inserción de los préstamos y bloqueos de cada legajo (ver ``bitacora.py``).
+
+	Guarda el préstamo y la solicitud como enteros sueltos, así sobrevive al
+	archivo y al borrado de las filas que describe.
+	"""
 
+	TIPO_CREADO = 'creado'
+	TIPO_BLOQUEADO = 'bloqueado'
+	TIPO_DESBLOQUEADO = 'desbloqueado'
+	TIPOS = [
+		(TIPO_CREADO, 'Préstamo creado'),
+		*[(nombre, f'Préstamo {nombre}') for nombre in Prestamo.TRANSICIONES],
+		(TIPO_BLOQUEADO, 'Legajo bloqueado'),
+		(TIPO_DESBLOQUEADO, 'Legajo desbloqueado'),
+	]
+
+	legajo = models.ForeignKey(Legajo, on_delete=models.CASCADE, related_name='eventos')
+	prestamo_id = models.BigIntegerField(null=True, blank=True)
+	solicitud_id = models.BigIntegerField(null=True, blank=True)
+	usuario = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+	tipo = models.CharField(max_length=20, choices=TIPOS)
+	estado_anterior = models.CharField(max_length=20, blank=True)
+	estado_nuevo = models.CharField(max_length=20, blank=True)
+	# Estado del legajo después del evento; el último evento hasta un
+	# instante da el estado del legajo en ese instante.
+	estado_legajo = models.CharField(max_length=20, choices=Legajo.ESTADOS)
+	ocurrido_en = models.DateTimeField(default=timezone.now)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=['legajo', 'ocurrido_en'], name='evento_legajo_ocurrido_idx'),
+			models.Index(fields=['prestamo_id'], name='evento_prestamo_idx'),
+		]
+
+	def __str__(self) -> str:
+		return f"{self.ocurrido_en:%Y-%m-%d %H:%M} {self.legajo_id} {self.tipo} ({self.estado_legajo})"
+
+
+class ResumenDiario(models.Model):
+	"""Totales del circuito por día, acumulados desde la bitácora (ver ``resumenes.py``)."""
+
+	fecha = models.DateField(primary_key=True)
+	creados = models.IntegerField(default=0)
+	listos = models.IntegerField(default=0)
+	extraviados = models.IntegerField(default=0)
+	entregados = models.IntegerField(default=0)
+	devueltos = models.IntegerField(default=0)
+	# Suma de las esperas entre el alta del préstamo y su paso a ``listo``.
+	preparacion = models.DurationField(default=timedelta)
+
+	def __str__(self) -> str:
+		return f"Resumen {self.fecha}"
+
+
+class ResumenLegajoDiario(models.Model):
+	fecha = models.DateField()
+	legajo = models.ForeignKey(Legajo, on_delete=models.CASCADE, related_name='+')
+	solicitudes = models.IntegerField(default=0)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['fecha', 'legajo'], name='resumen_legajo_fecha_unico'),
+		]
+
+	def __str__(self) -> str:
+		return f"Resumen {self.fecha} legajo {self.legajo_id}"
+
+
+class ResumenUsuarioDiario(models.Model):
+	fecha = models.DateField()
+	usuario = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+	devueltos = models.IntegerField(default=0)
+	# Suma del tiempo en poder del usuario de los préstamos devueltos ese día.
+	tiempo_fuera = models.DurationField(default=timedelta)
+
+	class Meta:
+		constraints = [
+			models.UniqueConstraint(fields=['fecha', 'usuario'], name='resumen_usuario_fecha_unico'),
+		]
+
+	def __str__(self) -> str:
+		return f"Resumen {self.fecha} usuario {self.usuario_id}"
+
+
+class MarcaResumen(models.Model):
+	"""Último ``EventoPrestamo`` volcado en los resúmenes."""
+
+	clave = models.CharField(max_length=50, primary_key=True)
+	ultimo_evento = models.BigIntegerField(default=0)
+	actualizado_en = models.DateTimeField(auto_now=True)
+
+	def __str__(self) -> str:
+		return f"{self.clave} = {self.ultimo_evento}"
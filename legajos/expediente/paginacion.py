@@ -0,0 +1,157 @@
+"""Paginación por cursor (keyset) para listados que crecen sin límite.
+
+En lugar de ``OFFSET`` la página se define por los valores de orden de la
+última (o primera) fila mostrada, de modo que cada página es un recorrido
+de índice acotado sin importar cuántas filas hay antes.
+
+Un listado que filtra por varios valores de la columna que encabeza el
+índice (``estado IN (...)``) no puede leerse en orden de un único índice:
+se pagina cada partición (``particiones_cursor``) por separado y las
+páginas se mezclan en Python.
+"""
+
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import BadRequest, ValidationError
+from django.db.models import Q
+
+
+def codificar_cursor(valores) -> str:
+    crudo = json.dumps(
+        [valor.isoformat() if isinstance(valor, datetime) else valor for valor in valores],
+        separators=(',', ':'),
+    )
+    return base64.urlsafe_b64encode(crudo.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(cursor: str, cantidad: int) -> list:
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except ValueError:
+        raise BadRequest('Cursor inválido') from None
+    if not isinstance(valores, list) or len(valores) != cantidad:
+        raise BadRequest('Cursor inválido')
+    if not all(isinstance(valor, (str, int, float)) and not isinstance(valor, bool) for valor in valores):
+        raise BadRequest('Cursor inválido')
+    return valores
+
+
+def _valores_de_cursor(modelo, orden, cursor: str) -> list:
+    """Valores del cursor convertidos al tipo de cada campo del orden."""
+
+    valores = decodificar_cursor(cursor, len(orden))
+    convertidos = []
+    for campo, valor in zip(orden, valores):
+        nombre = campo.lstrip('-')
+        campo_modelo = modelo._meta.pk if nombre == 'pk' else modelo._meta.get_field(nombre)
+        try:
+            convertidos.append(campo_modelo.to_python(valor))
+        except ValidationError:
+            raise BadRequest('Cursor inválido') from None
+    return convertidos
+
+
+def _filtro_keyset(orden, valores, hacia_adelante: bool) -> Q:
+    """Condición ``(a, b, ...) > (va, vb, ...)`` respetando el sentido de cada campo."""
+
+    condicion = Q()
+    prefijo = Q()
+    for campo, valor in zip(orden, valores):
+        descendente = campo.startswith('-')
+        nombre = campo.lstrip('-')
+        operador = 'lt' if descendente == hacia_adelante else 'gt'
+        condicion |= prefijo & Q(**{f'{nombre}__{operador}': valor})
+        prefijo &= Q(**{nombre: valor})
+    return condicion
+
+
+def _invertir(orden):
+    return [campo[1:] if campo.startswith('-') else f'-{campo}' for campo in orden]
+
+
+class PaginaCursor:
+    def __init__(self, objetos, orden, tiene_anterior: bool, tiene_siguiente: bool):
+        self.objetos = objetos
+        self.tiene_anterior = tiene_anterior and bool(objetos)
+        self.tiene_siguiente = tiene_siguiente and bool(objetos)
+        nombres = [campo.lstrip('-') for campo in orden]
+        self.cursor_anterior = self._cursor(objetos[0], nombres) if self.tiene_anterior else None
+        self.cursor_siguiente = self._cursor(objetos[-1], nombres) if self.tiene_siguiente else None
+
+    @staticmethod
+    def _cursor(objeto, nombres) -> str:
+        return codificar_cursor([getattr(objeto, nombre) for nombre in nombres])
+
+
+def _ordenar(filas, orden):
+    for campo in reversed(orden):
+        filas.sort(key=lambda fila: getattr(fila, campo.lstrip('-')), reverse=campo.startswith('-'))
+    return filas
+
+
+def _leer(particiones, filtro, orden, limite: int) -> list:
+    """Las primeras ``limite`` filas de la unión de ``particiones`` en ``orden``."""
+
+    filas = []
+    for queryset in particiones:
+        if filtro is not None:
+            queryset = queryset.filter(filtro)
+        filas.extend(queryset.order_by(*orden)[:limite])
+    return _ordenar(filas, orden)[:limite] if len(particiones) > 1 else filas
+
+
+def paginar_por_cursor(queryset, orden, por_pagina: int, despues: str | None = None, antes: str | None = None):
+    """Devuelve la página de ``queryset`` posterior a ``despues`` o anterior a ``antes``.
+
+    ``orden`` debe identificar unívocamente cada fila (terminar en un campo
+    único, normalmente ``pk``) para que el cursor no saltee ni repita filas.
+    ``queryset`` también puede ser una lista de querysets disjuntos del mismo
+    modelo; cada uno se lee con su propio ``LIMIT`` y se mezclan.
+    """
+
+    orden = list(orden)
+    particiones = list(queryset) if isinstance(queryset, (list, tuple)) else [queryset]
+    modelo = particiones[0].model
+    if antes:
+        valores = _valores_de_cursor(modelo, orden, antes)
+        filtro = _filtro_keyset(orden, valores, hacia_adelante=False)
+        filas = _leer(particiones, filtro, _invertir(orden), por_pagina + 1)
+        objetos = filas[:por_pagina][::-1]
+        return PaginaCursor(objetos, orden, tiene_anterior=len(filas) > por_pagina, tiene_siguiente=True)
+
+    filtro = None
+    if despues:
+        filtro = _filtro_keyset(orden, _valores_de_cursor(modelo, orden, despues), hacia_adelante=True)
+    filas = _leer(particiones, filtro, orden, por_pagina + 1)
+    return PaginaCursor(
+        filas[:por_pagina],
+        orden,
+        tiene_anterior=bool(despues),
+        tiene_siguiente=len(filas) > por_pagina,
+    )
+
+
+class PaginacionCursorMixin:
+    """Mixin para ``ListView`` que pagina con ``?despues=`` / ``?antes=``."""
+
+    orden_cursor = ('pk',)
+    por_pagina = 50
+
+    def particiones_cursor(self, queryset):
+        """Querysets disjuntos que se paginan por separado; por defecto, uno solo."""
+
+        return [queryset]
+
+    def get_context_data(self, **kwargs):
+        pagina = paginar_por_cursor(
+            self.particiones_cursor(self.object_list),
+            self.orden_cursor,
+            self.por_pagina,
+            despues=self.request.GET.get('despues'),
+            antes=self.request.GET.get('antes'),
+        )
+        kwargs.setdefault('pagina', pagina)
+        return super().get_context_data(object_list=pagina.objetos, **kwargs)
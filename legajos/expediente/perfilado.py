@@ -0,0 +1,144 @@
+"""Perfilado de CPU de pedidos individuales, a pedido.
+
+Un administrador agrega ``?perfilar=1`` a la URL (o la cabecera
+``X-Perfilar: 1``) y ``PerfiladoMiddleware`` ejecuta ese pedido con un
+muestreador de pila: un hilo que cada ``INTERVALO_MS`` toma el frame
+actual del hilo del pedido. Cubre la vista, la validación de formularios
+y el render de la plantilla.
+
+El resultado se guarda en ``DIRECTORIO`` en formato de pilas colapsadas
+(``marco;marco;marco cantidad``), el que leen ``flamegraph.pl`` y
+speedscope. El directorio funciona como buffer circular: se conservan los
+últimos ``MAXIMO`` perfiles. La página ``perfil_list`` los lista y
+descarga.
+
+Sin el parámetro el middleware sólo mira la query string y las cabeceras.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+
+from .permissions import es_administrador
+
+PARAMETRO = 'perfilar'
+CABECERA = 'HTTP_X_PERFILAR'
+EXTENSION = '.folded'
+
+CONFIGURACION = {
+    # Sin directorio el perfilado queda desactivado.
+    'DIRECTORIO': None,
+    'MAXIMO': 50,
+    'INTERVALO_MS': 1.0,
+}
+
+_NOMBRE_VALIDO = re.compile(rf'^[\w.-]+{re.escape(EXTENSION)}$')
+
+
+def configuracion() -> dict:
+    return {**CONFIGURACION, **getattr(settings, 'PERFILADO', {})}
+
+
+def directorio() -> Path | None:
+    ruta = configuracion()['DIRECTORIO']
+    return Path(ruta) if ruta else None
+
+
+def _marco(frame) -> str:
+    codigo = frame.f_code
+    archivo = os.path.relpath(codigo.co_filename, settings.BASE_DIR)
+    if archivo.startswith('..'):
+        # Fuera del proyecto (Django, biblioteca estándar): el módulo alcanza.
+        archivo = frame.f_globals.get('__name__', codigo.co_filename)
+    # ``;`` separa marcos en el formato colapsado.
+    return f'{codigo.co_name} ({archivo}:{codigo.co_firstlineno})'.replace(';', ',')
+
+
+class MuestreadorPila:
+    """Cuenta las pilas del hilo ``ident`` mientras está activo."""
+
+    def __init__(self, ident: int, intervalo_ms: float):
+        self.ident = ident
+        self.intervalo = intervalo_ms / 1000
+        self.pilas = Counter()
+        self._detener = threading.Event()
+        self._hilo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def _muestrear(self):
+        propio = sys._getframe()
+        while not self._detener.wait(self.intervalo):
+            frame = sys._current_frames().get(self.ident)
+            marcos = []
+            while frame is not None and frame is not propio:
+                marcos.append(_marco(frame))
+                frame = frame.f_back
+            if marcos:
+                self.pilas[';'.join(reversed(marcos))] += 1
+
+    def __enter__(self):
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._detener.set()
+        self._hilo.join()
+
+    def colapsado(self) -> str:
+        return ''.join(f'{pila} {cantidad}\n' for pila, cantidad in self.pilas.most_common())
+
+
+def guardar(contenido: str, request, ms: float) -> str:
+    """Escribe el perfil y descarta los más viejos; devuelve el nombre del archivo."""
+
+    config = configuracion()
+    carpeta = Path(config['DIRECTORIO'])
+    carpeta.mkdir(parents=True, exist_ok=True)
+    ruta = re.sub(r'[^\w-]+', '_', request.path).strip('_') or 'raiz'
+    nombre = f"{timezone.now():%Y%m%dT%H%M%S%f}-{request.method.lower()}-{ruta[:60]}-{ms:.0f}ms{EXTENSION}"
+    (carpeta / nombre).write_text(contenido)
+    for viejo in listar()[config['MAXIMO']:]:
+        viejo.unlink(missing_ok=True)
+    return nombre
+
+
+def listar() -> list[Path]:
+    """Perfiles guardados, del más nuevo al más viejo."""
+
+    carpeta = directorio()
+    if carpeta is None or not carpeta.is_dir():
+        return []
+    return sorted(carpeta.glob(f'*{EXTENSION}'), reverse=True)
+
+
+def buscar(nombre: str) -> Path | None:
+    carpeta = directorio()
+    if carpeta is None or not _NOMBRE_VALIDO.match(nombre):
+        return None
+    ruta = carpeta / nombre
+    return ruta if ruta.is_file() else None
+
+
+class PerfiladoMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.intervalo_ms = configuracion()['INTERVALO_MS']
+        if directorio() is None:
+            raise MiddlewareNotUsed
+
+    def __call__(self, request):
+        if not (request.GET.get(PARAMETRO) or request.META.get(CABECERA)) or not es_administrador(request.user):
+            return self.get_response(request)
+        inicio = time.perf_counter()
+        with MuestreadorPila(threading.get_ident(), self.intervalo_ms) as muestreador:
+            response = self.get_response(request)
+        ms = (time.perf_counter() - inicio) * 1000
+        response['X-Perfil'] = guardar(muestreador.colapsado(), request, ms)
+        return response
@@ -1,7 +1,65 @@
 """Helpers de autorización específicos del dominio expediente."""
 
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Exists, OuterRef
+
 ADMIN_GROUP_NAME = 'Administradores'
 USERS_GROUP_NAME = 'Solicitantes'
+ROLES = (ADMIN_GROUP_NAME, USERS_GROUP_NAME)
+
+
+def _anotaciones_roles() -> dict:
+    pertenencias = get_user_model().groups.through.objects.filter(user_id=OuterRef('pk'))
+    return {
+        f'_rol_{posicion}': Exists(pertenencias.filter(group__name=nombre))
+        for posicion, nombre in enumerate(ROLES)
+    }
+
+
+class RolesBackend(ModelBackend):
+    """``ModelBackend`` que resuelve los roles del dominio en la misma
+    consulta que carga el usuario de la sesión.
+
+    Los roles quedan memorizados sobre ``request.user`` y se leen de la base
+    en cada request, así que un cambio de grupos se ve enseguida en todos
+    los procesos sin una caché que invalidar.
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        try:
+            usuario = UserModel._default_manager.annotate(**_anotaciones_roles()).get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        usuario._roles_expediente = frozenset(
+            nombre for posicion, nombre in enumerate(ROLES) if getattr(usuario, f'_rol_{posicion}')
+        )
+        return usuario if self.user_can_authenticate(usuario) else None
+
+
+def roles_usuario(usuario) -> frozenset:
+    """Nombres de los grupos del dominio a los que pertenece el usuario.
+
+    El usuario de la sesión ya los trae de ``RolesBackend``; para cualquier
+    otro se resuelven con una sola consulta para ambos grupos y se memorizan
+    sobre el objeto.
+    """
+
+    roles = getattr(usuario, '_roles_expediente', None)
+    if roles is None:
+        roles = frozenset(usuario.groups.filter(name__in=ROLES).values_list('name', flat=True))
+        usuario._roles_expediente = roles
+    return roles
+
+
+def olvidar_roles(sender, instance, action, reverse, **kwargs):
+    """Receptor de ``m2m_changed`` sobre ``User.groups``: descarta los roles
+    memorizados en el usuario modificado, para que el mismo objeto no siga
+    viendo los anteriores."""
+
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        instance.__dict__.pop('_roles_expediente', None)
 
 
 def es_administrador(usuario) -> bool:
@@ -9,7 +67,7 @@ def es_administrador(usuario) -> bool:
 
     if not usuario.is_authenticated:
         return False
-    return usuario.is_staff or usuario.groups.filter(name=ADMIN_GROUP_NAME).exists()
+    return usuario.is_staff or ADMIN_GROUP_NAME in roles_usuario(usuario)
 
 
 def es_solicitante(usuario) -> bool:
@@ -17,4 +75,4 @@ def es_solicitante(usuario) -> bool:
 
     if not usuario.is_authenticated:
         return False
-    return es_administrador(usuario) or usuario.groups.filter(name=USERS_GROUP_NAME).exists()
+    return es_administrador(usuario) or USERS_GROUP_NAME in roles_usuario(usuario)
@@ -0,0 +1,278 @@
+"""Medición de tiempos y cantidad de consultas de cada vista.
+
+Cada URL de ``expediente/urls.py`` y el dashboard tienen un
+``Escenario``: qué usuario la pide, con qué método y datos, y cuántas
+consultas SQL puede hacer como máximo. ``medir`` ejecuta los escenarios
+sobre la base actual (los que modifican datos, dentro de una transacción
+que se revierte) y ``comparar`` los contrasta con los presupuestos y con
+una línea de base guardada en JSON.
+
+Se usa desde las pruebas, con un archivo sintético chico, y desde
+``manage.py medir_vistas`` sobre un archivo generado con
+``generar_datos``.
+"""
+
+import json
+import statistics
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Callable
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .models import Devolucion, Legajo, Prestamo, Solicitud
+
+RUTA_BASE = Path(__file__).with_name('rendimiento_base.json')
+# Tolerancias por defecto frente a la línea de base: proporción de tiempo
+# extra y margen absoluto, para no fallar por ruido en vistas de pocos ms.
+UMBRAL = 0.5
+MARGEN_MS = 5.0
+
+
+class _Deshacer(Exception):
+    pass
+
+
+@dataclass
+class Muestra:
+    """Objetos de la base sobre los que se arman las URLs de los escenarios."""
+
+    administrador: object
+    solicitud_pendiente: Solicitud
+    solicitud_preparada: Solicitud
+    prestamo_entregado: Prestamo
+    devolucion: Devolucion
+    legajo_disponible: Legajo
+
+    @classmethod
+    def tomar(cls) -> 'Muestra':
+        def primero(queryset, descripcion):
+            objeto = queryset.order_by('pk').first()
+            if objeto is None:
+                raise LookupError(f'No hay {descripcion} en la base; genere datos con generar_datos.')
+            return objeto
+
+        return cls(
+            administrador=primero(get_user_model().objects.filter(is_staff=True, is_active=True), 'administradores'),
+            solicitud_pendiente=primero(
+                Solicitud.objects.filter(estado=Solicitud.ESTADO_PENDIENTE).select_related('usuario'),
+                'solicitudes pendientes',
+            ),
+            solicitud_preparada=primero(
+                Solicitud.objects.filter(estado=Solicitud.ESTADO_PREPARADA).select_related('usuario'),
+                'solicitudes preparadas',
+            ),
+            prestamo_entregado=primero(
+                Prestamo.objects.filter(estado=Prestamo.ESTADO_ENTREGADO, devolucion__isnull=True)
+                .select_related('usuario'),
+                'préstamos entregados',
+            ),
+            devolucion=primero(
+                Devolucion.objects.filter(estado=Devolucion.ESTADO_PENDIENTE).select_related('usuario'),
+                'devoluciones pendientes',
+            ),
+            legajo_disponible=primero(Legajo.objects.disponibles(), 'legajos disponibles'),
+        )
+
+
+@dataclass
+class Escenario:
+    nombre: str
+    usuario: Callable[[Muestra], object]
+    presupuesto: int
+    metodo: str = 'get'
+    args: Callable[[Muestra], list] = lambda muestra: []
+    datos: Callable[[Muestra], dict] = lambda muestra: {}
+    # Pedidos previos (dentro de la misma transacción) que dejan la sesión lista.
+    preparar: Callable[[Client, Muestra], None] | None = None
+
+    @property
+    def modifica(self) -> bool:
+        return self.metodo != 'get'
+
+
+def _admin(muestra):
+    return muestra.administrador
+
+
+def _llenar_carrito(cliente, muestra):
+    cliente.post(reverse('carrito_agregar'), {'codigos': muestra.legajo_disponible.codigo})
+
+
+ESCENARIOS = [
+    Escenario('dashboard', _admin, presupuesto=3),
+    Escenario('dashboard_solicitante', lambda m: m.solicitud_pendiente.usuario, presupuesto=3),
+    Escenario('legajo_list', _admin, presupuesto=3),
+    Escenario('legajo_buscar', lambda m: m.solicitud_pendiente.usuario, presupuesto=3, datos=lambda m: {'q': 'legajo 1'}),
+    Escenario('legajo_create', _admin, presupuesto=2),
+    Escenario('legajo_importar', _admin, presupuesto=2),
+    Escenario('legajo_historial', _admin, presupuesto=4, args=lambda m: [m.legajo_disponible.pk]),
+    Escenario(
+        'legajo_toggle_bloqueo', _admin, presupuesto=5, metodo='post',
+        args=lambda m: [m.legajo_disponible.pk],
+    ),
+    Escenario('solicitud_list', lambda m: m.solicitud_pendiente.usuario, presupuesto=3),
+    Escenario('solicitud_admin_list', _admin, presupuesto=4),
+    Escenario('solicitud_cola', _admin, presupuesto=9, metodo='post', datos=lambda m: {'cantidad': 1}),
+    Escenario('solicitud_create', lambda m: m.solicitud_pendiente.usuario, presupuesto=2),
+    Escenario(
+        'carrito_agregar', lambda m: m.solicitud_pendiente.usuario, presupuesto=6, metodo='post',
+        datos=lambda m: {'codigos': m.legajo_disponible.codigo},
+    ),
+    Escenario(
+        'carrito_quitar', lambda m: m.solicitud_pendiente.usuario, presupuesto=5, metodo='post',
+        args=lambda m: [m.legajo_disponible.pk], preparar=_llenar_carrito,
+    ),
+    Escenario(
+        'carrito_confirmar', lambda m: m.solicitud_pendiente.usuario, presupuesto=15, metodo='post',
+        preparar=_llenar_carrito,
+    ),
+    Escenario(
+        'solicitud_detail', lambda m: m.solicitud_pendiente.usuario, presupuesto=5,
+        args=lambda m: [m.solicitud_pendiente.pk],
+    ),
+    Escenario(
+        'solicitud_preparar', _admin, presupuesto=16, metodo='post',
+        args=lambda m: [m.solicitud_pendiente.pk],
+        datos=lambda m: {'prestamos_listos': list(m.solicitud_pendiente.prestamos.values_list('pk', flat=True))},
+    ),
+    Escenario(
+        'solicitud_confirmar_entrega', lambda m: m.solicitud_preparada.usuario, presupuesto=12, metodo='post',
+        args=lambda m: [m.solicitud_preparada.pk],
+    ),
+    Escenario('devolucion_list', lambda m: m.devolucion.usuario, presupuesto=3),
+    Escenario('devolucion_admin_list', _admin, presupuesto=3),
+    Escenario('devolucion_create', lambda m: m.prestamo_entregado.usuario, presupuesto=3),
+    Escenario(
+        'devolucion_detail', lambda m: m.devolucion.usuario, presupuesto=4,
+        args=lambda m: [m.devolucion.pk],
+    ),
+    Escenario(
+        'devolucion_confirmar', _admin, presupuesto=15, metodo='post',
+        args=lambda m: [m.devolucion.pk],
+    ),
+    Escenario(
+        'prestamo_exportar', _admin, presupuesto=3,
+        datos=lambda m: {'formato': 'csv', 'estado': Prestamo.ESTADO_LISTO},
+    ),
+    Escenario('reporte', _admin, presupuesto=7, datos=lambda m: {'periodo': 'semana'}),
+    Escenario('perfil_list', _admin, presupuesto=2),
+    Escenario('eventos', _admin, presupuesto=2, datos=lambda m: {'espera': 0}),
+    Escenario(
+        'prestamo_devolver', lambda m: m.prestamo_entregado.usuario, presupuesto=8, metodo='post',
+        args=lambda m: [m.prestamo_entregado.pk],
+    ),
+]
+
+
+def url_de(escenario: Escenario, muestra: Muestra) -> str:
+    nombre = 'dashboard' if escenario.nombre == 'dashboard_solicitante' else escenario.nombre
+    return reverse(nombre, args=escenario.args(muestra))
+
+
+@dataclass
+class Medicion:
+    nombre: str
+    consultas: int
+    ms: float
+    ms_max: float
+    status: int
+    tiempos: list = field(default_factory=list, repr=False)
+
+
+def _pedir(cliente, escenario, url, datos):
+    inicio = time.perf_counter()
+    respuesta = getattr(cliente, escenario.metodo)(url, datos)
+    if respuesta.streaming:
+        b''.join(respuesta.streaming_content)
+    return respuesta, (time.perf_counter() - inicio) * 1000
+
+
+def medir_escenario(escenario: Escenario, muestra: Muestra, *, repeticiones: int = 5, **cliente_kwargs) -> Medicion:
+    """Pide la URL ``repeticiones`` veces (más una de precalentamiento) y
+    devuelve la mediana del tiempo y las consultas de la última."""
+
+    cliente = Client(**cliente_kwargs)
+    cliente.force_login(escenario.usuario(muestra))
+    url = url_de(escenario, muestra)
+    datos = escenario.datos(muestra)
+    tiempos, consultas, status = [], 0, None
+    for vuelta in range(repeticiones + 1):
+        try:
+            with transaction.atomic():
+                if escenario.preparar:
+                    escenario.preparar(cliente, muestra)
+                with CaptureQueriesContext(connection) as capturadas:
+                    respuesta, ms = _pedir(cliente, escenario, url, datos)
+                if escenario.modifica:
+                    raise _Deshacer
+        except _Deshacer:
+            pass
+        if vuelta:
+            tiempos.append(ms)
+        consultas, status = len(capturadas.captured_queries), respuesta.status_code
+    return Medicion(
+        nombre=escenario.nombre,
+        consultas=consultas,
+        ms=round(statistics.median(tiempos), 2),
+        ms_max=round(max(tiempos), 2),
+        status=status,
+        tiempos=tiempos,
+    )
+
+
+def medir(escenarios=None, *, repeticiones: int = 5, **cliente_kwargs) -> list[Medicion]:
+    muestra = Muestra.tomar()
+    return [
+        medir_escenario(escenario, muestra, repeticiones=repeticiones, **cliente_kwargs)
+        for escenario in (escenarios or ESCENARIOS)
+    ]
+
+
+def cargar_base(ruta=RUTA_BASE) -> dict:
+    ruta = Path(ruta)
+    return json.loads(ruta.read_text()) if ruta.exists() else {}
+
+
+def guardar_base(mediciones, ruta=RUTA_BASE) -> None:
+    base = {
+        medicion.nombre: {'consultas': medicion.consultas, 'ms': medicion.ms}
+        for medicion in mediciones
+    }
+    Path(ruta).write_text(json.dumps(base, indent=2, sort_keys=True) + '\n')
+
+
+def comparar(mediciones, base=None, *, umbral: float | None = UMBRAL, margen_ms: float = MARGEN_MS) -> list[str]:
+    """Problemas encontrados: respuestas de error, presupuestos excedidos y
+    regresiones frente a ``base``. Con ``umbral=None`` no se comparan tiempos."""
+
+    presupuestos = {escenario.nombre: escenario.presupuesto for escenario in ESCENARIOS}
+    base = base or {}
+    problemas = []
+    for medicion in mediciones:
+        if medicion.status >= 400:
+            problemas.append(f'{medicion.nombre}: respondió {medicion.status}')
+        presupuesto = presupuestos.get(medicion.nombre)
+        if presupuesto is not None and medicion.consultas > presupuesto:
+            problemas.append(f'{medicion.nombre}: {medicion.consultas} consultas, presupuesto {presupuesto}')
+        anterior = base.get(medicion.nombre)
+        if not anterior:
+            continue
+        if medicion.consultas > anterior['consultas']:
+            problemas.append(
+                f"{medicion.nombre}: {medicion.consultas} consultas, la línea de base tiene {anterior['consultas']}"
+            )
+        if umbral is not None and medicion.ms > anterior['ms'] * (1 + umbral) + margen_ms:
+            problemas.append(f"{medicion.nombre}: {medicion.ms} ms, la línea de base tiene {anterior['ms']} ms")
+    return problemas
+
+
+def como_dict(medicion: Medicion) -> dict:
+    datos = asdict(medicion)
+    datos.pop('tiempos')
+    return datos
@@ -0,0 +1,210 @@
+"""Resúmenes diarios para los reportes de gestión.
+
+``ResumenDiario``, ``ResumenLegajoDiario`` y ``ResumenUsuarioDiario``
+acumulan, por día, lo que hace falta para los legajos más pedidos, el
+tiempo medio en poder de cada usuario, la tasa de extravío y la demora de
+preparación. Se alimentan de la bitácora (``EventoPrestamo``), que sólo
+crece: ``actualizar`` procesa los eventos posteriores a la marca de agua
+guardada en ``MarcaResumen`` y la avanza en la misma transacción que suma
+los totales, así que cada evento se cuenta una sola vez. Los reportes leen
+únicamente estas tablas, sin tocar ``Prestamo`` ni ``SolicitudItem``.
+
+Los eventos se procesan en orden de id. Un id puede confirmarse después
+que otro mayor; para no saltearlo, no se pasa de los eventos de los
+últimos ``RETRASO``.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import (
+    EventoPrestamo,
+    Legajo,
+    MarcaResumen,
+    ResumenDiario,
+    ResumenLegajoDiario,
+    ResumenUsuarioDiario,
+)
+
+CLAVE = 'eventos'
+LOTE = 5000
+RETRASO = timedelta(minutes=5)
+PERIODOS = {'dia': None, 'semana': TruncWeek, 'mes': TruncMonth}
+
+CAMPOS_DIARIO = ('creados', 'listos', 'extraviados', 'entregados', 'devueltos', 'preparacion')
+CONTEO_POR_TIPO = {
+    EventoPrestamo.TIPO_CREADO: 'creados',
+    'listo': 'listos',
+    'extraviado': 'extraviados',
+    'entregado': 'entregados',
+    'devuelto': 'devueltos',
+}
+
+
+def _inicios(eventos, tipo):
+    # Instante del evento ``tipo`` de cada préstamo: el alta para medir la
+    # preparación, la entrega para medir el tiempo fuera.
+    ids = {evento['prestamo_id'] for evento in eventos}
+    return dict(
+        EventoPrestamo.objects.filter(prestamo_id__in=ids, tipo=tipo)
+        .order_by('ocurrido_en')
+        .values_list('prestamo_id', 'ocurrido_en')
+    )
+
+
+def _acumular(eventos):
+    diario = defaultdict(lambda: dict.fromkeys(CAMPOS_DIARIO, 0) | {'preparacion': timedelta()})
+    por_legajo = defaultdict(int)
+    por_usuario = defaultdict(lambda: {'devueltos': 0, 'tiempo_fuera': timedelta()})
+    altas = _inicios([e for e in eventos if e['tipo'] == 'listo'], EventoPrestamo.TIPO_CREADO)
+    entregas = _inicios([e for e in eventos if e['tipo'] == 'devuelto'], 'entregado')
+    for evento in eventos:
+        campo = CONTEO_POR_TIPO.get(evento['tipo'])
+        if campo is None:
+            continue
+        fecha = timezone.localdate(evento['ocurrido_en'])
+        diario[fecha][campo] += 1
+        if evento['tipo'] == EventoPrestamo.TIPO_CREADO:
+            por_legajo[fecha, evento['legajo_id']] += 1
+        elif evento['tipo'] == 'listo' and evento['prestamo_id'] in altas:
+            diario[fecha]['preparacion'] += evento['ocurrido_en'] - altas[evento['prestamo_id']]
+        elif evento['tipo'] == 'devuelto' and evento['usuario_id'] is not None:
+            usuario = por_usuario[fecha, evento['usuario_id']]
+            usuario['devueltos'] += 1
+            if evento['prestamo_id'] in entregas:
+                usuario['tiempo_fuera'] += evento['ocurrido_en'] - entregas[evento['prestamo_id']]
+    return diario, por_legajo, por_usuario
+
+
+def _sumar(modelo, deltas, claves, campos):
+    """Suma ``deltas`` (``{clave: {campo: delta}}``) a las filas de ``modelo``,
+    creándolas si faltan. Se llama con la marca bloqueada, así que nadie más
+    escribe estas filas a la vez."""
+
+    if not deltas:
+        return
+    # Un superconjunto de las filas afectadas, sin un OR por clave.
+    filtro = {f'{campo}__in': {clave[posicion] for clave in deltas} for posicion, campo in enumerate(claves)}
+    existentes = {
+        tuple(getattr(fila, campo) for campo in claves): fila
+        for fila in modelo.objects.filter(**filtro)
+    }
+    nuevas, modificadas = [], []
+    for clave, valores in deltas.items():
+        fila = existentes.get(clave)
+        if fila is None:
+            fila = modelo(**dict(zip(claves, clave)))
+            nuevas.append(fila)
+        else:
+            modificadas.append(fila)
+        for campo, delta in valores.items():
+            setattr(fila, campo, getattr(fila, campo) + delta)
+    modelo.objects.bulk_create(nuevas, batch_size=500)
+    modelo.objects.bulk_update(modificadas, campos, batch_size=500)
+
+
+def actualizar(*, lote: int = LOTE, al_confirmar_lote=None) -> int:
+    """Vuelca en los resúmenes los eventos nuevos y devuelve cuántos procesó.
+
+    ``al_confirmar_lote(total)`` se llama tras cada lote confirmado.
+    """
+
+    total = 0
+    while True:
+        with transaction.atomic():
+            MarcaResumen.objects.get_or_create(clave=CLAVE)
+            marca = MarcaResumen.objects.select_for_update().get(clave=CLAVE)
+            limite = timezone.now() - RETRASO
+            eventos = list(
+                EventoPrestamo.objects.filter(pk__gt=marca.ultimo_evento)
+                .order_by('pk')
+                .values('pk', 'tipo', 'legajo_id', 'prestamo_id', 'usuario_id', 'ocurrido_en')[:lote]
+            )
+            recientes = next((i for i, evento in enumerate(eventos) if evento['ocurrido_en'] > limite), None)
+            completo = len(eventos) < lote or recientes is not None
+            eventos = eventos[:recientes]
+            if eventos:
+                diario, por_legajo, por_usuario = _acumular(eventos)
+                _sumar(ResumenDiario, {(fecha,): valores for fecha, valores in diario.items()},
+                       ('fecha',), CAMPOS_DIARIO)
+                _sumar(ResumenLegajoDiario, {clave: {'solicitudes': n} for clave, n in por_legajo.items()},
+                       ('fecha', 'legajo_id'), ('solicitudes',))
+                _sumar(ResumenUsuarioDiario, por_usuario, ('fecha', 'usuario_id'), ('devueltos', 'tiempo_fuera'))
+                marca.ultimo_evento = eventos[-1]['pk']
+                marca.save()
+        total += len(eventos)
+        if eventos and al_confirmar_lote is not None:
+            al_confirmar_lote(total)
+        if completo:
+            return total
+
+
+@transaction.atomic
+def reiniciar() -> None:
+    """Borra los resúmenes y la marca, para recalcularlos desde el principio."""
+
+    for modelo in (ResumenDiario, ResumenLegajoDiario, ResumenUsuarioDiario, MarcaResumen):
+        modelo.objects.all().delete()
+
+
+def marca():
+    return MarcaResumen.objects.filter(clave=CLAVE).first()
+
+
+def _redondear(duracion: timedelta) -> timedelta:
+    return timedelta(seconds=round(duracion.total_seconds()))
+
+
+def legajos_mas_pedidos(desde, hasta, cantidad: int = 10) -> list[tuple[Legajo, int]]:
+    ranking = list(
+        ResumenLegajoDiario.objects.filter(fecha__range=(desde, hasta))
+        .values('legajo_id')
+        .annotate(total=models.Sum('solicitudes'))
+        .order_by('-total', 'legajo_id')[:cantidad]
+    )
+    legajos = Legajo.objects.in_bulk([fila['legajo_id'] for fila in ranking])
+    return [(legajos[fila['legajo_id']], fila['total']) for fila in ranking if fila['legajo_id'] in legajos]
+
+
+def tiempo_fuera_por_usuario(desde, hasta) -> list[dict]:
+    filas = (
+        ResumenUsuarioDiario.objects.filter(fecha__range=(desde, hasta))
+        .values('usuario__username')
+        .annotate(devueltos=models.Sum('devueltos'), tiempo_fuera=models.Sum('tiempo_fuera'))
+        .order_by('usuario__username')
+    )
+    return [
+        {**fila, 'promedio': _redondear(fila['tiempo_fuera'] / fila['devueltos'])}
+        for fila in filas
+        if fila['devueltos']
+    ]
+
+
+def por_periodo(desde, hasta, periodo: str = 'mes') -> list[dict]:
+    """Extravíos y demora de preparación agrupados por ``PERIODOS[periodo]``.
+
+    La tasa de extravío es la proporción de préstamos extraviados entre los
+    que terminaron su preparación (listos o extraviados).
+    """
+
+    truncar = PERIODOS[periodo]
+    filas = ResumenDiario.objects.filter(fecha__range=(desde, hasta))
+    filas = filas.annotate(periodo=truncar('fecha') if truncar else models.F('fecha'))
+    filas = (
+        filas.values('periodo')
+        .annotate(**{campo: models.Sum(campo) for campo in CAMPOS_DIARIO})
+        .order_by('periodo')
+    )
+    resultado = []
+    for fila in filas:
+        preparados = fila['listos'] + fila['extraviados']
+        resultado.append({
+            **fila,
+            'tasa_extravio': fila['extraviados'] / preparados if preparados else None,
+            'preparacion_media': _redondear(fila['preparacion'] / fila['listos']) if fila['listos'] else None,
+        })
+    return resultado
@@ -0,0 +1,75 @@
+from rest_framework import serializers
+
+from .models import Legajo, Prestamo, Solicitud
+
+
+def campos_pedidos(request) -> set[str] | None:
+    """Campos de ``?fields=a,b`` o ``None`` si se piden todos."""
+
+    crudo = request.query_params.get('fields') if request is not None else None
+    if not crudo:
+        return None
+    return {campo.strip() for campo in crudo.split(',') if campo.strip()}
+
+
+class CamposDinamicosMixin:
+    """Limita la representación a los campos de ``?fields=`` (sparse fieldsets)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        pedidos = campos_pedidos(self.context.get('request'))
+        if pedidos:
+            for nombre in set(self.fields) - pedidos:
+                self.fields.pop(nombre)
+
+
+class LegajoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    disponible = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = Legajo
+        fields = ['id', 'codigo', 'nombre', 'descripcion', 'estado', 'bloqueado', 'disponible', 'creado_en', 'actualizado_en']
+
+
+class PrestamoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    legajo = serializers.CharField(source='legajo.codigo', read_only=True)
+    usuario = serializers.CharField(source='usuario.username', read_only=True)
+
+    class Meta:
+        model = Prestamo
+        fields = [
+            'id',
+            'solicitud',
+            'legajo',
+            'usuario',
+            'estado',
+            'creado_en',
+            'entregado_en',
+            'devuelto_en',
+            'actualizado_en',
+        ]
+
+
+class PrestamoDeSolicitudSerializer(serializers.ModelSerializer):
+    legajo = serializers.CharField(source='legajo.codigo', read_only=True)
+
+    class Meta:
+        model = Prestamo
+        fields = ['id', 'legajo', 'estado', 'entregado_en', 'devuelto_en']
+
+
+class SolicitudSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    usuario = serializers.CharField(source='usuario.username', read_only=True)
+    prestamos = PrestamoDeSolicitudSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Solicitud
+        fields = ['id', 'usuario', 'estado', 'creado_en', 'actualizado_en', 'prestamos']
+
+
+class DisponibilidadSerializer(serializers.Serializer):
+    codigos = serializers.ListField(
+        child=serializers.CharField(max_length=Legajo._meta.get_field('codigo').max_length),
+        allow_empty=False,
+        max_length=1000,
+    )
@@ -0,0 +1,134 @@
+"""Operaciones del flujo de préstamos que involucran varias entidades a la vez."""
+
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from .models import Devolucion, Legajo, Prestamo, Solicitud, SolicitudItem
+from .signals import prestamos_creados
+
+
+class LegajosNoDisponibles(Exception):
+    """Alguno de los legajos pedidos ya no puede reservarse."""
+
+    def __init__(self, codigos):
+        self.codigos = sorted(codigos)
+        super().__init__(f"Legajos no disponibles: {', '.join(self.codigos)}")
+
+
+class PrestamosNoDevolvibles(Exception):
+    """Alguno de los préstamos no está entregado al usuario o ya tiene una devolución."""
+
+    def __init__(self, codigos):
+        self.codigos = sorted(codigos)
+        super().__init__(f"Legajos que no pueden devolverse: {', '.join(self.codigos)}")
+
+
+class _ReservaIncompleta(Exception):
+    pass
+
+
+def _codigos_no_disponibles(ids) -> list[str]:
+    """Códigos de los legajos no disponibles; los que ya no existen, como ``#id``."""
+
+    existentes = {
+        pk: (codigo, estado)
+        for pk, codigo, estado in Legajo.objects.filter(pk__in=ids).values_list('pk', 'codigo', 'estado')
+    }
+    return [
+        existentes[pk][0] if pk in existentes else f'#{pk} (no existe)'
+        for pk in ids
+        if pk not in existentes or existentes[pk][1] != Legajo.ESTADO_DISPONIBLE
+    ]
+
+
+def crear_solicitud(usuario, legajos) -> Solicitud:
+    """Crea una solicitud reservando todos los legajos en una sola transacción.
+
+    La disponibilidad se comprueba y se reserva con un único ``UPDATE``
+    condicionado al estado, de modo que dos solicitudes simultáneas sobre
+    los mismos legajos no pueden ganar ambas. Si algún legajo no está
+    disponible no se crea nada y se lanza ``LegajosNoDisponibles``.
+    """
+
+    ids = sorted({getattr(legajo, 'pk', legajo) for legajo in legajos})
+    try:
+        with transaction.atomic():
+            momento = timezone.now()
+            reservados = Legajo.objects.filter(
+                pk__in=ids,
+                estado=Legajo.ESTADO_DISPONIBLE,
+            ).update(estado=Legajo.ESTADO_RESERVADO, actualizado_en=momento)
+            if reservados != len(ids):
+                raise _ReservaIncompleta
+
+            solicitud = Solicitud.objects.create(usuario=usuario)
+            SolicitudItem.objects.bulk_create(
+                SolicitudItem(solicitud=solicitud, legajo_id=legajo_id, disponible_al_crear=True)
+                for legajo_id in ids
+            )
+            prestamos = Prestamo.objects.bulk_create(
+                Prestamo(solicitud=solicitud, legajo_id=legajo_id, usuario=usuario)
+                for legajo_id in ids
+            )
+            Legajo.objects.filter(pk__in=ids).update(
+                prestamo_actual=models.Subquery(
+                    Prestamo.objects.filter(
+                        solicitud=solicitud,
+                        legajo=models.OuterRef('pk'),
+                    ).values('pk')[:1]
+                ),
+            )
+            prestamos_creados.send(sender=Prestamo, prestamos=prestamos)
+    except (_ReservaIncompleta, IntegrityError):
+        # Algún legajo ya no estaba disponible u otro préstamo activo ganó la
+        # carrera en la restricción única; la reserva parcial ya se deshizo.
+        raise LegajosNoDisponibles(_codigos_no_disponibles(ids)) from None
+    return solicitud
+
+
+def crear_devolucion(usuario, prestamos) -> Devolucion:
+    """Agrupa en una devolución los préstamos entregados que el usuario tiene en su poder."""
+
+    ids = sorted({getattr(prestamo, 'pk', prestamo) for prestamo in prestamos})
+    with transaction.atomic():
+        devolucion = Devolucion.objects.create(usuario=usuario)
+        asignados = Prestamo.objects.filter(
+            pk__in=ids,
+            usuario=usuario,
+            estado=Prestamo.ESTADO_ENTREGADO,
+            devolucion__isnull=True,
+        ).update(devolucion=devolucion, actualizado_en=timezone.now())
+        if asignados != len(ids):
+            codigos = (
+                Prestamo.objects.filter(pk__in=ids)
+                .exclude(devolucion=devolucion)
+                .values_list('legajo__codigo', flat=True)
+            )
+            raise PrestamosNoDevolvibles(codigos)
+        Solicitud.objects.filter(prestamos__devolucion=devolucion).update(actualizado_en=timezone.now())
+    return devolucion
+
+
+def confirmar_devolucion(devolucion, administrador) -> int:
+    """Confirma la recepción física de toda la devolución.
+
+    Marca devueltos todos sus préstamos con una sola transición masiva, que
+    también cierra de una vez las solicitudes que quedan sin préstamos en
+    poder del usuario. Devuelve la cantidad de préstamos devueltos; si la
+    devolución ya estaba confirmada no hace nada y devuelve 0.
+    """
+
+    with transaction.atomic():
+        momento = timezone.now()
+        confirmadas = Devolucion.objects.filter(
+            pk=devolucion.pk,
+            estado=Devolucion.ESTADO_PENDIENTE,
+        ).update(
+            estado=Devolucion.ESTADO_CONFIRMADA,
+            confirmado_por=administrador,
+            confirmado_en=momento,
+            actualizado_en=momento,
+        )
+        if not confirmadas:
+            return 0
+        return Prestamo.objects.filter(devolucion=devolucion).transicionar('devuelto')
@@ -0,0 +1,13 @@
+"""Señales propias del flujo de préstamos."""
+
+from django.dispatch import Signal
+
+# Se envía dentro de la transacción de cada transición aplicada con
+# ``transicionar()``. Argumentos: ``transicion`` (nombre en la tabla
+# ``TRANSICIONES`` del modelo), ``filas`` (valores previos de las filas que
+# transicionaron, según ``campos_transicion`` del QuerySet) y ``momento``.
+transicion_realizada = Signal()
+
+# Se envía al crear préstamos, tanto uno por uno como con ``bulk_create``.
+# Argumento: ``prestamos`` (instancias ya guardadas).
+prestamos_creados = Signal()
@@ -1,10 +1,67 @@
+import json
+import re
+import tempfile
+import threading
+import time
+from contextlib import aclosing
+from datetime import timedelta
+from unittest import mock, skipUnless
+from io import StringIO
+from pathlib import Path
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from django.test import TestCase
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, models
+from django.http import HttpResponse
+from django.test import LiveServerTestCase, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import Legajo, Prestamo, Solicitud
-from .permissions import USERS_GROUP_NAME
+from . import (
+	archivo,
+	bitacora,
+	carga,
+	carrito,
+	cola,
+	contadores,
+	eventos,
+	exportacion,
+	instrumentacion,
+	perfilado,
+	rendimiento,
+	resumenes,
+)
+from . import urls as expediente_urls
+from .busqueda import buscar_legajos
+from .datos_sinteticos import CONTRASENA, DatosInsuficientes, crear_usuarios, generar_archivo
+from .importacion import ErrorImportacion, importar_legajos_csv
+from .models import (
+	Devolucion,
+	EventoPrestamo,
+	Legajo,
+	Prestamo,
+	PrestamoHistorico,
+	PrestamoQuerySet,
+	ReclamoSolicitud,
+	ResumenDiario,
+	Solicitud,
+	SolicitudHistorica,
+)
+from .paginacion import codificar_cursor
+from .permissions import USERS_GROUP_NAME, es_solicitante
+from .services import (
+	LegajosNoDisponibles,
+	PrestamosNoDevolvibles,
+	confirmar_devolucion,
+	crear_devolucion,
+	crear_solicitud,
+)
+from .signals import transicion_realizada
+from .views import SolicitudAdminListView
 
 
 class WorkflowTests(TestCase):
@@ -74,11 +131,1569 @@ class WorkflowTests(TestCase):
 
 		self.client.force_login(self.user)
 		self.client.post(reverse('solicitud_confirmar_entrega', args=[solicitud.pk]))
-		response = self.client.get(reverse('prestamo_devolver', args=[prestamo.pk]))
-		self.assertEqual(response.status_code, 302)
+		url = reverse('prestamo_devolver', args=[prestamo.pk])
+		self.client.get(url)
+		self.assertFalse(Devolucion.objects.exists())
+		response = self.client.post(url)
+		devolucion = Devolucion.objects.get()
+		self.assertRedirects(response, reverse('devolucion_detail', args=[devolucion.pk]))
+		prestamo.refresh_from_db()
+		self.assertEqual((prestamo.estado, prestamo.devolucion_id), (Prestamo.ESTADO_ENTREGADO, devolucion.pk))
+		# Ya está en una devolución pendiente: no se abre otra.
+		self.client.post(url)
+		self.assertEqual(Devolucion.objects.count(), 1)
 
+		self.client.force_login(self.admin)
+		self.client.post(reverse('devolucion_confirmar', args=[devolucion.pk]))
 		prestamo.refresh_from_db()
 		solicitud.refresh_from_db()
 		self.assertEqual(prestamo.estado, Prestamo.ESTADO_DEVUELTO)
 		self.assertIsNotNone(prestamo.devuelto_en)
 		self.assertEqual(solicitud.estado, Solicitud.ESTADO_CERRADA)
+
+
+class DisponibilidadTests(TestCase):
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		self.admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+
+	def _crear_legajos(self, cantidad, desde=0):
+		return [
+			Legajo.objects.create(codigo=f"C{idx:04d}", nombre=f"Legajo {idx}")
+			for idx in range(desde, desde + cantidad)
+		]
+
+	def test_con_disponibilidad_refleja_prestamos_y_bloqueo(self):
+		libre, prestado, bloqueado = self._crear_legajos(3)
+		bloqueado.bloqueado = True
+		bloqueado.save()
+		solicitud = Solicitud.objects.create(usuario=self.user)
+		Prestamo.objects.create(solicitud=solicitud, legajo=prestado, usuario=self.user)
+
+		anotados = {l.pk: l.disponible for l in Legajo.objects.con_disponibilidad()}
+		self.assertEqual(anotados, {libre.pk: True, prestado.pk: False, bloqueado.pk: False})
+		self.assertEqual(list(Legajo.objects.disponibles()), [libre])
+		self.assertEqual([l.disponible for l in (libre, prestado, bloqueado)], [True, False, False])
+
+	def test_listado_usa_consultas_constantes(self):
+		self.client.force_login(self.admin)
+		self._crear_legajos(2)
+		with CaptureQueriesContext(connection) as pocos:
+			self.client.get(reverse('legajo_list'))
+		self._crear_legajos(20, desde=2)
+		with CaptureQueriesContext(connection) as muchos:
+			response = self.client.get(reverse('legajo_list'))
+		self.assertContains(response, 'C0021')
+		self.assertEqual(len(pocos.captured_queries), len(muchos.captured_queries))
+
+
+class EstadoLegajoTests(TestCase):
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		self.legajo = Legajo.objects.create(codigo='E1', nombre='Legajo E1')
+		self.solicitud = Solicitud.objects.create(usuario=self.user)
+
+	def _estado(self):
+		self.legajo.refresh_from_db()
+		return self.legajo.estado, self.legajo.prestamo_actual_id
+
+	def test_transiciones_mantienen_estado(self):
+		prestamo = Prestamo.objects.create(solicitud=self.solicitud, legajo=self.legajo, usuario=self.user)
+		self.assertEqual(self._estado(), (Legajo.ESTADO_RESERVADO, prestamo.pk))
+		prestamo.marcar_listo()
+		self.assertEqual(self._estado(), (Legajo.ESTADO_RESERVADO, prestamo.pk))
+		prestamo.marcar_entregado()
+		self.assertEqual(self._estado(), (Legajo.ESTADO_PRESTADO, prestamo.pk))
+		prestamo.marcar_devuelto()
+		self.assertEqual(self._estado(), (Legajo.ESTADO_DISPONIBLE, None))
+
+	def test_extravio_y_bloqueo_manual(self):
+		prestamo = Prestamo.objects.create(solicitud=self.solicitud, legajo=self.legajo, usuario=self.user)
+		prestamo.marcar_extraviado()
+		self.assertEqual(self._estado(), (Legajo.ESTADO_EXTRAVIADO, None))
+		self.legajo.bloqueado = False
+		self.legajo.save()
+		self.assertEqual(self._estado(), (Legajo.ESTADO_DISPONIBLE, None))
+
+	def test_legajo_bloqueado_a_mano_sigue_extraviado_al_entregarse(self):
+		prestamo = Prestamo.objects.create(solicitud=self.solicitud, legajo=self.legajo, usuario=self.user)
+		prestamo.marcar_listo()
+		self.legajo.refresh_from_db()
+		self.legajo.bloqueado = True
+		self.legajo.save()
+		prestamo.marcar_entregado()
+		self.assertEqual(self._estado(), (Legajo.ESTADO_EXTRAVIADO, prestamo.pk))
+		call_command('reconstruir_estado_legajos', '--verificar', stdout=StringIO())
+
+	def test_comando_reconstruye_y_verifica(self):
+		prestamo = Prestamo.objects.create(solicitud=self.solicitud, legajo=self.legajo, usuario=self.user)
+		Legajo.objects.filter(pk=self.legajo.pk).update(estado=Legajo.ESTADO_DISPONIBLE, prestamo_actual=None)
+		with self.assertRaises(CommandError):
+			call_command('reconstruir_estado_legajos', '--verificar', stdout=StringIO())
+		call_command('reconstruir_estado_legajos', stdout=StringIO())
+		self.assertEqual(self._estado(), (Legajo.ESTADO_RESERVADO, prestamo.pk))
+		call_command('reconstruir_estado_legajos', '--verificar', stdout=StringIO())
+
+
+class CrearSolicitudTests(TestCase):
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		self.otro = get_user_model().objects.create_user(username='otro', password='secret')
+		solicitantes, _ = Group.objects.get_or_create(name=USERS_GROUP_NAME)
+		self.user.groups.add(solicitantes)
+
+	def _crear_legajos(self, cantidad):
+		return Legajo.objects.bulk_create(
+			Legajo(codigo=f"S{idx:04d}", nombre=f"Legajo {idx}") for idx in range(cantidad)
+		)
+
+	def test_reserva_todos_los_legajos(self):
+		legajos = self._crear_legajos(3)
+		solicitud = crear_solicitud(self.user, legajos)
+		self.assertEqual(solicitud.items.count(), 3)
+		prestamos = {p.legajo_id: p.pk for p in solicitud.prestamos.all()}
+		for legajo in Legajo.objects.all():
+			self.assertEqual(legajo.estado, Legajo.ESTADO_RESERVADO)
+			self.assertEqual(legajo.prestamo_actual_id, prestamos[legajo.pk])
+
+	def test_conflicto_rechaza_sin_crear_nada(self):
+		legajos = self._crear_legajos(3)
+		crear_solicitud(self.otro, legajos[:1])
+		with self.assertRaises(LegajosNoDisponibles) as ctx:
+			crear_solicitud(self.user, legajos)
+		self.assertEqual(ctx.exception.codigos, ['S0000'])
+		self.assertEqual(Solicitud.objects.filter(usuario=self.user).count(), 0)
+		self.assertEqual(Legajo.objects.disponibles().count(), 2)
+
+	def test_cantidad_de_consultas_no_depende_de_los_legajos(self):
+		pocos_legajos = self._crear_legajos(2)
+		with CaptureQueriesContext(connection) as pocos:
+			crear_solicitud(self.user, pocos_legajos)
+		# Por debajo del tamaño de lote de bulk_create en SQLite (999 parámetros).
+		legajos = Legajo.objects.bulk_create(
+			Legajo(codigo=f"M{idx:04d}", nombre=f"Legajo {idx}") for idx in range(90)
+		)
+		with CaptureQueriesContext(connection) as muchos:
+			crear_solicitud(self.user, legajos)
+		self.assertEqual(len(pocos.captured_queries), len(muchos.captured_queries))
+
+	def test_confirmar_carrito_muestra_rechazo_por_legajo(self):
+		legajos = self._crear_legajos(2)
+		self.client.force_login(self.user)
+		self.client.post(reverse('carrito_agregar'), {'codigos': 'S0000 S0001'})
+		crear_solicitud(self.otro, legajos[1:])
+		response = self.client.post(reverse('carrito_confirmar'), follow=True)
+		self.assertContains(response, 'Legajos no disponibles: S0001')
+		self.assertFalse(Solicitud.objects.filter(usuario=self.user).exists())
+
+
+class TransicionesTests(TestCase):
+	def setUp(self):
+		self.admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		self.serie = 0
+
+	def _crear_solicitud(self, cantidad):
+		legajos = Legajo.objects.bulk_create(
+			Legajo(codigo=f"T{self.serie}-{idx}", nombre=f"Legajo {idx}") for idx in range(cantidad)
+		)
+		self.serie += 1
+		return crear_solicitud(self.user, legajos)
+
+	def test_transicionar_informa_filas_afectadas(self):
+		solicitud = self._crear_solicitud(3)
+		prestamos = solicitud.prestamos.all()
+		self.assertEqual(prestamos.transicionar('listo'), 3)
+		self.assertEqual(prestamos.transicionar('listo'), 0)
+		self.assertEqual(prestamos.transicionar('devuelto'), 0)
+		self.assertEqual(prestamos.transicionar('entregado'), 3)
+		solicitud.refresh_from_db()
+		self.assertEqual(solicitud.estado, Solicitud.ESTADO_ENTREGADA)
+		self.assertEqual(prestamos.filter(entregado_en__isnull=False).count(), 3)
+		self.assertEqual(Legajo.objects.filter(estado=Legajo.ESTADO_PRESTADO).count(), 3)
+
+	def test_devolucion_parcial_no_cierra_solicitud(self):
+		solicitud = self._crear_solicitud(2)
+		solicitud.prestamos.transicionar('listo')
+		solicitud.prestamos.transicionar('entregado')
+		primero = solicitud.prestamos.order_by('pk').first()
+		primero.marcar_devuelto()
+		solicitud.refresh_from_db()
+		self.assertEqual(solicitud.estado, Solicitud.ESTADO_ENTREGADA)
+		solicitud.prestamos.transicionar('devuelto')
+		solicitud.refresh_from_db()
+		self.assertEqual(solicitud.estado, Solicitud.ESTADO_CERRADA)
+
+	def test_solo_propaga_las_filas_que_cambiaron(self):
+		solicitud = self._crear_solicitud(3)
+		ajeno = solicitud.prestamos.order_by('pk').first()
+		leer = PrestamoQuerySet._leer_candidatos
+
+		def leer_y_perder_carrera(queryset, candidatos):
+			filas = leer(queryset, candidatos)
+			# Otra transacción lo marca extraviado entre la lectura y el UPDATE.
+			Prestamo.objects.filter(pk=ajeno.pk).update(estado=Prestamo.ESTADO_EXTRAVIADO)
+			return filas
+
+		recibidas = []
+		receptor = lambda sender, filas, **kwargs: recibidas.extend(fila['pk'] for fila in filas)
+		transicion_realizada.connect(receptor, sender=Prestamo)
+		self.addCleanup(transicion_realizada.disconnect, receptor, sender=Prestamo)
+		with mock.patch.object(PrestamoQuerySet, '_leer_candidatos', leer_y_perder_carrera):
+			self.assertEqual(solicitud.prestamos.transicionar('listo'), 2)
+		self.assertNotIn(ajeno.pk, recibidas)
+		self.assertEqual(len(recibidas), 2)
+		self.assertFalse(EventoPrestamo.objects.filter(prestamo_id=ajeno.pk, tipo='listo').exists())
+
+	def _consultas_preparar(self, cantidad):
+		solicitud = self._crear_solicitud(cantidad)
+		listos = list(solicitud.prestamos.values_list('pk', flat=True)[: cantidad // 2])
+		with CaptureQueriesContext(connection) as ctx:
+			self.client.post(reverse('solicitud_preparar', args=[solicitud.pk]), {'prestamos_listos': listos})
+		with CaptureQueriesContext(connection) as entrega:
+			self.client.post(reverse('solicitud_confirmar_entrega', args=[solicitud.pk]))
+		return len(ctx.captured_queries), len(entrega.captured_queries)
+
+	def test_preparar_y_entregar_en_consultas_constantes(self):
+		self.client.force_login(self.admin)
+		self.assertEqual(self._consultas_preparar(2), self._consultas_preparar(40))
+
+
+class DevolucionTests(TestCase):
+	def setUp(self):
+		self.admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		solicitantes, _ = Group.objects.get_or_create(name=USERS_GROUP_NAME)
+		self.user.groups.add(solicitantes)
+		self.serie = 0
+
+	def _solicitud_entregada(self, cantidad):
+		legajos = Legajo.objects.bulk_create(
+			Legajo(codigo=f"D{self.serie}-{idx}", nombre=f"Legajo {idx}") for idx in range(cantidad)
+		)
+		self.serie += 1
+		solicitud = crear_solicitud(self.user, legajos)
+		solicitud.prestamos.transicionar('listo')
+		solicitud.prestamos.transicionar('entregado')
+		return solicitud
+
+	def test_devolucion_de_varias_solicitudes_confirmada_por_admin(self):
+		primera = self._solicitud_entregada(2)
+		segunda = self._solicitud_entregada(1)
+		a_devolver = [*primera.prestamos.all(), *segunda.prestamos.all()]
+
+		self.client.force_login(self.user)
+		self.assertContains(self.client.get(reverse('devolucion_create')), 'D1-0')
+		response = self.client.post(reverse('devolucion_create'), {'prestamos': [p.pk for p in a_devolver]})
+		devolucion = Devolucion.objects.get(usuario=self.user)
+		self.assertRedirects(response, reverse('devolucion_detail', args=[devolucion.pk]))
+		self.assertNotContains(self.client.get(reverse('devolucion_detail', args=[devolucion.pk])), 'Confirmar recepción')
+		self.assertEqual(Prestamo.objects.filter(estado=Prestamo.ESTADO_ENTREGADO).count(), 3)
+
+		self.client.force_login(self.admin)
+		self.assertContains(self.client.get(reverse('devolucion_admin_list')), 'usuario')
+		self.assertContains(self.client.get(reverse('devolucion_detail', args=[devolucion.pk])), 'Confirmar recepción')
+		self.client.post(reverse('devolucion_confirmar', args=[devolucion.pk]))
+		devolucion.refresh_from_db()
+		self.assertEqual(devolucion.estado, Devolucion.ESTADO_CONFIRMADA)
+		self.assertEqual(devolucion.confirmado_por, self.admin)
+		self.assertEqual(Prestamo.objects.filter(estado=Prestamo.ESTADO_DEVUELTO).count(), 3)
+		self.assertEqual(
+			set(Solicitud.objects.values_list('estado', flat=True)),
+			{Solicitud.ESTADO_CERRADA},
+		)
+		self.assertEqual(Legajo.objects.disponibles().count(), 3)
+
+	def test_devolucion_parcial_deja_solicitud_entregada(self):
+		solicitud = self._solicitud_entregada(2)
+		prestamo = solicitud.prestamos.order_by('pk').first()
+		devolucion = crear_devolucion(self.user, [prestamo])
+		self.client.force_login(self.admin)
+		self.client.post(reverse('devolucion_confirmar', args=[devolucion.pk]))
+		solicitud.refresh_from_db()
+		self.assertEqual(solicitud.estado, Solicitud.ESTADO_ENTREGADA)
+
+	def test_rechaza_prestamos_ya_en_devolucion(self):
+		solicitud = self._solicitud_entregada(2)
+		prestamos = list(solicitud.prestamos.order_by('pk'))
+		crear_devolucion(self.user, prestamos[:1])
+		with self.assertRaises(PrestamosNoDevolvibles):
+			crear_devolucion(self.user, prestamos)
+		self.assertEqual(Devolucion.objects.count(), 1)
+
+	def _consultas_confirmacion(self, cantidad):
+		solicitud = self._solicitud_entregada(cantidad)
+		devolucion = crear_devolucion(self.user, solicitud.prestamos.all())
+		with CaptureQueriesContext(connection) as ctx:
+			self.client.post(reverse('devolucion_confirmar', args=[devolucion.pk]))
+		return len(ctx.captured_queries)
+
+	def test_confirmacion_en_consultas_constantes(self):
+		self.client.force_login(self.admin)
+		self.assertEqual(self._consultas_confirmacion(2), self._consultas_confirmacion(30))
+
+
+class RolesTests(TestCase):
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		self.solicitantes, _ = Group.objects.get_or_create(name=USERS_GROUP_NAME)
+		self.user.groups.add(self.solicitantes)
+		legajo = Legajo.objects.create(codigo='R1', nombre='Legajo R1')
+		self.solicitud = crear_solicitud(self.user, [legajo])
+		self.client.force_login(self.user)
+
+	def _consultas_de_roles(self, url):
+		with CaptureQueriesContext(connection) as ctx:
+			response = self.client.get(url)
+		self.assertEqual(response.status_code, 200)
+		return sum('auth_user_groups' in query['sql'] for query in ctx.captured_queries)
+
+	def test_roles_llegan_con_el_usuario_de_la_sesion(self):
+		url = reverse('solicitud_detail', args=[self.solicitud.pk])
+		# La única consulta que mira los grupos es la que carga al usuario.
+		self.assertEqual(self._consultas_de_roles(url), 1)
+		self.assertEqual(self._consultas_de_roles(url), 1)
+
+	def test_cambio_de_grupos_se_ve_en_el_siguiente_request(self):
+		url = reverse('solicitud_list')
+		self.assertEqual(self.client.get(url).status_code, 200)
+		self.user.groups.remove(self.solicitantes)
+		self.assertEqual(self.client.get(url).status_code, 403)
+		self.solicitantes.user_set.add(self.user)
+		self.assertEqual(self.client.get(url).status_code, 200)
+
+	def test_cambio_de_grupos_olvida_los_roles_memorizados(self):
+		self.assertTrue(es_solicitante(self.user))
+		self.user.groups.remove(self.solicitantes)
+		self.assertFalse(es_solicitante(self.user))
+
+	def test_is_staff_se_lee_del_usuario_del_request(self):
+		url = reverse('solicitud_admin_list')
+		self.assertEqual(self.client.get(url).status_code, 403)
+		get_user_model().objects.filter(pk=self.user.pk).update(is_staff=True)
+		self.assertEqual(self.client.get(url).status_code, 200)
+
+	def test_sesiones_previas_a_roles_backend_siguen_validas(self):
+		self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+		self.assertEqual(self.client.get(reverse('solicitud_list')).status_code, 200)
+		self.client.logout()
+		self.assertTrue(self.client.login(username='usuario', password='secret'))
+		self.assertEqual(self.client.session['_auth_user_backend'], 'expediente.permissions.RolesBackend')
+
+
+class ContadoresTests(TestCase):
+	def setUp(self):
+		self.admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		self.legajos = [Legajo.objects.create(codigo=f"K{idx}", nombre=f"Legajo {idx}") for idx in range(4)]
+
+	def test_transiciones_mantienen_contadores_sincronizados(self):
+		primera = crear_solicitud(self.user, self.legajos[:3])
+		segunda = crear_solicitud(self.user, self.legajos[3:])
+		self.assertEqual(contadores.resumen_usuario(self.user.pk), {'solicitudes_activas': 2, 'prestamos_activos': 4})
+		primera.prestamos.filter(legajo=self.legajos[0]).transicionar('extraviado')
+		primera.prestamos.transicionar('listo')
+		primera.marcar_preparada(True)
+		primera.prestamos.transicionar('entregado')
+		segunda.prestamos.transicionar('extraviado')
+		segunda.marcar_preparada(False)
+		devolucion = crear_devolucion(self.user, primera.prestamos.filter(estado=Prestamo.ESTADO_ENTREGADO))
+		from .services import confirmar_devolucion
+		confirmar_devolucion(devolucion, self.admin)
+
+		self.assertEqual(contadores.reconciliar(), {})
+		self.assertEqual(contadores.resumen_usuario(self.user.pk), {'solicitudes_activas': 1, 'prestamos_activos': 0})
+		self.assertEqual(
+			contadores.resumen_administrador(),
+			{'total_legajos': 4, 'solicitudes_pendientes': 0, 'prestamos_activos': 0},
+		)
+
+	def test_reconciliacion_corrige_desvios(self):
+		crear_solicitud(self.user, self.legajos[:2])
+		contadores.ajustar({contadores.CLAVE_LEGAJOS: 10})
+		with self.assertRaises(CommandError):
+			call_command('reconciliar_contadores', '--verificar', stdout=StringIO())
+		call_command('reconciliar_contadores', stdout=StringIO())
+		self.assertEqual(contadores.resumen_administrador()['total_legajos'], 4)
+		self.assertEqual(contadores.reconciliar(), {})
+
+	def test_dashboard_lee_contadores_en_una_consulta(self):
+		crear_solicitud(self.user, self.legajos[:2])
+		for usuario, esperado in ((self.admin, 'Total legajos: 4'), (self.user, 'Préstamos activos: 2')):
+			self.client.force_login(usuario)
+			with CaptureQueriesContext(connection) as ctx:
+				response = self.client.get(reverse('dashboard'))
+			self.assertContains(response, esperado)
+			consultas = [q['sql'] for q in ctx.captured_queries if 'expediente_' in q['sql']]
+			self.assertEqual(len(consultas), 1)
+
+
+class LegajoListPaginacionTests(TestCase):
+	def setUp(self):
+		self.admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.client.force_login(self.admin)
+		Legajo.objects.bulk_create(
+			Legajo(
+				codigo=f"P{idx:04d}",
+				nombre=f"Legajo {idx}",
+				bloqueado=idx % 10 == 0,
+				estado=Legajo.ESTADO_EXTRAVIADO if idx % 10 == 0 else Legajo.ESTADO_DISPONIBLE,
+			)
+			for idx in range(120)
+		)
+
+	def _pagina(self, **params):
+		response = self.client.get(reverse('legajo_list'), params)
+		self.assertEqual(response.status_code, 200)
+		return response.context['pagina']
+
+	def test_recorre_todas_las_paginas_hacia_adelante_y_atras(self):
+		vistos = []
+		pagina = self._pagina()
+		self.assertFalse(pagina.tiene_anterior)
+		paginas = [pagina]
+		while True:
+			vistos.extend(legajo.codigo for legajo in pagina.objetos)
+			if not pagina.tiene_siguiente:
+				break
+			pagina = self._pagina(despues=pagina.cursor_siguiente)
+			paginas.append(pagina)
+		self.assertEqual(vistos, sorted(f"P{idx:04d}" for idx in range(120)))
+		self.assertEqual(len(paginas), 3)
+
+		anterior = self._pagina(antes=paginas[-1].cursor_anterior)
+		self.assertEqual(
+			[legajo.codigo for legajo in anterior.objetos],
+			[legajo.codigo for legajo in paginas[1].objetos],
+		)
+
+	def test_filtros(self):
+		bloqueados = self._pagina(filtro='bloqueado')
+		self.assertEqual(len(bloqueados.objetos), 12)
+		self.assertTrue(all(legajo.bloqueado for legajo in bloqueados.objetos))
+		self.assertEqual(self._pagina(filtro='prestado').objetos, [])
+
+	def test_cursor_invalido(self):
+		for cursor in ['no-es-un-cursor', codificar_cursor([{'codigo': 'P0001'}]), codificar_cursor([['P0001']]), codificar_cursor([True])]:
+			with self.subTest(cursor=cursor):
+				self.assertEqual(self.client.get(reverse('legajo_list'), {'despues': cursor}).status_code, 400)
+
+	def test_pagina_intermedia_en_consultas_constantes(self):
+		primera = self._pagina()
+		with CaptureQueriesContext(connection) as ctx:
+			self._pagina(despues=primera.cursor_siguiente)
+		Legajo.objects.bulk_create(Legajo(codigo=f"Q{idx:05d}", nombre='Extra') for idx in range(500))
+		with CaptureQueriesContext(connection) as mas:
+			self._pagina(despues=primera.cursor_siguiente)
+		self.assertEqual(len(ctx.captured_queries), len(mas.captured_queries))
+
+
+class SolicitudAdminListTests(TestCase):
+	def setUp(self):
+		self.admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		self.client.force_login(self.admin)
+		legajos = [Legajo.objects.create(codigo=f"A{idx}", nombre=f"Legajo {idx}") for idx in range(3)]
+		self.pendiente = crear_solicitud(self.user, legajos[:2])
+		self.cancelada = crear_solicitud(self.user, legajos[2:])
+		self.cancelada.prestamos.transicionar('extraviado')
+		self.cancelada.marcar_preparada(False)
+
+	def _solicitudes(self, **params):
+		response = self.client.get(reverse('solicitud_admin_list'), params)
+		self.assertEqual(response.status_code, 200)
+		return response.context['solicitudes']
+
+	def test_por_defecto_muestra_trabajo_pendiente(self):
+		solicitudes = self._solicitudes()
+		self.assertEqual([s.pk for s in solicitudes], [self.pendiente.pk])
+		self.assertEqual(solicitudes[0].active_prestamos, 2)
+
+	def test_filtra_por_estado(self):
+		solicitudes = self._solicitudes(estado=[Solicitud.ESTADO_CANCELADA, Solicitud.ESTADO_PENDIENTE])
+		self.assertEqual([s.pk for s in solicitudes], [self.cancelada.pk, self.pendiente.pk])
+		self.assertEqual(solicitudes[0].active_prestamos, 0)
+
+	def test_pagina_los_estados_por_separado_y_los_mezcla(self):
+		for idx in range(5):
+			solicitud = crear_solicitud(self.user, [Legajo.objects.create(codigo=f"P{idx}", nombre=f"Legajo {idx}")])
+			if idx % 2:
+				solicitud.prestamos.transicionar('listo')
+				solicitud.marcar_preparada(True)
+		esperado = list(
+			Solicitud.objects.filter(estado__in=SolicitudAdminListView.ESTADOS_POR_DEFECTO)
+			.order_by('-creado_en', '-pk').values_list('pk', flat=True)
+		)
+		with mock.patch.object(SolicitudAdminListView, 'por_pagina', 2):
+			pagina = self.client.get(reverse('solicitud_admin_list')).context['pagina']
+			paginas = [pagina]
+			while pagina.tiene_siguiente:
+				pagina = self.client.get(reverse('solicitud_admin_list'), {'despues': pagina.cursor_siguiente}).context['pagina']
+				paginas.append(pagina)
+			anterior = self.client.get(reverse('solicitud_admin_list'), {'antes': paginas[-1].cursor_anterior}).context['pagina']
+		self.assertEqual([s.pk for pagina in paginas for s in pagina.objetos], esperado)
+		self.assertEqual([s.pk for s in anterior.objetos], [s.pk for s in paginas[-2].objetos])
+
+	def test_cursor_con_fecha_invalida(self):
+		for cursor in [codificar_cursor(['ayer', 1]), codificar_cursor([None, 1])]:
+			with self.subTest(cursor=cursor):
+				response = self.client.get(reverse('solicitud_admin_list'), {'despues': cursor})
+				self.assertEqual(response.status_code, 400)
+
+	def test_consultas_no_crecen_con_el_historial(self):
+		with CaptureQueriesContext(connection) as pocas:
+			self._solicitudes()
+		for idx in range(30):
+			legajo = Legajo.objects.create(codigo=f"H{idx}", nombre='Historial')
+			crear_solicitud(self.user, [legajo])
+		with CaptureQueriesContext(connection) as muchas:
+			self._solicitudes()
+		self.assertEqual(len(pocas.captured_queries), len(muchas.captured_queries))
+
+
+class SolicitudDetailTests(TestCase):
+	def setUp(self):
+		self.admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		self.serie = 0
+
+	def _crear_solicitud(self, cantidad):
+		legajos = Legajo.objects.bulk_create(
+			Legajo(codigo=f"V{self.serie}-{idx}", nombre=f"Legajo {idx}") for idx in range(cantidad)
+		)
+		self.serie += 1
+		return crear_solicitud(self.user, legajos)
+
+	def _consultas_detalle(self, solicitud):
+		with CaptureQueriesContext(connection) as ctx:
+			response = self.client.get(reverse('solicitud_detail', args=[solicitud.pk]))
+		self.assertEqual(response.status_code, 200)
+		return len(ctx.captured_queries)
+
+	def test_consultas_fijas_sin_importar_la_cantidad_de_legajos(self):
+		self.client.force_login(self.admin)
+		self.assertEqual(
+			self._consultas_detalle(self._crear_solicitud(2)),
+			self._consultas_detalle(self._crear_solicitud(60)),
+		)
+
+	def test_fragmento_cacheado_se_invalida_con_las_transiciones(self):
+		solicitud = self._crear_solicitud(1)
+		self.client.force_login(self.admin)
+		url = reverse('solicitud_detail', args=[solicitud.pk])
+		self.assertContains(self.client.get(url), '<td>Pendiente</td>', html=True)
+		solicitud.prestamos.transicionar('listo')
+		response = self.client.get(url)
+		self.assertContains(response, '<td>Listo para entrega</td>', html=True)
+		self.assertNotContains(response, '<td>Pendiente</td>', html=True)
+
+
+class BusquedaTests(TestCase):
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		solicitantes, _ = Group.objects.get_or_create(name=USERS_GROUP_NAME)
+		self.user.groups.add(solicitantes)
+		self.legajo = Legajo.objects.create(codigo='EXP-2024-001', nombre='Pérez, Juan', descripcion='Sucesión')
+		Legajo.objects.bulk_create([
+			Legajo(codigo='EXP-2024-002', nombre='Gómez, Ana', descripcion='Divorcio Pérez'),
+			Legajo(codigo='EXP-2023-100', nombre='Rodríguez, Luis'),
+		])
+
+	def _codigos(self, texto):
+		return [legajo.codigo for legajo in buscar_legajos(texto)]
+
+	def test_prefijos_sin_acentos_y_ranking(self):
+		self.assertEqual(self._codigos('perez'), ['EXP-2024-001', 'EXP-2024-002'])
+		self.assertEqual(self._codigos('rodri'), ['EXP-2023-100'])
+		self.assertEqual(self._codigos('exp 2023'), ['EXP-2023-100'])
+		self.assertEqual(self._codigos('""'), [])
+
+	def test_indice_sigue_los_cambios(self):
+		self.legajo.nombre = 'Fernández, Juan'
+		self.legajo.save()
+		self.assertEqual(self._codigos('fernan'), ['EXP-2024-001'])
+		self.assertEqual(self._codigos('perez'), ['EXP-2024-002'])
+		self.legajo.delete()
+		self.assertEqual(self._codigos('fernan'), [])
+
+	def test_comando_reconstruye(self):
+		call_command('reconstruir_indice_busqueda', stdout=StringIO())
+		self.assertEqual(self._codigos('gomez'), ['EXP-2024-002'])
+
+	def test_endpoint_autocompletado(self):
+		self.client.force_login(self.user)
+		response = self.client.get(reverse('legajo_buscar'), {'q': 'suce'})
+		self.assertEqual(
+			response.json(),
+			{'resultados': [{
+				'id': self.legajo.pk,
+				'codigo': 'EXP-2024-001',
+				'nombre': 'Pérez, Juan',
+				'estado': Legajo.ESTADO_DISPONIBLE,
+				'disponible': True,
+			}]},
+		)
+
+
+class CarritoTests(TestCase):
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		solicitantes, _ = Group.objects.get_or_create(name=USERS_GROUP_NAME)
+		self.user.groups.add(solicitantes)
+		self.client.force_login(self.user)
+		Legajo.objects.bulk_create(Legajo(codigo=f"W{idx:03d}", nombre=f"Legajo {idx}") for idx in range(50))
+		Legajo.objects.filter(codigo='W003').update(bloqueado=True, estado=Legajo.ESTADO_EXTRAVIADO)
+
+	def _agregar(self, **datos):
+		return self.client.post(reverse('carrito_agregar'), datos, follow=True)
+
+	def test_agregar_por_lista_y_por_id_y_confirmar(self):
+		response = self._agregar(codigos='W001, W002\nW003 NOEXISTE W001')
+		self.assertContains(response, 'Agregados: W001, W002')
+		self.assertContains(response, 'NOEXISTE (no existe), W003 (extraviado)')
+		self._agregar(legajo=[Legajo.objects.get(codigo='W010').pk])
+		response = self.client.get(reverse('solicitud_create'))
+		self.assertEqual([l.codigo for l in response.context['legajos']], ['W001', 'W002', 'W010'])
+		self.assertNotContains(response, 'W020')
+
+		self.client.post(reverse('carrito_quitar', args=[Legajo.objects.get(codigo='W002').pk]))
+		response = self.client.post(reverse('carrito_confirmar'))
+		solicitud = Solicitud.objects.get(usuario=self.user)
+		self.assertRedirects(response, reverse('solicitud_detail', args=[solicitud.pk]))
+		self.assertEqual(
+			sorted(solicitud.items.values_list('legajo__codigo', flat=True)),
+			['W001', 'W010'],
+		)
+		self.assertEqual(self.client.get(reverse('solicitud_create')).context['legajos'], [])
+
+	def test_legajo_borrado_sale_del_carrito(self):
+		self._agregar(codigos='W001 W002')
+		borrado = Legajo.objects.get(codigo='W002').pk
+		Legajo.objects.filter(pk=borrado).delete()
+		response = self.client.post(reverse('carrito_confirmar'), follow=True)
+		self.assertContains(response, f'Legajos no disponibles: #{borrado} (no existe)')
+		self.assertFalse(Solicitud.objects.exists())
+		self.assertEqual([l.codigo for l in response.context['legajos']], ['W001'])
+
+		response = self.client.post(reverse('carrito_confirmar'))
+		solicitud = Solicitud.objects.get(usuario=self.user)
+		self.assertEqual(list(solicitud.items.values_list('legajo__codigo', flat=True)), ['W001'])
+
+	def test_al_mostrarlo_descarta_los_borrados(self):
+		self._agregar(codigos='W001 W002')
+		Legajo.objects.filter(codigo='W001').delete()
+		self.assertEqual([l.codigo for l in self.client.get(reverse('solicitud_create')).context['legajos']], ['W002'])
+		self.assertEqual(self.client.session[carrito.SESSION_KEY], [Legajo.objects.get(codigo='W002').pk])
+
+	def test_agregar_consulta_solo_la_seleccion(self):
+		self._agregar(codigos='W000')
+		with CaptureQueriesContext(connection) as pocos:
+			self._agregar(codigos='W001 W002')
+		with CaptureQueriesContext(connection) as muchos:
+			self._agregar(codigos=' '.join(f"W{idx:03d}" for idx in range(10, 40)))
+		self.assertEqual(len(pocos.captured_queries), len(muchos.captured_queries))
+
+
+class ImportacionTests(TestCase):
+	def _csv(self, filas, encabezado='codigo,nombre,descripcion'):
+		return StringIO('\n'.join([encabezado, *filas]) + '\n')
+
+	def test_importa_por_lotes_e_informa_errores(self):
+		Legajo.objects.create(codigo='I000', nombre='Existente')
+		filas = [f'I{idx:03d},Importado {idx},Caja {idx}' for idx in range(1, 8)]
+		filas += ['I000,Duplicado,', 'I001,Repetido,', ',Sin codigo,', 'I099,,']
+		lotes = []
+		resultado = importar_legajos_csv(
+			self._csv(filas), lote=3, al_confirmar_lote=lambda r: lotes.append(r.ultima_fila_confirmada)
+		)
+		self.assertEqual((resultado.filas_leidas, resultado.creados, resultado.actualizados), (11, 7, 0))
+		self.assertEqual(
+			[(fila, mensaje) for fila, _, mensaje in resultado.errores],
+			[(8, 'el código ya existe'), (9, 'código repetido en el archivo'), (10, 'falta el código'), (11, 'falta el nombre')],
+		)
+		self.assertEqual(lotes, [3, 6, 11])
+		self.assertEqual(Legajo.objects.count(), 8)
+		self.assertEqual(Legajo.objects.get(codigo='I005').estado, Legajo.ESTADO_DISPONIBLE)
+		self.assertEqual(contadores.resumen_administrador()['total_legajos'], 8)
+		self.assertEqual([l.codigo for l in buscar_legajos('Importado 4')], ['I004'])
+
+	def test_actualizar_y_retomar(self):
+		Legajo.objects.create(codigo='I001', nombre='Viejo')
+		filas = ['I001,Nuevo,', 'I002,Otro,', 'I003,Tercero,']
+		resultado = importar_legajos_csv(self._csv(filas), actualizar=True, desde_fila=1)
+		self.assertEqual((resultado.filas_leidas, resultado.creados), (2, 2))
+		self.assertEqual(Legajo.objects.get(codigo='I001').nombre, 'Viejo')
+		resultado = importar_legajos_csv(self._csv(filas), actualizar=True)
+		self.assertEqual((resultado.creados, resultado.actualizados), (0, 3))
+		self.assertEqual(Legajo.objects.get(codigo='I001').nombre, 'Nuevo')
+		self.assertEqual(contadores.resumen_administrador()['total_legajos'], 3)
+
+	def test_codigo_creado_por_otro_proceso_se_informa(self):
+		filas = [f'I{idx:03d},Importado {idx},' for idx in range(1, 6)]
+
+		def crear_concurrente(resultado):
+			if resultado.ultima_fila_confirmada == 2:
+				Legajo.objects.create(codigo='I004', nombre='Ajeno')
+
+		resultado = importar_legajos_csv(self._csv(filas), lote=2, al_confirmar_lote=crear_concurrente)
+		self.assertEqual(resultado.errores, [(4, 'I004', 'el código ya existe')])
+		self.assertEqual((resultado.creados, resultado.ultima_fila_confirmada), (4, 5))
+		self.assertEqual(Legajo.objects.get(codigo='I004').nombre, 'Ajeno')
+		self.assertEqual(contadores.resumen_administrador()['total_legajos'], 5)
+
+	def test_subida_con_conflicto_muestra_error_de_formulario(self):
+		admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.client.force_login(admin)
+		archivo = SimpleUploadedFile('legajos.csv', 'codigo,nombre\nI001,Uno\n'.encode())
+		with mock.patch('expediente.views.importar_legajos_csv', side_effect=IntegrityError):
+			response = self.client.post(reverse('legajo_importar'), {'archivo': archivo})
+		self.assertEqual(response.status_code, 200)
+		self.assertIn('Otro proceso modificó los legajos', response.context['form'].errors['archivo'][0])
+
+	def test_faltan_columnas(self):
+		with self.assertRaises(ErrorImportacion):
+			importar_legajos_csv(self._csv(['I001'], encabezado='codigo'))
+
+	def test_comando_con_checkpoint(self):
+		with tempfile.TemporaryDirectory() as directorio:
+			archivo = Path(directorio) / 'legajos.csv'
+			archivo.write_text('\ufeffcodigo,nombre\nI001,Uno\nI002,Dos\nI003,Tres\n', encoding='utf-8')
+			checkpoint = Path(directorio) / 'checkpoint'
+			checkpoint.write_text('2')
+			salida = StringIO()
+			call_command('importar_legajos', str(archivo), checkpoint=str(checkpoint), stdout=salida)
+			self.assertIn('Retomando después de la fila 2', salida.getvalue())
+			self.assertEqual(list(Legajo.objects.values_list('codigo', flat=True)), ['I003'])
+			self.assertFalse(checkpoint.exists())
+
+	def test_subida_de_administrador(self):
+		admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.client.force_login(admin)
+		archivo = SimpleUploadedFile('legajos.csv', 'codigo,nombre\nI001,Uno\nI001,Otra vez\n'.encode())
+		response = self.client.post(reverse('legajo_importar'), {'archivo': archivo})
+		self.assertContains(response, '1 legajos creados')
+		self.assertContains(response, 'código repetido en el archivo')
+		self.assertTrue(Legajo.objects.filter(codigo='I001').exists())
+
+
+class ExportacionTests(TestCase):
+	def setUp(self):
+		self.admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		otro = get_user_model().objects.create_user(username='otro', password='secret')
+		Legajo.objects.bulk_create(Legajo(codigo=f"E{idx:03d}", nombre=f"Legajo {idx}") for idx in range(6))
+		legajos = list(Legajo.objects.order_by('codigo'))
+		self.solicitud = crear_solicitud(self.user, legajos[:4])
+		crear_solicitud(otro, legajos[4:])
+		self.solicitud.prestamos.filter(legajo__codigo='E000').transicionar('listo')
+
+	def test_streaming_csv_filtrado(self):
+		self.client.force_login(self.admin)
+		response = self.client.get(reverse('prestamo_exportar'), {'formato': 'csv', 'usuario': 'usuario'})
+		self.assertTrue(response.streaming)
+		self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+		lineas = b''.join(response.streaming_content).decode().splitlines()
+		self.assertEqual(lineas[0], ','.join(exportacion.COLUMNAS))
+		self.assertEqual([linea.split(',')[2] for linea in lineas[1:]], ['E000', 'E001', 'E002', 'E003'])
+
+	def test_jsonl_por_estado_y_fecha(self):
+		hoy = timezone.localdate()
+		prestamos = exportacion.prestamos_para_exportar(desde=hoy, hasta=hoy, estado=Prestamo.ESTADO_LISTO)
+		filas = [json.loads(linea) for linea in exportacion.generar_jsonl(prestamos, chunk_size=2)]
+		self.assertEqual([(fila['legajo'], fila['usuario']) for fila in filas], [('E000', 'usuario')])
+		ayer = hoy - timedelta(days=1)
+		self.assertFalse(exportacion.prestamos_para_exportar(hasta=ayer).exists())
+
+	def test_consultas_por_lote(self):
+		with CaptureQueriesContext(connection) as consultas:
+			filas = list(exportacion.filas(exportacion.prestamos_para_exportar(), chunk_size=2))
+		self.assertEqual(len(filas), 6)
+		self.assertLessEqual(len(consultas.captured_queries), 3)
+
+	def test_comando(self):
+		salida = StringIO()
+		call_command('exportar_prestamos', formato='jsonl', usuario='otro', stdout=salida)
+		self.assertEqual([json.loads(linea)['legajo'] for linea in salida.getvalue().splitlines()], ['E004', 'E005'])
+
+	def test_solo_administradores(self):
+		self.client.force_login(self.user)
+		self.assertEqual(self.client.get(reverse('prestamo_exportar'), {'formato': 'csv'}).status_code, 403)
+
+
+class ApiTests(TestCase):
+	def setUp(self):
+		self.admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		solicitantes, _ = Group.objects.get_or_create(name=USERS_GROUP_NAME)
+		self.user.groups.add(solicitantes)
+		otro = get_user_model().objects.create_user(username='otro', password='secret')
+		otro.groups.add(solicitantes)
+		Legajo.objects.bulk_create(Legajo(codigo=f"A{idx:03d}", nombre=f"Legajo {idx}") for idx in range(30))
+		legajos = list(Legajo.objects.order_by('codigo'))
+		self.solicitud = crear_solicitud(self.user, legajos[:3])
+		crear_solicitud(otro, legajos[3:5])
+		self.client.force_login(self.user)
+
+	def test_legajos_paginados_por_cursor(self):
+		response = self.client.get('/api/v1/legajos/', {'page_size': 20})
+		self.assertEqual(response.status_code, 200)
+		datos = response.json()
+		self.assertEqual(len(datos['results']), 20)
+		siguiente = self.client.get(datos['next']).json()
+		self.assertEqual([l['codigo'] for l in siguiente['results']], [f"A{idx:03d}" for idx in range(20, 30)])
+		detalle = self.client.get('/api/v1/legajos/A000/').json()
+		self.assertEqual((detalle['estado'], detalle['disponible']), (Legajo.ESTADO_RESERVADO, False))
+
+	def test_campos_dinamicos(self):
+		datos = self.client.get('/api/v1/legajos/', {'fields': 'codigo,estado'}).json()
+		self.assertEqual(set(datos['results'][0]), {'codigo', 'estado'})
+
+	def test_solicitudes_propias_sin_n_mas_1(self):
+		self.client.get('/api/v1/solicitudes/')
+		with CaptureQueriesContext(connection) as consultas:
+			datos = self.client.get('/api/v1/solicitudes/').json()
+		self.assertEqual([s['id'] for s in datos['results']], [self.solicitud.pk])
+		self.assertEqual([p['legajo'] for p in datos['results'][0]['prestamos']], ['A000', 'A001', 'A002'])
+		antes = len(consultas.captured_queries)
+		crear_solicitud(self.user, Legajo.objects.filter(codigo__in=['A010', 'A011']))
+		with CaptureQueriesContext(connection) as consultas:
+			self.client.get('/api/v1/solicitudes/')
+		self.assertEqual(len(consultas.captured_queries), antes)
+		self.client.force_login(self.admin)
+		self.assertEqual(len(self.client.get('/api/v1/prestamos/').json()['results']), 7)
+
+	def test_get_condicional(self):
+		response = self.client.get('/api/v1/prestamos/')
+		etag = response['ETag']
+		self.assertTrue(response.has_header('Last-Modified'))
+		self.assertEqual(self.client.get('/api/v1/prestamos/', headers={'if-none-match': etag}).status_code, 304)
+		self.solicitud.prestamos.filter(legajo__codigo='A000').transicionar('listo')
+		response = self.client.get('/api/v1/prestamos/', headers={'if-none-match': etag})
+		self.assertEqual(response.status_code, 200)
+		self.assertNotEqual(response['ETag'], etag)
+
+	def test_get_condicional_lee_solo_la_pagina(self):
+		url = '/api/v1/legajos/'
+		etag = self.client.get(url, {'page_size': 10})['ETag']
+		with CaptureQueriesContext(connection) as consultas:
+			response = self.client.get(url, {'page_size': 10}, headers={'if-none-match': etag})
+		self.assertEqual(response.status_code, 304)
+		validador, = [q['sql'] for q in consultas.captured_queries if 'expediente_legajo' in q['sql']]
+		self.assertIn('LIMIT 11', validador)
+		self.assertNotRegex(validador, r'COUNT\(|MAX\(')
+		# Un cambio fuera de la página no la invalida; uno dentro, sí.
+		Legajo.objects.filter(codigo='A025').update(actualizado_en=timezone.now())
+		self.assertEqual(self.client.get(url, {'page_size': 10}, headers={'if-none-match': etag}).status_code, 304)
+		Legajo.objects.filter(codigo='A005').update(actualizado_en=timezone.now())
+		self.assertEqual(self.client.get(url, {'page_size': 10}, headers={'if-none-match': etag}).status_code, 200)
+
+	def test_disponibilidad_en_una_consulta(self):
+		Legajo.objects.filter(codigo='A020').update(bloqueado=True, estado=Legajo.ESTADO_EXTRAVIADO)
+		codigos = ['A000', 'A020', 'A021', 'NOEXISTE', 'A021']
+		with CaptureQueriesContext(connection) as consultas:
+			response = self.client.post('/api/v1/legajos/disponibilidad/', {'codigos': codigos}, content_type='application/json')
+		self.assertEqual(response.json(), {
+			'disponibles': ['A021'],
+			'no_disponibles': {'A000': Legajo.ESTADO_RESERVADO, 'A020': Legajo.ESTADO_EXTRAVIADO},
+			'inexistentes': ['NOEXISTE'],
+		})
+		self.assertEqual(sum('expediente_legajo' in q['sql'] for q in consultas.captured_queries), 1)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Los planes se verifican con EXPLAIN QUERY PLAN de SQLite.')
+class PlanesDeConsultaTests(TestCase):
+	"""Cada consulta frecuente debe resolverse con índices, sin recorrer tablas completas."""
+
+	# Recorrer la tabla virtual FTS5 o un índice parcial (que sólo contiene
+	# las filas de su condición) no es un recorrido completo.
+	INDICES_PARCIALES = {
+		indice.name
+		for modelo in (Legajo, Solicitud, Prestamo, Devolucion)
+		for indice in modelo._meta.indexes
+		if indice.condition is not None
+	}
+
+	# Ordenamientos en memoria aceptados, porque el conjunto que se ordena
+	# está acotado: los préstamos de una solicitud o de una devolución, los
+	# entregados a un usuario, el préstamo vigente de un legajo y la búsqueda,
+	# cuyo orden por relevancia (bm25) sólo se conoce al leer las coincidencias.
+	ORDENES_ACOTADOS = re.compile(
+		r'WHERE "expediente_prestamo"\."(?:solicitud|devolucion)_id" = \d+ ORDER BY'
+		r'|"expediente_prestamo"\."usuario_id" = \d+\) ORDER BY "expediente_legajo"\."codigo"'
+		r'|U0\."legajo_id" = \("expediente_legajo"\."id"\)\) ORDER BY U0\."creado_en" DESC LIMIT 1\)'
+		r'|ORDER BY bm25\('
+	)
+
+	@classmethod
+	def setUpTestData(cls):
+		usuarios = get_user_model().objects
+		cls.admin = usuarios.create_user(username='admin', password='secret', is_staff=True)
+		cls.user = usuarios.create_user(username='usuario', password='secret')
+		cls.user.groups.add(Group.objects.get_or_create(name=USERS_GROUP_NAME)[0])
+		Legajo.objects.bulk_create(Legajo(codigo=f"Q{idx:04d}", nombre=f"Legajo {idx}") for idx in range(300))
+		legajos = list(Legajo.objects.order_by('codigo'))
+		Legajo.objects.filter(pk__in=[legajo.pk for legajo in legajos[-10:]]).update(
+			bloqueado=True, estado=Legajo.ESTADO_EXTRAVIADO,
+		)
+		for inicio in range(0, 60, 6):
+			crear_solicitud(cls.user, legajos[inicio:inicio + 6])
+		cls.solicitud = crear_solicitud(cls.user, legajos[100:104])
+
+	def _planes(self, consultas):
+		planes = []
+		with connection.cursor() as cursor:
+			for consulta in consultas:
+				sql = consulta['sql']
+				if not sql.startswith(('SELECT', 'UPDATE', 'DELETE')):
+					continue
+				cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+				planes.append((sql, [fila[3] for fila in cursor.fetchall()]))
+		return planes
+
+	def assertSinRecorridos(self, consultas, permitido=None):
+		for sql, plan in self._planes(consultas):
+			for paso in plan:
+				if paso.startswith('USE TEMP B-TREE'):
+					if not self.ORDENES_ACOTADOS.search(sql):
+						self.fail(f'{paso}\n{sql}')
+					continue
+				if not paso.startswith('SCAN ') or 'VIRTUAL TABLE' in paso:
+					continue
+				indice = re.search(r'USING (?:COVERING )?INDEX (\w+)', paso)
+				if indice and indice.group(1) in self.INDICES_PARCIALES:
+					continue
+				if permitido is not None and permitido.search(paso):
+					continue
+				self.fail(f'{paso}\n{sql}')
+
+	def _get(self, usuario, url, **params):
+		self.client.force_login(usuario)
+		self.client.get(url, params)
+		with CaptureQueriesContext(connection) as consultas:
+			self.assertEqual(self.client.get(url, params).status_code, 200)
+		return consultas.captured_queries
+
+	def test_listado_de_legajos(self):
+		# Sin filtro se lee el índice único de ``codigo`` en orden hasta el LIMIT.
+		self.assertSinRecorridos(
+			self._get(self.admin, reverse('legajo_list')),
+			permitido=re.compile(r'^SCAN expediente_legajo USING INDEX sqlite_autoindex_expediente_legajo_\d+$'),
+		)
+		for filtro in ['bloqueado', 'disponible', 'reservado', 'prestado']:
+			with self.subTest(filtro=filtro):
+				self.assertSinRecorridos(self._get(self.admin, reverse('legajo_list'), filtro=filtro))
+
+	def test_vistas_de_solicitudes_y_devoluciones(self):
+		devolucion = Devolucion.objects.create(usuario=self.user)
+		for usuario, url in [
+			(self.admin, reverse('dashboard')),
+			(self.user, reverse('dashboard')),
+			(self.admin, reverse('solicitud_admin_list')),
+			(self.user, reverse('solicitud_list')),
+			(self.user, reverse('solicitud_detail', args=[self.solicitud.pk])),
+			(self.user, reverse('devolucion_list')),
+			(self.user, reverse('devolucion_create')),
+			(self.user, reverse('devolucion_detail', args=[devolucion.pk])),
+			(self.admin, reverse('devolucion_admin_list')),
+			(self.user, reverse('solicitud_create')),
+		]:
+			with self.subTest(url=url, usuario=usuario.username):
+				self.assertSinRecorridos(self._get(usuario, url))
+		self.assertSinRecorridos(self._get(self.user, reverse('legajo_buscar'), q='Legajo 12'))
+
+	def test_listado_de_solicitudes_sin_ordenar_en_memoria(self):
+		cursor = codificar_cursor([timezone.now(), 0])
+		for params in [{}, {'despues': cursor}, {'estado': [Solicitud.ESTADO_CERRADA, Solicitud.ESTADO_PENDIENTE]}]:
+			with self.subTest(params=params):
+				self.assertSinRecorridos(self._get(self.admin, reverse('solicitud_admin_list'), **params))
+
+	def test_transiciones_del_circuito(self):
+		self.client.force_login(self.admin)
+		prestamos = list(self.solicitud.prestamos.order_by('pk'))
+		with CaptureQueriesContext(connection) as consultas:
+			self.client.post(
+				reverse('solicitud_preparar', args=[self.solicitud.pk]),
+				{'prestamos_listos': [prestamo.pk for prestamo in prestamos[:3]]},
+			)
+		self.assertSinRecorridos(consultas.captured_queries)
+		self.client.force_login(self.user)
+		with CaptureQueriesContext(connection) as consultas:
+			self.client.post(reverse('solicitud_confirmar_entrega', args=[self.solicitud.pk]))
+			devolucion = crear_devolucion(self.user, prestamos[:3])
+		self.assertSinRecorridos(consultas.captured_queries)
+		self.client.force_login(self.admin)
+		with CaptureQueriesContext(connection) as consultas:
+			self.client.post(reverse('devolucion_confirmar', args=[devolucion.pk]))
+		self.assertSinRecorridos(consultas.captured_queries)
+		self.assertEqual(Solicitud.objects.get(pk=self.solicitud.pk).estado, Solicitud.ESTADO_CERRADA)
+
+	def test_estado_esperado_del_legajo(self):
+		consulta = Legajo.objects.con_estado_esperado().filter(codigo__in=['Q0001', 'Q0101'])
+		with CaptureQueriesContext(connection) as consultas:
+			list(consulta)
+		self.assertSinRecorridos(consultas.captured_queries)
+
+	def test_historial_del_legajo(self):
+		legajo = self.solicitud.items.first().legajo
+		momento = timezone.localtime().strftime('%Y-%m-%dT%H:%M')
+		self.assertSinRecorridos(self._get(self.admin, reverse('legajo_historial', args=[legajo.pk]), momento=momento))
+		consulta = bitacora.estado_en(timezone.now(), Legajo.objects.filter(codigo__in=['Q0001', 'Q0101']))
+		with CaptureQueriesContext(connection) as consultas:
+			list(consulta)
+		self.assertSinRecorridos(consultas.captured_queries)
+
+
+class RendimientoTests(TestCase):
+	@classmethod
+	def setUpTestData(cls):
+		cls.resumen = generar_archivo(legajos=600, solicitudes=100, prestamos=400, usuarios=8, lote=120, semilla=3)
+
+	def test_generador_respeta_las_invariantes(self):
+		self.assertEqual(Legajo.objects.count(), 600)
+		self.assertEqual(Prestamo.objects.count(), 400)
+		self.assertEqual(sum(self.resumen.por_estado.values()), 100)
+		self.assertEqual(
+			Solicitud.objects.filter(estado=Solicitud.ESTADO_CERRADA).count(),
+			self.resumen.por_estado[Solicitud.ESTADO_CERRADA],
+		)
+		call_command('reconstruir_estado_legajos', verificar=True, stdout=StringIO())
+		call_command('reconciliar_contadores', verificar=True, stdout=StringIO())
+		self.assertTrue(buscar_legajos('sintético 42'))
+		with self.assertRaises(DatosInsuficientes):
+			generar_archivo(legajos=10, solicitudes=100, prestamos=400, prefijo='OTRO')
+
+	def test_cada_url_tiene_escenario(self):
+		nombres = {patron.name for patron in expediente_urls.urlpatterns} | {'dashboard'}
+		escenarios = {escenario.nombre for escenario in rendimiento.ESCENARIOS} - {'dashboard_solicitante'}
+		self.assertEqual(nombres, escenarios)
+
+	def test_presupuestos_y_linea_de_base(self):
+		mediciones = rendimiento.medir(repeticiones=1)
+		self.assertEqual(rendimiento.comparar(mediciones, rendimiento.cargar_base(), umbral=None), [])
+		# Los escenarios que modifican datos se revierten.
+		self.assertEqual(Solicitud.objects.filter(estado=Solicitud.ESTADO_CERRADA).count(), self.resumen.por_estado['cerrada'])
+
+	def test_comparar_detecta_regresiones(self):
+		medicion = rendimiento.Medicion('legajo_list', consultas=4, ms=30.0, ms_max=31.0, status=200)
+		problemas = rendimiento.comparar([medicion], {'legajo_list': {'consultas': 3, 'ms': 10.0}})
+		self.assertEqual(len(problemas), 3)
+		self.assertEqual(rendimiento.comparar([medicion], {'legajo_list': {'consultas': 4, 'ms': 25.0}}), [
+			'legajo_list: 4 consultas, presupuesto 3',
+		])
+
+
+class CargaTests(LiveServerTestCase):
+	def test_resumen_por_url(self):
+		registros = [('dashboard', float(ms), carga.OK, 200) for ms in range(1, 101)]
+		registros += [('carrito_confirmar', 50.0, carga.CONFLICTO, 302), ('carrito_confirmar', 70.0, carga.ERROR, 500)]
+		registros += [(carga.INICIO_SESION, 900.0, carga.OK, 302)]
+		resumen = carga.resumir(registros, duracion=10)
+		self.assertEqual(resumen['dashboard']['pedidos'], 100)
+		self.assertEqual(resumen['dashboard']['por_segundo'], 10.0)
+		self.assertEqual((resumen['dashboard']['p50'], resumen['dashboard']['p95'], resumen['dashboard']['p99']), (50.0, 95.0, 99.0))
+		self.assertEqual((resumen['carrito_confirmar']['conflictos'], resumen['carrito_confirmar']['errores']), (0.5, 0.5))
+		# El inicio de sesión queda fuera del total.
+		self.assertEqual(resumen['total']['pedidos'], 102)
+
+	def test_url_sin_la_misma_base_se_rechaza(self):
+		opciones = {'solicitantes': 1, 'administradores': 1, 'duracion': 0, 'rampa': 0, 'procesos': 1}
+		with mock.patch.object(carga.Sesion, 'iniciar_sesion', return_value=False), mock.patch.object(carga, 'ejecutar') as ejecutar:
+			with self.assertRaisesMessage(CommandError, 'que use la misma base'):
+				call_command('generar_carga', url=self.live_server_url, stdout=StringIO(), stderr=StringIO(), **opciones)
+		ejecutar.assert_not_called()
+		# Contra un servidor que comparte la base, el usuario de prueba entra.
+		with mock.patch.object(carga, 'ejecutar', return_value=[]) as ejecutar:
+			call_command('generar_carga', url=self.live_server_url, json=True, stdout=StringIO(), stderr=StringIO(), **opciones)
+		ejecutar.assert_called_once()
+
+	def test_recorre_el_circuito_con_solicitantes_y_administradores(self):
+		generar_archivo(legajos=200, solicitudes=30, prestamos=90, usuarios=3, semilla=5)
+		admins, nombres = crear_usuarios(2, 'carga')
+		plan = carga.PlanDeCarga(
+			url=self.live_server_url,
+			usuarios=carga.asignar_perfiles(carga.PERFILES, nombres, admins),
+			contrasena=CONTRASENA,
+			duracion=2,
+			rampa=0,
+			procesos=1,
+		)
+		resumen = carga.resumir(carga.ejecutar(plan), plan.duracion)
+		self.assertEqual(resumen[carga.INICIO_SESION]['pedidos'], 6)
+		self.assertIn('legajo_buscar', resumen)
+		self.assertIn('solicitud_cola', resumen)
+		self.assertGreater(resumen['total']['pedidos'], 6)
+
+
+class InstrumentacionSQLTests(TestCase):
+	def test_detecta_consultas_repetidas(self):
+		legajos = [Legajo.objects.create(codigo=f'L-{numero}', nombre=f'Legajo {numero}') for numero in range(6)]
+
+		def vista(request):
+			for legajo in legajos:
+				legajo.prestamos.filter(activo=True).exists()
+			Legajo.objects.filter(pk__in=[legajo.pk for legajo in legajos[:2]]).count()
+			Legajo.objects.filter(pk__in=[legajo.pk for legajo in legajos]).count()
+			return HttpResponse('ok')
+
+		with override_settings(INSTRUMENTACION_SQL={'MUESTREO': 1.0, 'UMBRAL_REPETICIONES': 2}):
+			middleware = instrumentacion.InstrumentacionSQLMiddleware(vista)
+		with self.assertLogs('expediente.sql', 'WARNING') as logs:
+			response = middleware(RequestFactory().get('/legajos/'))
+		resumen = logs.records[0].sql
+		self.assertEqual(resumen['consultas'], 8)
+		self.assertEqual([repetida['veces'] for repetida in resumen['repetidas']], [6, 2])
+		self.assertEqual(len(resumen['lentas']), 3)
+		self.assertIn('sql;dur=', response['Server-Timing'])
+		self.assertIn('sql-repetidas;desc="2 formas, la peor 6 veces"', response['Server-Timing'])
+
+	def test_desactivado_sin_muestreo(self):
+		with override_settings(INSTRUMENTACION_SQL={'MUESTREO': 0}), self.assertRaises(MiddlewareNotUsed):
+			instrumentacion.InstrumentacionSQLMiddleware(lambda request: HttpResponse())
+		response = self.client.get(reverse('login'))
+		self.assertFalse(response.has_header('Server-Timing'))
+
+	@override_settings(INSTRUMENTACION_SQL={'MUESTREO': 1.0})
+	def test_cabecera_en_las_vistas(self):
+		usuario = get_user_model().objects.create_user(username='medido', password='x', is_staff=True)
+		self.client.force_login(usuario)
+		with self.assertLogs('expediente.sql', 'INFO'):
+			response = self.client.get(reverse('legajo_list'))
+		self.assertRegex(response['Server-Timing'], r'sql;dur=[\d.]+;desc="\d+ consultas"')
+
+
+class PerfiladoTests(TestCase):
+	def setUp(self):
+		directorio = tempfile.TemporaryDirectory()
+		self.addCleanup(directorio.cleanup)
+		self.directorio = Path(directorio.name)
+		configuracion = override_settings(PERFILADO={'DIRECTORIO': self.directorio, 'MAXIMO': 2, 'INTERVALO_MS': 0.1})
+		configuracion.enable()
+		self.addCleanup(configuracion.disable)
+		self.admin = get_user_model().objects.create_user(username='perfilador', password='x', is_staff=True)
+		self.solicitante = get_user_model().objects.create_user(username='perfilado', password='x')
+		self.solicitante.groups.add(Group.objects.get_or_create(name=USERS_GROUP_NAME)[0])
+
+	def test_muestreador_colapsa_pilas(self):
+		def ocupado():
+			fin = time.perf_counter() + 0.05
+			while time.perf_counter() < fin:
+				pass
+
+		with perfilado.MuestreadorPila(threading.get_ident(), 0.5) as muestreador:
+			ocupado()
+		lineas = muestreador.colapsado().splitlines()
+		self.assertTrue(lineas)
+		pila, cantidad = lineas[0].rsplit(' ', 1)
+		self.assertGreater(int(cantidad), 0)
+		self.assertIn('ocupado (expediente/tests.py:', pila.split(';')[-1])
+
+	def test_solo_administradores_y_buffer_acotado(self):
+		self.client.force_login(self.solicitante)
+		response = self.client.get(reverse('solicitud_list'), {'perfilar': 1})
+		self.assertFalse(response.has_header('X-Perfil'))
+		self.assertEqual(perfilado.listar(), [])
+
+		self.client.force_login(self.admin)
+		self.assertFalse(self.client.get(reverse('legajo_list')).has_header('X-Perfil'))
+		nombres = [
+			self.client.get(reverse('legajo_list'), HTTP_X_PERFILAR='1')['X-Perfil'],
+			self.client.get(reverse('solicitud_admin_list'), {'perfilar': 1})['X-Perfil'],
+			self.client.get(reverse('legajo_list'), {'perfilar': 1})['X-Perfil'],
+		]
+		self.assertEqual([ruta.name for ruta in perfilado.listar()], nombres[:0:-1])
+
+		response = self.client.get(reverse('perfil_list'))
+		self.assertContains(response, nombres[2])
+		response = self.client.get(reverse('perfil_list'), {'descargar': nombres[2]})
+		self.assertEqual(response['Content-Disposition'], f'attachment; filename="{nombres[2]}"')
+		self.assertEqual(self.client.get(reverse('perfil_list'), {'descargar': '../settings.py'}).status_code, 404)
+		self.assertEqual(self.client.get(reverse('perfil_list'), {'descargar': nombres[0]}).status_code, 404)
+
+
+class ColaPreparacionTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='archivista1', password='secret', is_staff=True)
+		self.otro_admin = User.objects.create_user(username='archivista2', password='secret', is_staff=True)
+		self.user = User.objects.create_user(username='usuario', password='secret')
+		self.solicitudes = [
+			crear_solicitud(self.user, [Legajo.objects.create(codigo=f'C{idx}', nombre=f'Legajo {idx}')])
+			for idx in range(5)
+		]
+
+	def test_cada_administrador_toma_solicitudes_distintas(self):
+		primeras = cola.reclamar(self.admin, 2)
+		segundas = cola.reclamar(self.otro_admin, 2)
+		self.assertEqual(primeras, self.solicitudes[:2])
+		self.assertEqual(segundas, self.solicitudes[2:4])
+		self.assertEqual(cola.reclamar(self.admin, 5), self.solicitudes[4:])
+		self.assertEqual(cola.reclamar(self.otro_admin), [])
+		self.assertEqual(list(cola.cola_de(self.admin)), self.solicitudes[:2] + self.solicitudes[4:])
+
+	def test_reclamo_vencido_queda_libre(self):
+		cola.reclamar(self.admin)
+		ReclamoSolicitud.objects.update(vence_en=timezone.now() - timedelta(seconds=1))
+		self.assertEqual(cola.reclamar(self.otro_admin), self.solicitudes[:1])
+		self.assertEqual(ReclamoSolicitud.objects.get().administrador, self.otro_admin)
+
+	def test_preparar_respeta_y_libera_el_reclamo(self):
+		solicitud = self.solicitudes[0]
+		prestamo = solicitud.prestamos.get()
+		self.client.force_login(self.admin)
+		response = self.client.post(reverse('solicitud_cola'), {'cantidad': 1})
+		self.assertRedirects(response, reverse('solicitud_detail', args=[solicitud.pk]))
+
+		self.client.force_login(self.otro_admin)
+		response = self.client.get(reverse('solicitud_detail', args=[solicitud.pk]))
+		self.assertFalse(response.context['puede_preparar'])
+		self.assertContains(response, 'La está preparando archivista1')
+		self.client.post(reverse('solicitud_preparar', args=[solicitud.pk]), {'prestamos_listos': [prestamo.pk]})
+		solicitud.refresh_from_db()
+		self.assertEqual(solicitud.estado, Solicitud.ESTADO_PENDIENTE)
+		response = self.client.get(reverse('solicitud_admin_list'))
+		self.assertEqual(response.context['solicitudes'][len(self.solicitudes) - 1].tomada_por, 'archivista1')
+
+		self.client.force_login(self.admin)
+		self.client.post(reverse('solicitud_preparar', args=[solicitud.pk]), {'prestamos_listos': [prestamo.pk]})
+		solicitud.refresh_from_db()
+		self.assertEqual(solicitud.estado, Solicitud.ESTADO_PREPARADA)
+		self.assertFalse(ReclamoSolicitud.objects.exists())
+
+
+@override_settings(DIFUSOR_EVENTOS='expediente.eventos.DifusorLocal')
+class EventosTests(TestCase):
+	def setUp(self):
+		eventos.difusor.cache_clear()
+		self.addCleanup(eventos.difusor.cache_clear)
+		User = get_user_model()
+		self.admin = User.objects.create_user(username='admin', password='secret', is_staff=True)
+		self.user = User.objects.create_user(username='usuario', password='secret')
+		self.otro = User.objects.create_user(username='otro', password='secret')
+		solicitantes, _ = Group.objects.get_or_create(name=USERS_GROUP_NAME)
+		for usuario in (self.user, self.otro):
+			usuario.groups.add(solicitantes)
+		self.desde = eventos.difusor().ultimo()
+
+	def _eventos(self, usuario, desde):
+		self.client.force_login(usuario)
+		response = self.client.get(reverse('eventos'), {'desde': desde, 'espera': 0})
+		self.assertEqual(response['Content-Type'], 'text/event-stream')
+		contenido = response.content.decode()
+		return int(re.findall(r'^id: (\d+)$', contenido, re.M)[-1]), re.findall(r'^data: (.*)$', contenido, re.M)
+
+	def test_publica_al_confirmar_y_filtra_por_usuario(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			propia = crear_solicitud(self.user, [Legajo.objects.create(codigo='E1', nombre='Uno')])
+		with self.captureOnCommitCallbacks(execute=True):
+			crear_solicitud(self.otro, [Legajo.objects.create(codigo='E2', nombre='Dos')])
+			propia.prestamos.transicionar('listo')
+			Solicitud.objects.filter(pk=propia.pk).transicionar('preparada')
+
+		# Por WSGI cada pedido entrega lo pendiente sin esperar y cierra.
+		ultimo, datos = self._eventos(self.admin, self.desde)
+		self.assertEqual(len(datos), 4)
+		ultimo_usuario, datos = self._eventos(self.user, self.desde)
+		vistos = [json.loads(dato) for dato in datos]
+		self.assertEqual(
+			[(evento['tipo'], evento['estado']) for evento in vistos],
+			[('solicitud_creada', 'pendiente'), ('prestamos', 'listo'), ('solicitud', 'preparada')],
+		)
+		self.assertTrue(all(evento['solicitud'] == propia.pk for evento in vistos))
+		# El id final cubre también lo que no le correspondía ver.
+		self.assertEqual(ultimo_usuario, ultimo)
+		self.assertEqual(self._eventos(self.user, ultimo), (ultimo, []))
+
+	def test_por_wsgi_no_espera_el_latido(self):
+		self.client.force_login(self.user)
+		inicio = time.perf_counter()
+		response = self.client.get(reverse('eventos'))
+		self.assertLess(time.perf_counter() - inicio, 1)
+		self.assertFalse(response.streaming)
+		self.assertEqual(response.content.decode(), f'retry: {eventos.SONDEO_MS}\n\nid: {self.desde}\n\n')
+
+	def test_sin_confirmar_no_publica(self):
+		with self.captureOnCommitCallbacks(execute=False):
+			crear_solicitud(self.user, [Legajo.objects.create(codigo='E3', nombre='Tres')])
+		self.assertEqual(self._eventos(self.admin, self.desde), (self.desde, []))
+		self.client.logout()
+		self.assertEqual(self.client.get(reverse('eventos')).status_code, 401)
+
+	async def test_difusor_entrega_a_suscriptores_conectados(self):
+		difusor = eventos.DifusorLocal(historial=2)
+		for numero in range(3):
+			difusor.publicar({'numero': numero})
+		recibidos = []
+		async with aclosing(difusor.escuchar(desde=0, latido=0.05)) as entradas:
+			async for entrada in entradas:
+				if entrada is None:
+					# Publicado desde otro hilo, como lo hace on_commit.
+					if len(recibidos) == 2:
+						threading.Thread(target=difusor.publicar, args=({'numero': 3},)).start()
+						continue
+					break
+				recibidos.append(entrada)
+		self.assertEqual(recibidos, [(2, {'numero': 1}), (3, {'numero': 2}), (4, {'numero': 3})])
+
+	async def test_por_asgi_la_respuesta_queda_abierta(self):
+		await self.async_client.aforce_login(self.admin)
+		response = await self.async_client.get(reverse('eventos'), {'espera': 0.01})
+		self.assertTrue(response.streaming)
+		partes = aiter(response.streaming_content)
+		self.assertEqual(await anext(partes), b'retry: 1000\n\n')
+		self.assertEqual(await anext(partes), b': latido\n\n')
+		eventos.difusor().publicar({'tipo': 'solicitud', 'usuarios': [self.user.pk]})
+		self.assertIn(b'event: solicitud', await anext(partes))
+		await partes.aclose()
+
+	def test_sin_difusor_no_hay_eventos(self):
+		with override_settings(DIFUSOR_EVENTOS=None):
+			eventos.difusor.cache_clear()
+			self.assertIsNone(eventos.difusor())
+			with self.captureOnCommitCallbacks() as callbacks:
+				crear_solicitud(self.user, [Legajo.objects.create(codigo='E4', nombre='Cuatro')])
+			self.assertEqual(callbacks, [])
+			self.client.force_login(self.user)
+			self.assertEqual(self.client.get(reverse('eventos')).status_code, 204)
+			self.assertEqual(eventos.comprobar_difusor(None), [])
+			# Las páginas quedan estáticas: ni EventSource ni recargas.
+			for nombre in ('dashboard', 'solicitud_list'):
+				self.assertNotContains(self.client.get(reverse(nombre)), 'escucharEventos')
+		self.client.force_login(self.admin)
+		eventos.difusor.cache_clear()
+		self.assertContains(self.client.get(reverse('solicitud_admin_list')), 'escucharEventos')
+
+	def test_difusor_local_es_error_fuera_de_debug(self):
+		with override_settings(DEBUG=False):
+			self.assertEqual([error.id for error in eventos.comprobar_difusor(None)], ['expediente.E001'])
+		with override_settings(DEBUG=True):
+			self.assertEqual([error.id for error in eventos.comprobar_difusor(None)], ['expediente.W001'])
+		with override_settings(DIFUSOR_EVENTOS='expediente.eventos.NoExiste'):
+			self.assertEqual([error.id for error in eventos.comprobar_difusor(None)], ['expediente.E002'])
+
+
+class ArchivoTests(TestCase):
+	@classmethod
+	def setUpTestData(cls):
+		generar_archivo(legajos=300, solicitudes=60, prestamos=180, usuarios=3, semilla=7)
+
+	def _exportar(self, **filtros):
+		return ''.join(exportacion.generar_csv(exportacion.prestamos_para_exportar(**filtros)))
+
+	def test_archiva_y_restaura_sin_perder_datos(self):
+		antes = self._exportar()
+		vivas = Solicitud.objects.count()
+		viejas = archivo.archivables(timedelta(days=180)).count()
+		self.assertGreater(viejas, 0)
+
+		lotes = []
+		self.assertEqual(archivo.archivar(timedelta(days=180), lote=10, al_confirmar_lote=lotes.append), viejas)
+		self.assertEqual(lotes[-1], viejas)
+		self.assertEqual(Solicitud.objects.count(), vivas - viejas)
+		self.assertFalse(PrestamoHistorico.objects.filter(estado__in=Prestamo.ESTADOS_ACTIVOS).exists())
+		self.assertLess(len(self._exportar()), len(antes))
+		self.assertEqual(self._exportar(historico=True), antes)
+		call_command('reconciliar_contadores', verificar=True, stdout=StringIO())
+		call_command('reconstruir_estado_legajos', verificar=True, stdout=StringIO())
+
+		salida = StringIO()
+		call_command('archivar_solicitudes', restaurar=list(SolicitudHistorica.objects.values_list('pk', flat=True)), stdout=salida)
+		self.assertIn(f'Restauradas {viejas}', salida.getvalue())
+		self.assertFalse(SolicitudHistorica.objects.exists())
+		self.assertEqual(self._exportar(), antes)
+		call_command('reconciliar_contadores', verificar=True, stdout=StringIO())
+
+	def test_listado_y_detalle_con_historico(self):
+		archivo.archivar(timedelta(days=180), limite=1)
+		archivada = SolicitudHistorica.objects.get()
+		self.client.force_login(archivada.usuario)
+		detalle = reverse('solicitud_detail', args=[archivada.pk])
+		self.assertEqual(self.client.get(detalle).status_code, 404)
+		response = self.client.get(detalle, {'historico': 1})
+		self.assertContains(response, f'Solicitud #{archivada.pk}')
+		self.assertEqual(len(response.context['prestamos']), archivada.prestamos.count())
+
+		self.assertNotContains(self.client.get(reverse('solicitud_list')), f'Solicitud #{archivada.pk} ')
+		response = self.client.get(reverse('solicitud_list'), {'historico': 1})
+		self.assertContains(response, f'{detalle}?historico=1')
+		fechas = [solicitud['creado_en'] for solicitud in response.context['solicitudes']]
+		self.assertEqual(fechas, sorted(fechas, reverse=True))
+		self.assertEqual(len(fechas), Solicitud.objects.filter(usuario=archivada.usuario).count() + 1)
+
+	def test_archiva_solicitud_con_reclamo_olvidado(self):
+		solicitud = archivo.archivables(timedelta(days=180)).first()
+		administrador = get_user_model().objects.filter(is_staff=True).first()
+		ReclamoSolicitud.objects.create(solicitud=solicitud, administrador=administrador, vence_en=timezone.now())
+		self.assertEqual(archivo.archivar(timedelta(days=180), limite=1), 1)
+		self.assertTrue(SolicitudHistorica.objects.filter(pk=solicitud.pk).exists())
+		self.assertFalse(ReclamoSolicitud.objects.exists())
+		self.assertFalse(Solicitud.objects.filter(pk=solicitud.pk).exists())
+
+
+class BitacoraTests(TestCase):
+	def setUp(self):
+		self.admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		self.legajos = Legajo.objects.bulk_create(
+			Legajo(codigo=f"B{idx}", nombre=f"Legajo {idx}") for idx in range(3)
+		)
+
+	def _momentos(self, solicitud):
+		# Cada paso del circuito, con el instante justo después.
+		momentos = {}
+		for transicion in ['listo', 'entregado']:
+			solicitud.prestamos.transicionar(transicion)
+			momentos[transicion] = timezone.now()
+		devolucion = crear_devolucion(self.user, solicitud.prestamos.all())
+		with CaptureQueriesContext(connection) as consultas:
+			confirmar_devolucion(devolucion, self.admin)
+		momentos['devuelto'] = timezone.now()
+		inserciones = [c for c in consultas.captured_queries if c['sql'].startswith('INSERT INTO "expediente_eventoprestamo"')]
+		self.assertEqual(len(inserciones), 1)
+		return momentos
+
+	def test_registra_cada_transicion_y_responde_por_instante(self):
+		antes = timezone.now()
+		solicitud = crear_solicitud(self.user, self.legajos)
+		momentos = self._momentos(solicitud)
+		legajo = self.legajos[0]
+
+		self.assertEqual(
+			[(e.tipo, e.estado_anterior, e.estado_nuevo, e.estado_legajo) for e in bitacora.custodia(legajo)],
+			[
+				(EventoPrestamo.TIPO_CREADO, '', Prestamo.ESTADO_PENDIENTE, Legajo.ESTADO_RESERVADO),
+				('listo', Prestamo.ESTADO_PENDIENTE, Prestamo.ESTADO_LISTO, Legajo.ESTADO_RESERVADO),
+				('entregado', Prestamo.ESTADO_LISTO, Prestamo.ESTADO_ENTREGADO, Legajo.ESTADO_PRESTADO),
+				('devuelto', Prestamo.ESTADO_ENTREGADO, Prestamo.ESTADO_DEVUELTO, Legajo.ESTADO_DISPONIBLE),
+			],
+		)
+		self.assertEqual(EventoPrestamo.objects.count(), 12)
+		self.assertIsNone(bitacora.tenedor(legajo, antes))
+		self.assertEqual(bitacora.tenedor(legajo, momentos['entregado']), self.user)
+		self.assertIsNone(bitacora.tenedor(legajo, momentos['devuelto']))
+
+		foto = {l.codigo: (l.estado_en, l.titular_en_id) for l in bitacora.estado_en(momentos['entregado'])}
+		self.assertEqual(foto, {f'B{idx}': (Legajo.ESTADO_PRESTADO, self.user.pk) for idx in range(3)})
+		foto = {l.estado_en for l in bitacora.estado_en(momentos['devuelto'])}
+		self.assertEqual(foto, {Legajo.ESTADO_DISPONIBLE})
+		self.assertFalse(bitacora.estado_en(antes - timedelta(days=1)).exists())
+
+		# La bitácora sobrevive al archivo de la solicitud.
+		Solicitud.objects.filter(pk=solicitud.pk).update(actualizado_en=timezone.now() - timedelta(days=365))
+		self.assertEqual(archivo.archivar(), 1)
+		self.assertEqual(EventoPrestamo.objects.filter(solicitud_id=solicitud.pk).count(), 12)
+
+	def test_transicion_sobre_legajo_bloqueado_a_mano(self):
+		solicitud = crear_solicitud(self.user, self.legajos[:1])
+		solicitud.prestamos.transicionar('listo')
+		legajo = Legajo.objects.get(pk=self.legajos[0].pk)
+		legajo.bloqueado = True
+		legajo.save()
+		solicitud.prestamos.transicionar('entregado')
+		ultimo = bitacora.custodia(legajo).last()
+		self.assertEqual((ultimo.tipo, ultimo.estado_legajo), ('entregado', Legajo.ESTADO_EXTRAVIADO))
+		self.assertIsNone(bitacora.tenedor(legajo, timezone.now()))
+		self.assertEqual(bitacora.estado_en(timezone.now()).get(pk=legajo.pk).estado_en, Legajo.ESTADO_EXTRAVIADO)
+
+	def test_bloqueo_manual_e_historial(self):
+		legajo = self.legajos[1]
+		self.client.force_login(self.admin)
+		self.client.post(reverse('legajo_toggle_bloqueo', args=[legajo.pk]))
+		self.client.post(reverse('legajo_toggle_bloqueo', args=[legajo.pk]))
+		self.assertEqual(
+			[(e.tipo, e.estado_legajo) for e in bitacora.custodia(legajo)],
+			[
+				(EventoPrestamo.TIPO_BLOQUEADO, Legajo.ESTADO_EXTRAVIADO),
+				(EventoPrestamo.TIPO_DESBLOQUEADO, Legajo.ESTADO_DISPONIBLE),
+			],
+		)
+		url = reverse('legajo_historial', args=[legajo.pk])
+		self.assertContains(self.client.get(url), 'Legajo desbloqueado')
+		response = self.client.get(url, {'momento': '2000-01-01T00:00'})
+		self.assertContains(response, 'todavía no existía')
+		self.client.force_login(self.user)
+		self.assertEqual(self.client.get(url).status_code, 403)
+
+	def test_admin_de_django_registra_bloqueos_y_no_edita_la_bitacora(self):
+		superusuario = get_user_model().objects.create_superuser(username='root', password='secret')
+		self.client.force_login(superusuario)
+		legajo = self.legajos[2]
+		datos = {'codigo': legajo.codigo, 'nombre': legajo.nombre, 'descripcion': '', 'bloqueado': 'on'}
+		self.client.post(reverse('admin:expediente_legajo_change', args=[legajo.pk]), datos)
+		self.client.post(reverse('admin:expediente_legajo_change', args=[legajo.pk]), {**datos, 'nombre': 'Otro'})
+		legajo.refresh_from_db()
+		self.assertEqual(legajo.estado, Legajo.ESTADO_EXTRAVIADO)
+		self.assertEqual([e.tipo for e in bitacora.custodia(legajo)], [EventoPrestamo.TIPO_BLOQUEADO])
+		self.assertEqual(bitacora.estado_en(timezone.now()).get(pk=legajo.pk).estado_en, Legajo.ESTADO_EXTRAVIADO)
+
+		evento = EventoPrestamo.objects.get()
+		self.assertEqual(self.client.get(reverse('admin:expediente_eventoprestamo_change', args=[evento.pk])).status_code, 200)
+		self.client.post(reverse('admin:expediente_eventoprestamo_delete', args=[evento.pk]), {'post': 'yes'})
+		self.assertEqual(self.client.get(reverse('admin:expediente_eventoprestamo_add')).status_code, 403)
+		self.assertTrue(EventoPrestamo.objects.filter(pk=evento.pk).exists())
+
+
+class ResumenesTests(TestCase):
+	def setUp(self):
+		self.admin = get_user_model().objects.create_user(username='admin', password='secret', is_staff=True)
+		self.user = get_user_model().objects.create_user(username='usuario', password='secret')
+		self.legajos = Legajo.objects.bulk_create(
+			Legajo(codigo=f"R{idx}", nombre=f"Legajo {idx}") for idx in range(3)
+		)
+
+	def _envejecer(self, dias):
+		# Los resúmenes no toman los eventos de los últimos minutos.
+		marca = resumenes.marca()
+		EventoPrestamo.objects.filter(pk__gt=marca.ultimo_evento if marca else 0).update(
+			ocurrido_en=models.F('ocurrido_en') - timedelta(days=dias),
+		)
+
+	def test_actualiza_incrementalmente_desde_la_marca(self):
+		solicitud = crear_solicitud(self.user, self.legajos[:2])
+		solicitud.prestamos.filter(legajo=self.legajos[0]).transicionar('listo')
+		solicitud.prestamos.filter(legajo=self.legajos[1]).transicionar('extraviado')
+		self.assertEqual(resumenes.actualizar(), 0)
+		self._envejecer(2)
+		self.assertEqual(resumenes.actualizar(lote=1), 4)
+		self.assertEqual(resumenes.actualizar(), 0)
+
+		solicitud.prestamos.transicionar('entregado')
+		devolucion = crear_devolucion(self.user, solicitud.prestamos.filter(estado=Prestamo.ESTADO_ENTREGADO))
+		confirmar_devolucion(devolucion, self.admin)
+		crear_solicitud(self.user, self.legajos[:1])
+		self._envejecer(1)
+		salida = StringIO()
+		call_command('actualizar_resumenes', stdout=salida)
+		self.assertIn('3 eventos nuevos', salida.getvalue())
+
+		hoy = timezone.localdate()
+		desde = hoy - timedelta(days=10)
+		self.assertEqual(
+			[(legajo.codigo, total) for legajo, total in resumenes.legajos_mas_pedidos(desde, hoy)],
+			[('R0', 2), ('R1', 1)],
+		)
+		usuarios = resumenes.tiempo_fuera_por_usuario(desde, hoy)
+		self.assertEqual([(u['usuario__username'], u['devueltos']) for u in usuarios], [('usuario', 1)])
+		primero, *_ = resumenes.por_periodo(desde, hoy, 'dia')
+		self.assertEqual(primero['periodo'], hoy - timedelta(days=2))
+		self.assertEqual((primero['creados'], primero['listos'], primero['extraviados']), (2, 1, 1))
+		self.assertEqual(primero['tasa_extravio'], 0.5)
+		self.assertEqual(sum(fila['creados'] for fila in resumenes.por_periodo(desde, hoy, 'semana')), 3)
+
+		# Recalcular desde cero da lo mismo que el incremental.
+		antes = list(ResumenDiario.objects.order_by('fecha').values())
+		call_command('actualizar_resumenes', reiniciar=True, stdout=StringIO())
+		self.assertEqual(list(ResumenDiario.objects.order_by('fecha').values()), antes)
+
+	def test_reporte_lee_solo_resumenes(self):
+		crear_solicitud(self.user, self.legajos)
+		self._envejecer(1)
+		resumenes.actualizar()
+		self.client.force_login(self.admin)
+		with CaptureQueriesContext(connection) as consultas:
+			response = self.client.get(reverse('reporte'), {'periodo': 'dia'})
+		self.assertContains(response, 'R2')
+		tablas = ' '.join(consulta['sql'] for consulta in consultas.captured_queries)
+		self.assertNotIn('expediente_prestamo', tablas)
+		self.assertNotIn('expediente_eventoprestamo', tablas)
+		self.client.force_login(self.user)
+		self.assertEqual(self.client.get(reverse('reporte')).status_code, 403)
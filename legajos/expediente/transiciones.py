@@ -0,0 +1,109 @@
+"""Motor declarativo de transiciones de estado.
+
+Cada modelo con estado declara una tabla ``TRANSICIONES`` y usa un QuerySet
+derivado de ``TransicionQuerySet``. ``transicionar()`` compila la transición a
+un ``UPDATE ... WHERE estado IN (...)`` sobre todas las filas del QuerySet, de
+modo que el costo no depende de cuántas filas cambian.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable
+
+from django.db import models, transaction
+from django.utils import timezone
+
+from .signals import transicion_realizada
+
+# Marcador para los valores que toman el instante de la transición.
+AHORA = object()
+
+
+@dataclass(frozen=True)
+class Transicion:
+    origen: tuple[str, ...]
+    destino: str
+    valores: dict = field(default_factory=dict)
+    condicion: Callable[[], models.Q] | None = None
+    efectos_legajo: dict = field(default_factory=dict)
+    transicion_solicitud: str | None = None
+
+    def valores_update(self, momento) -> dict:
+        valores = {'estado': self.destino}
+        for campo, valor in self.valores.items():
+            valores[campo] = momento if valor is AHORA else valor
+        return valores
+
+
+class TransicionQuerySet(models.QuerySet):
+    """QuerySet que aplica transiciones con ``UPDATE`` condicionales."""
+
+    campos_transicion = ('pk', 'estado')
+
+    def transicionar(self, nombre: str) -> int:
+        """Aplica la transición ``nombre`` y devuelve cuántas filas cambiaron.
+
+        Las filas que no están en un estado de origen (o no cumplen la
+        condición de la transición) se ignoran sin error.
+        """
+
+        transicion = self.model.TRANSICIONES[nombre]
+        momento = timezone.now()
+        candidatos = self.filter(estado__in=transicion.origen)
+        if transicion.condicion is not None:
+            candidatos = candidatos.filter(transicion.condicion())
+        valores = transicion.valores_update(momento)
+        if any(campo.name == 'actualizado_en' for campo in self.model._meta.concrete_fields):
+            valores['actualizado_en'] = momento
+
+        # Como ``bulk_update``, sin savepoint: dentro de otra transacción un
+        # error la invalida entera en vez de deshacer sólo esta transición.
+        with transaction.atomic(using=self.db, savepoint=False):
+            filas = self._leer_candidatos(candidatos)
+            if not filas:
+                return 0
+            base = self.model._base_manager.using(self.db)
+            transicionados = base.filter(
+                pk__in=[fila['pk'] for fila in filas],
+                estado__in=transicion.origen,
+            ).update(**valores)
+            if transicionados != len(filas):
+                # Otra transacción cambió alguna fila entre la lectura y el
+                # UPDATE (``select_for_update`` no bloquea en SQLite): sólo
+                # siguen las que cambió este UPDATE, marcadas con ``momento``.
+                marca = {'actualizado_en': momento} if 'actualizado_en' in valores else {}
+                cambiadas = set(
+                    base.filter(pk__in=[fila['pk'] for fila in filas], estado=transicion.destino, **marca)
+                    .values_list('pk', flat=True)
+                )
+                filas = [fila for fila in filas if fila['pk'] in cambiadas]
+                if not filas:
+                    return 0
+            self._aplicar_efectos(transicion, filas, momento)
+            transicion_realizada.send(
+                sender=self.model,
+                transicion=nombre,
+                filas=filas,
+                momento=momento,
+            )
+        return transicionados
+
+    def _leer_candidatos(self, candidatos) -> list[dict]:
+        return list(candidatos.order_by().select_for_update(of=('self',)).values(*self.campos_transicion))
+
+    def _aplicar_efectos(self, transicion: Transicion, filas: list[dict], momento) -> None:
+        """Propaga la transición a otras entidades; por defecto no hace nada."""
+
+
+class TransicionModelMixin:
+    """Aplica transiciones sobre la propia instancia y refresca sus campos."""
+
+    TRANSICIONES: dict[str, Transicion] = {}
+
+    def transicionar(self, nombre: str) -> bool:
+        transicionados = type(self)._default_manager.filter(pk=self.pk).transicionar(nombre)
+        if transicionados:
+            campos = ['estado', *self.TRANSICIONES[nombre].valores]
+            if any(campo.name == 'actualizado_en' for campo in self._meta.concrete_fields):
+                campos.append('actualizado_en')
+            self.refresh_from_db(fields=campos)
+        return bool(transicionados)
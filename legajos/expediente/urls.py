@@ -1,15 +1,31 @@
 from django.urls import path
-from . import views
+from . import eventos, views
 
 urlpatterns = [
     path('legajos/', views.LegajoListView.as_view(), name='legajo_list'),
+    path('legajos/buscar/', views.legajo_buscar_view, name='legajo_buscar'),
+    path('legajos/importar/', views.LegajoImportarView.as_view(), name='legajo_importar'),
     path('legajos/nuevo/', views.LegajoCreateView.as_view(), name='legajo_create'),
+    path('legajos/<int:pk>/historial/', views.LegajoHistorialView.as_view(), name='legajo_historial'),
     path('legajos/<int:pk>/toggle-bloqueo/', views.legajo_toggle_bloqueo_view, name='legajo_toggle_bloqueo'),
     path('solicitudes/', views.SolicitudListView.as_view(), name='solicitud_list'),
     path('solicitudes/gestion/', views.SolicitudAdminListView.as_view(), name='solicitud_admin_list'),
-    path('solicitudes/nueva/', views.SolicitudCreateView.as_view(), name='solicitud_create'),
+    path('solicitudes/cola/', views.SolicitudColaView.as_view(), name='solicitud_cola'),
+    path('solicitudes/nueva/', views.CarritoView.as_view(), name='solicitud_create'),
+    path('solicitudes/nueva/agregar/', views.carrito_agregar_view, name='carrito_agregar'),
+    path('solicitudes/nueva/quitar/<int:pk>/', views.carrito_quitar_view, name='carrito_quitar'),
+    path('solicitudes/nueva/confirmar/', views.carrito_confirmar_view, name='carrito_confirmar'),
     path('solicitudes/<int:pk>/', views.SolicitudDetailView.as_view(), name='solicitud_detail'),
     path('solicitudes/<int:pk>/preparar/', views.solicitud_preparar_view, name='solicitud_preparar'),
     path('solicitudes/<int:pk>/confirmar-entrega/', views.solicitud_confirmar_entrega_view, name='solicitud_confirmar_entrega'),
+    path('devoluciones/', views.DevolucionListView.as_view(), name='devolucion_list'),
+    path('devoluciones/gestion/', views.DevolucionAdminListView.as_view(), name='devolucion_admin_list'),
+    path('devoluciones/nueva/', views.DevolucionCreateView.as_view(), name='devolucion_create'),
+    path('devoluciones/<int:pk>/', views.DevolucionDetailView.as_view(), name='devolucion_detail'),
+    path('devoluciones/<int:pk>/confirmar/', views.devolucion_confirmar_view, name='devolucion_confirmar'),
+    path('prestamos/exportar/', views.PrestamoExportarView.as_view(), name='prestamo_exportar'),
+    path('eventos/', eventos.eventos_view, name='eventos'),
+    path('reportes/', views.ReporteView.as_view(), name='reporte'),
+    path('perfiles/', views.PerfilListView.as_view(), name='perfil_list'),
     path('prestamos/<int:pk>/devolver/', views.prestamo_devolver_view, name='prestamo_devolver'),
 ]
\ No newline at end of file
@@ -1,15 +1,35 @@
+import csv
+import io
+from datetime import timedelta
+
 from django import forms
+from django.contrib import messages
+from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db import transaction
-from django.db.models import Count, Q
-from django.http import HttpResponseForbidden
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, Http404, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect
 from django.urls import reverse
-from django.views.generic import CreateView, DetailView, FormView, ListView
-
-from .models import Legajo, Prestamo, Solicitud, SolicitudItem
+from django.utils import timezone
+from django.views.generic import CreateView, DetailView, FormView, ListView, TemplateView
+
+from .busqueda import buscar_legajos
+from . import bitacora, cola, exportacion, perfilado, resumenes
+from .carrito import MAX_LEGAJOS, Carrito, separar_codigos
+from .importacion import ErrorImportacion, importar_legajos_csv
+from .models import Devolucion, Legajo, Prestamo, Solicitud, SolicitudHistorica
+from .paginacion import PaginacionCursorMixin
 from .permissions import es_administrador, es_solicitante
+from .services import (
+    LegajosNoDisponibles,
+    PrestamosNoDevolvibles,
+    confirmar_devolucion,
+    crear_devolucion,
+    crear_solicitud,
+)
 
 
 class AdministradorRequiredMixin(LoginRequiredMixin, UserPassesTestMixin):
@@ -32,31 +52,93 @@ class LegajoForm(forms.ModelForm):
         fields = ['codigo', 'nombre', 'descripcion']
 
 
-class SolicitudForm(forms.Form):
-    legajos = forms.ModelMultipleChoiceField(
-        queryset=Legajo.objects.none(),
+class ImportarLegajosForm(forms.Form):
+    archivo = forms.FileField(label='Archivo CSV', help_text='Columnas: codigo, nombre y opcionalmente descripcion.')
+    actualizar = forms.BooleanField(required=False, label='Actualizar los códigos que ya existen')
+
+
+class ExportarPrestamosForm(forms.Form):
+    desde = forms.DateField(required=False, label='Creados desde', widget=forms.DateInput(attrs={'type': 'date'}))
+    hasta = forms.DateField(required=False, label='Hasta', widget=forms.DateInput(attrs={'type': 'date'}))
+    usuario = forms.ModelChoiceField(
+        queryset=get_user_model().objects.all(),
+        to_field_name='username',
+        required=False,
+        widget=forms.TextInput,
+        label='Usuario',
+    )
+    estado = forms.ChoiceField(choices=[('', 'Todos'), *Prestamo.ESTADOS], required=False)
+    historico = forms.BooleanField(required=False, label='Incluir solicitudes archivadas')
+    formato = forms.ChoiceField(choices=[(formato, formato.upper()) for formato in exportacion.FORMATOS])
+
+
+class HistorialLegajoForm(forms.Form):
+    momento = forms.DateTimeField(
+        required=False,
+        label='Estado al',
+        widget=forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+    )
+
+
+class ReporteForm(forms.Form):
+    desde = forms.DateField(required=False, label='Desde', widget=forms.DateInput(attrs={'type': 'date'}))
+    hasta = forms.DateField(required=False, label='Hasta', widget=forms.DateInput(attrs={'type': 'date'}))
+    periodo = forms.ChoiceField(
+        choices=[('dia', 'Día'), ('semana', 'Semana'), ('mes', 'Mes')],
+        required=False,
+        label='Agrupar por',
+    )
+
+
+class PrestamoChoiceField(forms.ModelMultipleChoiceField):
+    def label_from_instance(self, obj):
+        return f"{obj.legajo.codigo} - {obj.legajo.nombre} (Solicitud #{obj.solicitud_id})"
+
+
+class DevolucionForm(forms.Form):
+    prestamos = PrestamoChoiceField(
+        queryset=Prestamo.objects.none(),
         required=True,
         widget=forms.CheckboxSelectMultiple,
-        label='Legajos a solicitar',
+        label='Legajos a devolver',
     )
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, usuario, **kwargs):
         super().__init__(*args, **kwargs)
-        disponibles = Legajo.objects.filter(bloqueado=False).order_by('codigo')
-        self.fields['legajos'].queryset = disponibles
-
-    def clean_legajos(self):
-        qs = self.cleaned_data['legajos']
-        no_disp = [legajo.codigo for legajo in qs if not legajo.disponible]
-        if no_disp:
-            raise forms.ValidationError(f"Legajos no disponibles: {', '.join(no_disp)}")
-        return qs
+        self.fields['prestamos'].queryset = (
+            Prestamo.objects.filter(
+                usuario=usuario,
+                estado=Prestamo.ESTADO_ENTREGADO,
+                devolucion__isnull=True,
+            )
+            .select_related('legajo')
+            .order_by('legajo__codigo')
+        )
 
 
-class LegajoListView(AdministradorRequiredMixin, ListView):
+class LegajoListView(AdministradorRequiredMixin, PaginacionCursorMixin, ListView):
     model = Legajo
     template_name = 'legajo_list.html'
     context_object_name = 'legajos'
+    orden_cursor = ('codigo',)
+    FILTROS = {
+        'bloqueado': Q(bloqueado=True),
+        'disponible': Q(estado=Legajo.ESTADO_DISPONIBLE),
+        'reservado': Q(estado=Legajo.ESTADO_RESERVADO),
+        'prestado': Q(estado=Legajo.ESTADO_PRESTADO),
+    }
+
+    def get_queryset(self):
+        legajos = Legajo.objects.con_disponibilidad()
+        filtro = self.FILTROS.get(self.request.GET.get('filtro'))
+        if filtro is not None:
+            legajos = legajos.filter(filtro)
+        return legajos
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault('filtros', list(self.FILTROS))
+        kwargs.setdefault('filtro', self.request.GET.get('filtro', ''))
+        return super().get_context_data(**kwargs)
 
 
 class LegajoCreateView(AdministradorRequiredMixin, CreateView):
@@ -68,73 +150,203 @@ class LegajoCreateView(AdministradorRequiredMixin, CreateView):
         return reverse('legajo_list')
 
 
-class SolicitudListView(SolicitanteRequiredMixin, ListView):
+class LegajoImportarView(AdministradorRequiredMixin, FormView):
+    form_class = ImportarLegajosForm
+    template_name = 'legajo_importar.html'
+    max_errores_mostrados = 100
+
+    def form_valid(self, form):
+        archivo = io.TextIOWrapper(form.cleaned_data['archivo'].file, encoding='utf-8-sig', newline='')
+        try:
+            resultado = importar_legajos_csv(archivo, actualizar=form.cleaned_data['actualizar'])
+        except (ErrorImportacion, UnicodeDecodeError, csv.Error) as exc:
+            form.add_error('archivo', str(exc))
+            return self.form_invalid(form)
+        except IntegrityError:
+            form.add_error(
+                'archivo',
+                'Otro proceso modificó los legajos durante la importación. '
+                'Los lotes ya confirmados quedaron guardados; volvé a subir el archivo para el resto.',
+            )
+            return self.form_invalid(form)
+        return self.render_to_response(self.get_context_data(
+            form=self.form_class(),
+            resultado=resultado,
+            errores=resultado.errores[: self.max_errores_mostrados],
+        ))
+
+
+class HistoricoMixin:
+    """``?historico=1`` incluye las solicitudes archivadas (ver ``archivo.py``)."""
+
+    @property
+    def historico(self) -> bool:
+        return bool(self.request.GET.get('historico'))
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault('historico', self.historico)
+        return super().get_context_data(**kwargs)
+
+
+class SolicitudListView(SolicitanteRequiredMixin, HistoricoMixin, ListView):
     model = Solicitud
     template_name = 'solicitud_list.html'
     context_object_name = 'solicitudes'
 
     def get_queryset(self):
-        return Solicitud.objects.filter(usuario=self.request.user).order_by('-creado_en')
+        solicitudes = Solicitud.objects.filter(usuario=self.request.user)
+        if not self.historico:
+            return solicitudes.order_by('-creado_en')
+        campos = ('id', 'estado', 'creado_en', 'archivada')
+        archivadas = SolicitudHistorica.objects.filter(usuario=self.request.user).annotate(archivada=Value(True))
+        return (
+            solicitudes.annotate(archivada=Value(False)).values(*campos)
+            .union(archivadas.values(*campos), all=True)
+            .order_by('-creado_en')
+        )
 
 
-class SolicitudAdminListView(AdministradorRequiredMixin, ListView):
+class SolicitudAdminListView(AdministradorRequiredMixin, PaginacionCursorMixin, ListView):
     model = Solicitud
     template_name = 'solicitud_admin_list.html'
     context_object_name = 'solicitudes'
+    orden_cursor = ('-creado_en', '-pk')
+    ESTADOS_POR_DEFECTO = [Solicitud.ESTADO_PENDIENTE, Solicitud.ESTADO_PREPARADA]
+
+    def get_estados(self):
+        validos = {estado for estado, _ in Solicitud.ESTADOS}
+        estados = [estado for estado in self.request.GET.getlist('estado') if estado in validos]
+        return estados or self.ESTADOS_POR_DEFECTO
 
     def get_queryset(self):
+        activos = (
+            Prestamo.objects.filter(solicitud=OuterRef('pk'), activo=True)
+            .order_by()
+            .values('solicitud')
+            .annotate(cantidad=Count('pk'))
+            .values('cantidad')
+        )
         return (
-            Solicitud.objects.select_related('usuario')
-            .prefetch_related('prestamos__legajo')
-            .annotate(active_prestamos=Count('prestamos', filter=Q(prestamos__activo=True)))
-            .order_by('-creado_en')
+            Solicitud.objects.filter(estado__in=self.get_estados())
+            .select_related('usuario')
+            .annotate(
+                active_prestamos=Coalesce(Subquery(activos), 0),
+                tomada_por=Subquery(
+                    cola.reclamos_vigentes().filter(solicitud=OuterRef('pk')).values('administrador__username')[:1]
+                ),
+            )
         )
 
+    def particiones_cursor(self, queryset):
+        # ``estado IN (...)`` ordenado por fecha obliga a ordenar en memoria
+        # todas las solicitudes de esos estados; por estado, el índice
+        # ``(estado, -creado_en)`` ya las da en orden hasta el LIMIT.
+        return [queryset.filter(estado=estado) for estado in self.get_estados()]
+
+    def get_context_data(self, **kwargs):
+        kwargs.setdefault('estados', Solicitud.ESTADOS)
+        kwargs.setdefault('estados_seleccionados', self.get_estados())
+        return super().get_context_data(**kwargs)
+
+
+class CarritoView(SolicitanteRequiredMixin, TemplateView):
+    """Arma una solicitud agregando legajos de a uno o por lista de códigos."""
 
-class SolicitudCreateView(SolicitanteRequiredMixin, FormView):
-    form_class = SolicitudForm
     template_name = 'solicitud_form.html'
 
-    def form_valid(self, form):
-        solicitud = Solicitud.objects.create(usuario=self.request.user)
-        legajos = form.cleaned_data['legajos']
-        for legajo in legajos:
-            SolicitudItem.objects.create(
-                solicitud=solicitud,
-                legajo=legajo,
-                disponible_al_crear=legajo.disponible,
-            )
-            Prestamo.objects.create(
-                solicitud=solicitud,
-                legajo=legajo,
-                usuario=self.request.user,
-            )
-        return redirect('solicitud_detail', pk=solicitud.pk)
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        carrito = Carrito(self.request.session)
+        context.update(
+            legajos=carrito.legajos() if len(carrito) else [],
+            max_legajos=MAX_LEGAJOS,
+        )
+        return context
+
+
+@user_passes_test(es_solicitante)
+def carrito_agregar_view(request):
+    if request.method != 'POST':
+        return redirect('solicitud_create')
+    carrito = Carrito(request.session)
+    ids = [int(value) for value in request.POST.getlist('legajo') if value.isdigit()]
+    agregados, rechazados = carrito.agregar_ids(ids) if ids else ([], {})
+    codigos = separar_codigos(request.POST.get('codigos', ''))
+    if codigos:
+        por_codigo, rechazados_por_codigo = carrito.agregar_codigos(codigos)
+        agregados += por_codigo
+        rechazados.update(rechazados_por_codigo)
+    if agregados:
+        messages.success(request, f"Agregados: {', '.join(agregados)}")
+    if rechazados:
+        detalle = ', '.join(f'{codigo} ({motivo})' for codigo, motivo in sorted(rechazados.items()))
+        messages.error(request, f'No agregados: {detalle}')
+    return redirect('solicitud_create')
+
+
+@user_passes_test(es_solicitante)
+def carrito_quitar_view(request, pk):
+    if request.method == 'POST':
+        Carrito(request.session).quitar(pk)
+    return redirect('solicitud_create')
+
+
+@user_passes_test(es_solicitante)
+def carrito_confirmar_view(request):
+    if request.method != 'POST':
+        return redirect('solicitud_create')
+    carrito = Carrito(request.session)
+    if not len(carrito):
+        messages.error(request, 'El carrito está vacío.')
+        return redirect('solicitud_create')
+    try:
+        solicitud = crear_solicitud(request.user, carrito.ids)
+    except LegajosNoDisponibles as exc:
+        messages.error(request, str(exc))
+        carrito.descartar_inexistentes()
+        return redirect('solicitud_create')
+    carrito.vaciar()
+    return redirect('solicitud_detail', pk=solicitud.pk)
 
 
-class SolicitudDetailView(SolicitanteRequiredMixin, DetailView):
+class SolicitudDetailView(SolicitanteRequiredMixin, HistoricoMixin, DetailView):
     model = Solicitud
     template_name = 'solicitud_detail.html'
     context_object_name = 'solicitud'
 
-    def get_queryset(self):
+    def get_queryset(self, modelo=Solicitud):
         if es_administrador(self.request.user):
-            return Solicitud.objects.all()
-        return Solicitud.objects.filter(usuario=self.request.user)
+            return modelo.objects.all()
+        return modelo.objects.filter(usuario=self.request.user)
+
+    def get_object(self, queryset=None):
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            if not self.historico:
+                raise
+        return super().get_object(self.get_queryset(SolicitudHistorica))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         solicitud = context['solicitud']
         usuario = self.request.user
         es_admin = es_administrador(usuario)
-        prestamos_pendientes = solicitud.prestamos.filter(estado=Prestamo.ESTADO_PENDIENTE)
+        prestamos = list(solicitud.prestamos.select_related('legajo').order_by('pk'))
+        prestamos_pendientes = [p for p in prestamos if p.estado == Prestamo.ESTADO_PENDIENTE]
+        hay_listos = any(p.estado == Prestamo.ESTADO_LISTO for p in prestamos)
+        preparable = es_admin and solicitud.estado == Solicitud.ESTADO_PENDIENTE and bool(prestamos_pendientes)
+        reclamo = cola.reclamo_ajeno(solicitud.pk, usuario) if preparable else None
         context.update(
             es_admin=es_admin,
+            items=solicitud.items.select_related('legajo').order_by('pk'),
+            prestamos=prestamos,
             prestamos_pendientes=prestamos_pendientes,
-            puede_preparar=es_admin and solicitud.estado == Solicitud.ESTADO_PENDIENTE and prestamos_pendientes.exists(),
+            reclamo_ajeno=reclamo,
+            puede_preparar=preparable and reclamo is None,
             puede_confirmar_entrega=
-                (solicitud.usuario == usuario)
-                and solicitud.prestamos.filter(estado=Prestamo.ESTADO_LISTO).exists()
+                (solicitud.usuario_id == usuario.pk)
+                and hay_listos
                 and solicitud.estado in (Solicitud.ESTADO_PREPARADA, Solicitud.ESTADO_PENDIENTE),
             estado_entregado=Prestamo.ESTADO_ENTREGADO,
         )
@@ -146,18 +358,47 @@ def solicitud_preparar_view(request, pk):
     solicitud = get_object_or_404(Solicitud, pk=pk)
     if request.method != 'POST':
         return redirect('solicitud_detail', pk=solicitud.pk)
-    prestamos = list(solicitud.prestamos.filter(estado=Prestamo.ESTADO_PENDIENTE))
+    reclamo = cola.reclamo_ajeno(solicitud.pk, request.user)
+    if reclamo is not None:
+        messages.error(request, f'La está preparando {reclamo.administrador.username} hasta {reclamo.vence_en:%H:%M}.')
+        return redirect('solicitud_detail', pk=solicitud.pk)
+    pendientes = solicitud.prestamos.filter(estado=Prestamo.ESTADO_PENDIENTE)
     seleccionados = {int(value) for value in request.POST.getlist('prestamos_listos')}
     with transaction.atomic():
-        for prestamo in prestamos:
-            if prestamo.pk in seleccionados:
-                prestamo.marcar_listo()
-            else:
-                prestamo.marcar_extraviado()
-        solicitud.marcar_preparada(bool(seleccionados))
+        listos = pendientes.filter(pk__in=seleccionados).transicionar('listo')
+        pendientes.exclude(pk__in=seleccionados).transicionar('extraviado')
+        Solicitud.objects.filter(pk=solicitud.pk).transicionar('preparada' if listos else 'cancelada')
+        cola.liberar([solicitud.pk])
     return redirect('solicitud_detail', pk=solicitud.pk)
 
 
+class SolicitudColaView(AdministradorRequiredMixin, TemplateView):
+    """Solicitudes tomadas por el administrador; el POST toma las siguientes libres."""
+
+    template_name = 'solicitud_cola.html'
+
+    def post(self, request, *args, **kwargs):
+        try:
+            cantidad = int(request.POST.get('cantidad', 1))
+        except ValueError:
+            cantidad = 1
+        tomadas = cola.reclamar(request.user, cantidad)
+        if not tomadas:
+            messages.error(request, 'No quedan solicitudes pendientes libres.')
+        elif len(tomadas) == 1:
+            return redirect('solicitud_detail', pk=tomadas[0].pk)
+        else:
+            messages.success(request, f'Tomadas {len(tomadas)} solicitudes.')
+        return redirect('solicitud_cola')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['solicitudes'] = cola.cola_de(self.request.user)
+        context['duracion'] = int(cola.DURACION_RECLAMO.total_seconds() // 60)
+        context['maximo'] = cola.MAX_RECLAMOS
+        return context
+
+
 @login_required
 def solicitud_confirmar_entrega_view(request, pk):
     solicitud = get_object_or_404(Solicitud, pk=pk)
@@ -165,30 +406,231 @@ def solicitud_confirmar_entrega_view(request, pk):
         return HttpResponseForbidden('No autorizado')
     if request.method != 'POST':
         return redirect('solicitud_detail', pk=solicitud.pk)
-    prestamos_listos = list(solicitud.prestamos.filter(estado=Prestamo.ESTADO_LISTO))
-    if not prestamos_listos:
-        return redirect('solicitud_detail', pk=solicitud.pk)
-    with transaction.atomic():
-        for prestamo in prestamos_listos:
-            prestamo.marcar_entregado()
-        solicitud.marcar_entregada()
+    solicitud.prestamos.transicionar('entregado')
     return redirect('solicitud_detail', pk=solicitud.pk)
 
 
+class DevolucionCreateView(SolicitanteRequiredMixin, FormView):
+    form_class = DevolucionForm
+    template_name = 'devolucion_form.html'
+
+    def get_form_kwargs(self):
+        kwargs = super().get_form_kwargs()
+        kwargs['usuario'] = self.request.user
+        return kwargs
+
+    def form_valid(self, form):
+        try:
+            devolucion = crear_devolucion(self.request.user, form.cleaned_data['prestamos'])
+        except PrestamosNoDevolvibles as exc:
+            form.add_error('prestamos', str(exc))
+            return self.form_invalid(form)
+        return redirect('devolucion_detail', pk=devolucion.pk)
+
+
+def _cantidad_de_prestamos():
+    # Subconsulta por devolución: con JOIN y GROUP BY el orden del listado
+    # ya no sale del índice y SQLite ordena todo en memoria.
+    return Coalesce(Subquery(
+        Prestamo.objects.filter(devolucion=OuterRef('pk'))
+        .order_by()
+        .values('devolucion')
+        .annotate(cantidad=Count('pk'))
+        .values('cantidad')
+    ), 0)
+
+
+class DevolucionListView(SolicitanteRequiredMixin, ListView):
+    model = Devolucion
+    template_name = 'devolucion_list.html'
+    context_object_name = 'devoluciones'
+
+    def get_queryset(self):
+        return (
+            Devolucion.objects.filter(usuario=self.request.user)
+            .annotate(cantidad=_cantidad_de_prestamos())
+            .order_by('-creado_en')
+        )
+
+
+class DevolucionAdminListView(AdministradorRequiredMixin, ListView):
+    model = Devolucion
+    template_name = 'devolucion_admin_list.html'
+    context_object_name = 'devoluciones'
+
+    def get_queryset(self):
+        return (
+            Devolucion.objects.filter(estado=Devolucion.ESTADO_PENDIENTE)
+            .select_related('usuario')
+            .annotate(cantidad=_cantidad_de_prestamos())
+            .order_by('creado_en')
+        )
+
+
+class DevolucionDetailView(SolicitanteRequiredMixin, DetailView):
+    model = Devolucion
+    template_name = 'devolucion_detail.html'
+    context_object_name = 'devolucion'
+
+    def get_queryset(self):
+        if es_administrador(self.request.user):
+            return Devolucion.objects.select_related('usuario', 'confirmado_por')
+        return Devolucion.objects.filter(usuario=self.request.user)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        devolucion = context['devolucion']
+        es_admin = es_administrador(self.request.user)
+        context.update(
+            es_admin=es_admin,
+            prestamos=devolucion.prestamos.select_related('legajo').order_by('legajo__codigo'),
+            puede_confirmar=es_admin and devolucion.estado == Devolucion.ESTADO_PENDIENTE,
+        )
+        return context
+
+
+@user_passes_test(es_administrador)
+def devolucion_confirmar_view(request, pk):
+    devolucion = get_object_or_404(Devolucion, pk=pk)
+    if request.method == 'POST':
+        confirmar_devolucion(devolucion, request.user)
+    return redirect('devolucion_detail', pk=devolucion.pk)
+
+
 @login_required
 def prestamo_devolver_view(request, pk):
+    """Abre una devolución con este solo préstamo; un administrador confirma la recepción."""
+
     prestamo = get_object_or_404(Prestamo, pk=pk)
-    if not (prestamo.usuario == request.user or es_administrador(request.user)):
+    if prestamo.usuario_id != request.user.pk:
         return HttpResponseForbidden('No autorizado')
-    prestamo.marcar_devuelto()
-    return redirect('solicitud_detail', pk=prestamo.solicitud.pk)
+    if request.method != 'POST':
+        return redirect('solicitud_detail', pk=prestamo.solicitud_id)
+    try:
+        devolucion = crear_devolucion(request.user, [prestamo])
+    except PrestamosNoDevolvibles as exc:
+        messages.error(request, str(exc))
+        return redirect('solicitud_detail', pk=prestamo.solicitud_id)
+    return redirect('devolucion_detail', pk=devolucion.pk)
+
+
+@user_passes_test(es_solicitante)
+def legajo_buscar_view(request):
+    """Autocompletado: legajos que coinciden por prefijo con ``q``, por relevancia."""
+
+    try:
+        limite = min(max(int(request.GET.get('limite', 20)), 1), 50)
+    except ValueError:
+        limite = 20
+    resultados = [
+        {
+            'id': legajo.pk,
+            'codigo': legajo.codigo,
+            'nombre': legajo.nombre,
+            'estado': legajo.estado,
+            'disponible': legajo.disponible,
+        }
+        for legajo in buscar_legajos(request.GET.get('q', ''), limite)
+    ]
+    return JsonResponse({'resultados': resultados})
 
 
 @user_passes_test(es_administrador)
 def legajo_toggle_bloqueo_view(request, pk):
-    legajo = get_object_or_404(Legajo, pk=pk)
-    legajo.bloqueado = not legajo.bloqueado
-    legajo.save()
+    # ``save()`` y la bitácora leen el préstamo vigente: se trae en la misma consulta.
+    legajo = get_object_or_404(Legajo.objects.select_related('prestamo_actual'), pk=pk)
+    with transaction.atomic(savepoint=False):
+        legajo.bloqueado = not legajo.bloqueado
+        legajo.save()
+        bitacora.registrar_bloqueo(legajo)
     return redirect('legajo_list')
 
+
+class LegajoHistorialView(AdministradorRequiredMixin, DetailView):
+    """Línea de custodia del legajo; con ``?momento=`` también quién lo tenía entonces."""
+
+    model = Legajo
+    template_name = 'legajo_historial.html'
+    context_object_name = 'legajo'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = HistorialLegajoForm(self.request.GET or None)
+        context['form'] = form
+        context['eventos'] = bitacora.custodia(self.object)
+        if form.is_valid() and form.cleaned_data['momento']:
+            momento = form.cleaned_data['momento']
+            context['momento'] = momento
+            context['en_momento'] = bitacora.estado_en(momento, Legajo.objects.filter(pk=self.object.pk)).first()
+            context['tenedor'] = bitacora.tenedor(self.object, momento)
+        return context
+
+
+class PrestamoExportarView(AdministradorRequiredMixin, TemplateView):
+    """Formulario de exportación; con ``?formato=`` devuelve el archivo en streaming."""
+
+    template_name = 'prestamo_exportar.html'
+
+    def get(self, request, *args, **kwargs):
+        if 'formato' not in request.GET:
+            return self.render_to_response(self.get_context_data(form=ExportarPrestamosForm()))
+        form = ExportarPrestamosForm(request.GET)
+        if not form.is_valid():
+            return self.render_to_response(self.get_context_data(form=form))
+        filtros = form.cleaned_data
+        formato = filtros.pop('formato')
+        generador, content_type = exportacion.FORMATOS[formato]
+        response = StreamingHttpResponse(
+            generador(exportacion.prestamos_para_exportar(**filtros)),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = f'attachment; filename="prestamos.{formato}"'
+        return response
+
+
+class ReporteView(AdministradorRequiredMixin, TemplateView):
+    """Reportes de gestión; lee sólo los resúmenes diarios (ver ``resumenes.py``)."""
+
+    template_name = 'reporte.html'
+    dias_por_defecto = 90
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        form = ReporteForm(self.request.GET or None)
+        datos = form.cleaned_data if form.is_valid() else {}
+        hasta = datos.get('hasta') or timezone.localdate()
+        desde = datos.get('desde') or hasta - timedelta(days=self.dias_por_defecto)
+        context.update(
+            form=form,
+            desde=desde,
+            hasta=hasta,
+            marca=resumenes.marca(),
+            legajos=resumenes.legajos_mas_pedidos(desde, hasta),
+            usuarios=resumenes.tiempo_fuera_por_usuario(desde, hasta),
+            periodos=resumenes.por_periodo(desde, hasta, datos.get('periodo') or 'mes'),
+        )
+        return context
+
+
+class PerfilListView(AdministradorRequiredMixin, TemplateView):
+    """Perfiles de CPU guardados; con ``?descargar=`` devuelve uno en formato colapsado."""
+
+    template_name = 'perfil_list.html'
+
+    def get(self, request, *args, **kwargs):
+        nombre = request.GET.get('descargar')
+        if nombre is None:
+            return super().get(request, *args, **kwargs)
+        ruta = perfilado.buscar(nombre)
+        if ruta is None:
+            raise Http404('No existe ese perfil.')
+        return FileResponse(ruta.open('rb'), as_attachment=True, filename=ruta.name, content_type='text/plain')
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['perfiles'] = [ruta.name for ruta in perfilado.listar()]
+        context['activo'] = perfilado.directorio() is not None
+        context['parametro'] = perfilado.PARAMETRO
+        return context
+
 # Create your views here.
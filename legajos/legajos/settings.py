@@ -42,11 +42,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Primero, para contar también las consultas de sesión y autenticación.
+    'expediente.instrumentacion.InstrumentacionSQLMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'expediente.perfilado.PerfiladoMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,6 +66,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'expediente.eventos.en_vivo',
             ],
         },
     },
@@ -82,6 +86,15 @@ DATABASES = {
 }
 
 
+AUTHENTICATION_BACKENDS = [
+    # ModelBackend que además trae los roles del dominio con el usuario.
+    'expediente.permissions.RolesBackend',
+    # Las sesiones abiertas antes de RolesBackend guardan esta ruta; sin ella
+    # se cerrarían todas. Los usuarios que resuelve calculan sus roles aparte.
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -137,3 +150,25 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.BasicAuthentication',
     ],
 }
+
+# Instrumentación de SQL por pedido (ver expediente/instrumentacion.py).
+# MUESTREO es la fracción de pedidos instrumentados; 0 la desactiva.
+INSTRUMENTACION_SQL = {
+    'MUESTREO': 0.0,
+    'LENTAS': 3,
+    'UMBRAL_REPETICIONES': 5,
+}
+
+# Perfilado de CPU a pedido con ?perfilar=1 (ver expediente/perfilado.py).
+# Se conservan los últimos MAXIMO perfiles; sin DIRECTORIO queda desactivado.
+PERFILADO = {
+    'DIRECTORIO': BASE_DIR / 'perfiles',
+    'MAXIMO': 50,
+    'INTERVALO_MS': 1.0,
+}
+
+# Difusor de las novedades en vivo (ver expediente/eventos.py). Sin difusor
+# las páginas no se actualizan solas ni abren la conexión de eventos. 'expediente.eventos.DifusorLocal'
+# sólo reparte dentro de un proceso (un único worker ASGI); con varios
+# workers hace falta uno compartido.
+DIFUSOR_EVENTOS = None
@@ -24,4 +24,5 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('accounts/', include('django.contrib.auth.urls')),
     path('expediente/', include('expediente.urls')),
+    path('api/v1/', include('expediente.api')),
 ]
@@ -1,7 +1,7 @@
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView
 
-from expediente.models import Legajo, Solicitud
+from expediente import contadores
 from expediente.permissions import es_administrador
 
 
@@ -13,10 +13,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         usuario = self.request.user
         context['es_admin'] = es_administrador(usuario)
         if context['es_admin']:
-            context['total_legajos'] = Legajo.objects.count()
-            context['solicitudes_pendientes'] = Solicitud.objects.filter(estado=Solicitud.ESTADO_PENDIENTE).count()
-            context['prestamos_activos'] = Solicitud.objects.filter(prestamos__activo=True).distinct().count()
+            context.update(contadores.resumen_administrador())
         else:
-            context['solicitudes_activas'] = usuario.solicitudes.exclude(estado=Solicitud.ESTADO_CERRADA).count()
-            context['prestamos_activos'] = usuario.prestamos.filter(activo=True).count()
+            context.update(contadores.resumen_usuario(usuario.pk))
         return context